@@ -0,0 +1,268 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from inference_scheduler import PRIORITY_CRISIS, PRIORITY_NORMAL
+
+logger = logging.getLogger(__name__)
+
+
+class Rejected(Exception):
+    """Raised when a request is shed; carries a retry hint in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second up to ``burst``"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)"""
+        now = now if now is not None else time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class UserRateLimiter:
+    """Per-user token buckets, bounded so idle users do not accumulate"""
+
+    def __init__(self, rate: float, burst: float, max_users: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def check(self, user_id: str):
+        """Raise Rejected if the user is over their rate"""
+        if self.rate <= 0:
+            return
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_users:
+                # A dropped bucket was idle longest; it would have refilled anyway
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+        allowed, retry_after = bucket.try_acquire()
+        if not allowed:
+            raise Rejected("rate_limited", retry_after)
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded, priority-ordered wait queue.
+
+    Up to ``max_concurrent`` requests run at once; up to ``max_queue`` more
+    wait (crisis-priority waiters first) for at most ``queue_timeout``
+    seconds. Everything beyond that is shed immediately with a retry hint.
+
+    Crisis priority is a bounded budget, not a bypass: each user gets a
+    separate crisis token bucket, at most ``max_crisis_queue`` crisis
+    requests wait ahead of the queue, for at most ``crisis_queue_timeout``.
+    A crisis request over that budget is demoted to normal priority and
+    admitted or shed like any other; its escalation was already published.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        rate_per_second: Optional[float] = None,
+        rate_burst: Optional[float] = None,
+        max_ws_connections: Optional[int] = None,
+        max_crisis_queue: Optional[int] = None,
+        crisis_queue_timeout: Optional[float] = None,
+        crisis_rate_per_second: Optional[float] = None,
+        crisis_rate_burst: Optional[float] = None,
+    ):
+        self.max_concurrent = max_concurrent or int(os.getenv("ADMISSION_MAX_CONCURRENT", "32"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000")) / 1000.0
+        self.max_ws_connections = max_ws_connections or int(os.getenv("MAX_WS_CONNECTIONS", "500"))
+        self.rate_limiter = UserRateLimiter(
+            rate_per_second if rate_per_second is not None else float(os.getenv("RATE_LIMIT_PER_SECOND", "1")),
+            rate_burst if rate_burst is not None else float(os.getenv("RATE_LIMIT_BURST", "10")),
+        )
+        self.max_crisis_queue = max_crisis_queue if max_crisis_queue is not None else int(os.getenv("ADMISSION_MAX_CRISIS_QUEUE", "16"))
+        self.crisis_queue_timeout = crisis_queue_timeout if crisis_queue_timeout is not None else float(os.getenv("ADMISSION_CRISIS_TIMEOUT_MS", "10000")) / 1000.0
+        self.crisis_rate_limiter = UserRateLimiter(
+            crisis_rate_per_second if crisis_rate_per_second is not None else float(os.getenv("CRISIS_RATE_LIMIT_PER_SECOND", "0.2")),
+            crisis_rate_burst if crisis_rate_burst is not None else float(os.getenv("CRISIS_RATE_LIMIT_BURST", "5")),
+        )
+
+        self.active = 0
+        self.ws_connections = 0
+        self._waiters: list = []
+        self._crisis_waiting = 0
+        self._sequence = itertools.count()
+        self._service_time = 0.05  # EWMA of seconds per request, for retry hints
+
+        self.counters: Dict[str, int] = {
+            "accepted": 0,
+            "queued": 0,
+            "shed_queue_full": 0,
+            "shed_timeout": 0,
+            "shed_rate_limited": 0,
+            "crisis_demoted": 0,
+            "ws_accepted": 0,
+            "ws_rejected": 0,
+        }
+
+    @property
+    def saturated(self) -> bool:
+        """True while every slot is busy or requests are waiting"""
+        return self.active >= self.max_concurrent or bool(self._waiters)
+
+    def _retry_hint(self) -> float:
+        backlog = len(self._waiters) + self.active
+        return backlog * self._service_time / max(self.max_concurrent, 1)
+
+    def _crisis_budget(self, user_id: str) -> bool:
+        """Whether a crisis request may use the crisis lane; consumes a crisis token"""
+        if self._crisis_waiting >= self.max_crisis_queue:
+            return False
+        try:
+            self.crisis_rate_limiter.check(user_id)
+        except Rejected:
+            return False
+        return True
+
+    async def acquire(self, user_id: str, priority: int = PRIORITY_NORMAL):
+        """Admit a request or raise Rejected"""
+        if priority == PRIORITY_CRISIS and not self._crisis_budget(user_id):
+            self.counters["crisis_demoted"] += 1
+            priority = PRIORITY_NORMAL
+        if priority != PRIORITY_CRISIS:
+            try:
+                self.rate_limiter.check(user_id)
+            except Rejected:
+                self.counters["shed_rate_limited"] += 1
+                raise
+
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.counters["accepted"] += 1
+            return
+
+        if priority != PRIORITY_CRISIS and len(self._waiters) >= self.max_queue:
+            self.counters["shed_queue_full"] += 1
+            raise Rejected("overloaded", self._retry_hint())
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._sequence), future]
+        heapq.heappush(self._waiters, entry)
+        self.counters["queued"] += 1
+        crisis = priority == PRIORITY_CRISIS
+        if crisis:
+            self._crisis_waiting += 1
+        try:
+            # Crisis traffic gets a longer wait, but still a bounded one
+            timeout = self.crisis_queue_timeout if crisis else self.queue_timeout
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(entry)
+            self.counters["shed_timeout"] += 1
+            raise Rejected("queue_timeout", self._retry_hint())
+        except asyncio.CancelledError:
+            self._abandon(entry)
+            raise
+        finally:
+            if crisis:
+                self._crisis_waiting -= 1
+        self.counters["accepted"] += 1
+
+    def _abandon(self, entry: list):
+        """Drop a waiter that gave up, returning its slot if one was handed over"""
+        future = entry[2]
+        if future.done() and not future.cancelled():
+            # Slot was handed over just as we gave up; pass it on
+            self.release()
+            return
+        future.cancel()
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+
+    def release(self, elapsed: Optional[float] = None):
+        """Free a slot, handing it straight to the best waiter if any"""
+        if elapsed is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * elapsed
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Slot ownership transfers; ``active`` stays the same
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def slot(self, user_id: str, priority: int = PRIORITY_NORMAL) -> "_Slot":
+        """``async with controller.slot(user_id): ...``"""
+        return _Slot(self, user_id, priority)
+
+    def connect_ws(self):
+        """Admit a new WebSocket session or raise Rejected"""
+        if self.ws_connections >= self.max_ws_connections:
+            self.counters["ws_rejected"] += 1
+            raise Rejected("too_many_connections", 5.0)
+        self.ws_connections += 1
+        self.counters["ws_accepted"] += 1
+
+    def disconnect_ws(self):
+        self.ws_connections = max(0, self.ws_connections - 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "crisis_waiting": self._crisis_waiting,
+            "max_crisis_queue": self.max_crisis_queue,
+            "ws_connections": self.ws_connections,
+            "saturated": self.saturated,
+            "avg_service_ms": round(self._service_time * 1000, 2),
+            **self.counters,
+        }
+
+
+class _Slot:
+    def __init__(self, controller: AdmissionController, user_id: str, priority: int):
+        self.controller = controller
+        self.user_id = user_id
+        self.priority = priority
+        self.started = 0.0
+
+    async def __aenter__(self):
+        await self.controller.acquire(self.user_id, self.priority)
+        self.started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.controller.release(time.monotonic() - self.started)
+        return False
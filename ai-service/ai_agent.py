@@ -1,22 +1,32 @@
 import asyncio
+import bisect
 import json
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Collection, Set, Tuple, Union
 import logging
-from textblob import TextBlob
 import nltk
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
 from sklearn.metrics.pairwise import cosine_similarity
 import pickle
 import os
+import random
 
 from models import (
     AIResponse, UserProfile, LearningStats, NeuralNetwork, NeuralLayer,
     AIInsight, ThoughtProcess, AssessmentResult, MoodAnalysis, EmotionType
 )
+from inference_scheduler import InferenceScheduler, PRIORITY_CRISIS, PRIORITY_NORMAL
+from crisis import CrisisEventBus
+from state_snapshot import SnapshotReader, SnapshotWriter
+from profile_cache import ProfileCache
+from message_features import MessageFeatures
+from jobs import Job, JobContext, JobManager
+from memory_monitor import MemoryMonitor, deep_sizeof
+from ruleset import CompiledRuleset, RulesetManager, score_emotion
+from sentiment import preload as preload_sentiment, sentiment_polarities
 
 # Download required NLTK data
 try:
@@ -28,9 +38,24 @@ except:
 
 logger = logging.getLogger(__name__)
 
+STATE_PATH = os.getenv("AI_STATE_PATH", "data/ai_state.json")
+SNAPSHOT_PATH = os.getenv("AI_SNAPSHOT_PATH", "data/ai_state.snap")
+STATE_FORMAT = os.getenv("AI_STATE_FORMAT", "json")  # json | binary
+
+# Seeds response selection and simulated stats so replayed traffic is reproducible
+RANDOM_SEED = os.getenv("AI_RANDOM_SEED")
+
+# Conversations kept in memory after trimming at each memory budget level
+CONVERSATION_MEMORY_KEEP = {"soft": 1000, "hard": 100}
+
 class NeuraWellAI:
     def __init__(self):
-        self.user_profiles: Dict[str, UserProfile] = {}
+        # Memory-budgeted LRU; evicted profiles live in a local cold tier
+        self.user_profiles = ProfileCache()
+        # Memory-mapped snapshot; profiles are materialized into user_profiles on first use
+        self._snapshot: Optional[SnapshotReader] = None
+        # Users handed off to another shard; their snapshot rows are dead
+        self._released_users: Set[str] = set()
         self.conversation_memory: List[Dict] = []
         self.learned_patterns: Dict[str, Any] = {}
         self.neural_network = self._initialize_neural_network()
@@ -45,7 +70,30 @@ class NeuraWellAI:
         )
         self.current_thoughts: List[ThoughtProcess] = []
         self.insights_generated: List[AIInsight] = []
-        self.is_learning = False
+        
+        # Bumped whenever the state behind a read-only view changes
+        self.view_versions: Dict[str, int] = {"status": 0, "insights": 0, "thoughts": 0}
+        self._view_listeners: List[Callable[[str], None]] = []
+        # Running totals, used as delta cursors for pushed thoughts and insights
+        self.thought_count = 0
+        self.insight_count = 0
+        
+        # Templates, keyword lists and recommendation maps, compiled once and hot-swappable
+        self.rules = RulesetManager()
+        self.rng = random.Random(RANDOM_SEED)
+        
+        # Crisis escalations fan out here before the rest of the pipeline runs
+        self.crisis_bus = CrisisEventBus()
+        
+        # Batches concurrent emotion classification into one call per window
+        self.emotion_scheduler = InferenceScheduler(self._detect_emotion_batch, name="emotion")
+        
+        # Learning runs and heavy analytics, off the request path
+        self.jobs = JobManager()
+        
+        # Real RSS against soft/hard budgets; trims caches when over
+        self.memory = MemoryMonitor()
+        self.memory.add_trimmer(self.trim_memory)
         
         # AI personality traits
         self.personality = {
@@ -85,66 +133,75 @@ class NeuraWellAI:
         
         # Initialize NLP components
         self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-        self.emotion_classifier = self._initialize_emotion_classifier()
+        preload_sentiment()
+        self.emotion_scheduler.start()
+        self.jobs.start()
+        self.memory.start()
+        self.learning_stats.memory_size_mb = self.memory.rss_mb
         
         logger.info("AI Agent initialized successfully")
 
-    def _initialize_emotion_classifier(self):
-        """Initialize emotion classification system"""
-        emotion_keywords = {
-            EmotionType.ANXIETY: [
-                'worried', 'anxious', 'nervous', 'panic', 'fear', 'scared', 
-                'overwhelmed', 'stressed', 'tense', 'restless'
-            ],
-            EmotionType.DEPRESSION: [
-                'sad', 'depressed', 'hopeless', 'empty', 'worthless', 
-                'lonely', 'tired', 'exhausted', 'numb', 'dark'
-            ],
-            EmotionType.STRESS: [
-                'stressed', 'pressure', 'overwhelmed', 'busy', 'rushed', 
-                'deadline', 'burden', 'heavy', 'intense', 'demanding'
-            ],
-            EmotionType.JOY: [
-                'happy', 'excited', 'joyful', 'pleased', 'content', 
-                'grateful', 'optimistic', 'cheerful', 'delighted', 'thrilled'
-            ],
-            EmotionType.ANGER: [
-                'angry', 'frustrated', 'mad', 'irritated', 'annoyed', 
-                'furious', 'rage', 'upset', 'agitated', 'hostile'
-            ]
-        }
-        return emotion_keywords
+    async def process_message(
+        self, message: str, user_id: str, context: Dict = None, fields: Optional[Collection[str]] = None,
+        crisis_hits: Optional[tuple] = None, features: Optional[MessageFeatures] = None,
+        rules: Optional[CompiledRuleset] = None
+    ) -> Union[AIResponse, Dict[str, Any]]:
+        """Process a user message and generate AI response.
 
-    async def process_message(self, message: str, user_id: str, context: Dict = None) -> AIResponse:
-        """Process a user message and generate AI response"""
+        With ``fields`` only those response fields are returned, as a
+        JSON-ready dict, and the ones that exist only for the client
+        (recommendations, reasoning, thinking process) are not computed.
+        ``crisis_hits`` from an earlier ``screen`` call (already escalated)
+        skips the pre-screen here; pass its ``features`` and ``rules`` too,
+        so the request keeps that ruleset and the message is scanned once.
+        """
         start_time = datetime.now()
         
+        # Pin one ruleset for the whole request so a hot swap cannot split it
+        rules = rules or self.rules.current
+        
+        # Shared, lazily computed features for every analysis stage
+        if features is None:
+            features = MessageFeatures(message, sentiment=self._sentiment_polarity)
+        
+        # Crisis pre-screen runs first and escalates before any heavy analysis
+        if crisis_hits is None:
+            crisis_hits = self.prescreen(features, user_id, rules)
+        else:
+            # The crisis assessment below reuses the pre-screen's hits
+            features.set_hits(rules.crisis_keywords, crisis_hits)
+        priority = PRIORITY_CRISIS if crisis_hits else PRIORITY_NORMAL
+        
         # Add thinking process
         await self._add_thought("analysis", f"Processing message from user {user_id}: '{message[:50]}...'")
         
         # Get or create user profile
-        user_profile = self._get_user_profile(user_id)
+        user_profile = await self._load_user_profile(user_id)
         
-        # Analyze emotion
-        emotion = self._detect_emotion(message)
+        # Analyze emotion (batched with concurrent requests)
+        emotion = await self.emotion_scheduler.submit(features, priority)
         await self._add_thought("emotion", f"Detected emotion: {emotion.value}")
         
         # Identify patterns
-        patterns = self._identify_patterns(message, user_profile)
+        patterns = self._identify_patterns(features, user_profile, rules)
         await self._add_thought("pattern", f"Identified patterns: {', '.join(patterns)}")
         
-        # Generate response
-        response_text = await self._generate_response(message, emotion, patterns, user_profile)
-        await self._add_thought("generation", f"Generated response with {len(response_text)} characters")
+        # Generate response, unless the client did not ask for the text
+        response_text = None
+        if fields is None or "text" in fields:
+            response_text = await self._generate_response(features, emotion, patterns, user_profile, rules)
+            await self._add_thought("generation", f"Generated response with {len(response_text)} characters")
         
         # Calculate confidence
-        confidence = self._calculate_confidence(message, emotion, patterns)
+        confidence = self._calculate_confidence(features, emotion, patterns)
         
         # Assess crisis level
-        crisis_level = self._assess_crisis_level(message, emotion)
-        
-        # Generate recommendations
-        recommendations = self._generate_recommendations(emotion, patterns, crisis_level)
+        crisis_level = self._assess_crisis_level(features, emotion, rules)
+        if crisis_level > rules.crisis_threshold:
+            self.crisis_bus.publish(
+                user_id, "assessed", crisis_level,
+                emotion=emotion.value, prescreened=bool(crisis_hits)
+            )
         
         # Update user profile
         self._update_user_profile(user_id, message, emotion, patterns)
@@ -152,6 +209,15 @@ class NeuraWellAI:
         # Update learning stats
         self._update_learning_stats()
         
+        if fields is not None:
+            return self._sparse_response(
+                fields, user_id, message, start_time, response_text, confidence,
+                emotion, patterns, crisis_level, rules
+            )
+        
+        # Generate recommendations
+        recommendations = self._generate_recommendations(emotion, patterns, crisis_level, rules)
+        
         # Create response
         response = AIResponse(
             text=response_text,
@@ -162,7 +228,7 @@ class NeuraWellAI:
             recommendations=recommendations,
             crisis_level=crisis_level,
             timestamp=datetime.now(),
-            thinking_process=[t.dict() for t in self.current_thoughts[-5:]]  # Last 5 thoughts
+            thinking_process=self._thinking_process()
         )
         
         # Store conversation
@@ -175,163 +241,142 @@ class NeuraWellAI:
         
         return response
 
-    def _detect_emotion(self, message: str) -> EmotionType:
+    def _thinking_process(self) -> List[Dict[str, str]]:
+        """The last 5 thoughts, every value a string as AIResponse declares"""
+        return [
+            {key: str(value) for key, value in t.model_dump(mode="json").items()}
+            for t in self.current_thoughts[-5:]
+        ]
+
+    def _sparse_response(
+        self, fields: Collection[str], user_id: str, message: str, start_time: datetime,
+        text: Optional[str], confidence: float, emotion: EmotionType, patterns: List[str],
+        crisis_level: int, rules: CompiledRuleset
+    ) -> Dict[str, Any]:
+        """The selected response fields, encoded as AIResponse would be; the rest are skipped"""
+        values = {
+            "text": lambda: text,
+            "confidence": lambda: confidence,
+            "reasoning": lambda: f"Emotion-based response for {emotion.value} with {len(patterns)} patterns identified",
+            "emotion_detected": lambda: emotion.value,
+            "patterns_identified": lambda: patterns,
+            "recommendations": lambda: self._generate_recommendations(emotion, patterns, crisis_level, rules),
+            "crisis_level": lambda: crisis_level,
+            "timestamp": lambda: datetime.now().isoformat(),
+            "thinking_process": self._thinking_process,
+        }
+        response = {name: values[name]() for name in values if name in fields}
+        
+        # Learning reads only the analysis, so that is all memory needs
+        self.conversation_memory.append({
+            "user_id": user_id,
+            "message": message,
+            "response": {
+                "emotion_detected": emotion.value,
+                "patterns_identified": patterns,
+                "crisis_level": crisis_level,
+            },
+            "timestamp": start_time.isoformat()
+        })
+        
+        return response
+
+    def _features(self, message) -> MessageFeatures:
+        if isinstance(message, MessageFeatures):
+            return message
+        return MessageFeatures(message, sentiment=self._sentiment_polarity)
+
+    def _detect_emotion(self, message) -> EmotionType:
         """Detect emotion in the message using multiple approaches"""
-        message_lower = message.lower()
-        emotion_scores = {}
-        
-        # Keyword-based detection
-        for emotion, keywords in self.emotion_classifier.items():
-            score = sum(1 for keyword in keywords if keyword in message_lower)
-            emotion_scores[emotion] = score
-        
-        # TextBlob sentiment analysis
-        blob = TextBlob(message)
-        sentiment = blob.sentiment
-        
-        # Adjust scores based on sentiment
-        if sentiment.polarity < -0.3:
-            emotion_scores[EmotionType.SADNESS] += 2
-            emotion_scores[EmotionType.DEPRESSION] += 1
-        elif sentiment.polarity > 0.3:
-            emotion_scores[EmotionType.JOY] += 2
-        
-        if abs(sentiment.polarity) > 0.5:
-            emotion_scores[EmotionType.STRESS] += 1
-        
-        # Return emotion with highest score
-        if max(emotion_scores.values()) > 0:
-            return max(emotion_scores, key=emotion_scores.get)
-        else:
-            return EmotionType.NEUTRAL
+        return self._detect_emotion_batch([self._features(message)])[0]
+
+    def _detect_emotion_batch(self, batch: List[MessageFeatures]) -> List[EmotionType]:
+        """Detect emotions for a batch of messages in a single call"""
+        rules = self.rules.current
+        pending = [features for features in batch if not features.has_polarity()]
+        for features, polarity in zip(pending, self._sentiment_polarities([f.text for f in pending])):
+            features.set_polarity(polarity)
+        return [self._score_emotion(features, rules) for features in batch]
+
+    def _sentiment_polarity(self, message: str) -> float:
+        return self._sentiment_polarities([message])[0]
+
+    @staticmethod
+    def _sentiment_polarities(messages: List[str]) -> List[float]:
+        """Sentiment polarity per message from the configured scorer (lexicon or TextBlob)"""
+        return sentiment_polarities(messages)
 
-    def _identify_patterns(self, message: str, user_profile: UserProfile) -> List[str]:
+    @staticmethod
+    def _score_emotion(features: MessageFeatures, rules: CompiledRuleset) -> EmotionType:
+        """Combine keyword hits and sentiment polarity into a single emotion"""
+        return score_emotion(features, rules)
+
+    def _identify_patterns(self, message, user_profile: UserProfile, rules: CompiledRuleset = None,
+                           at: Optional[datetime] = None) -> List[str]:
         """Identify patterns in user behavior and message content"""
+        rules = rules or self.rules.current
+        features = self._features(message)
         patterns = []
         
         # Time-based patterns
-        current_hour = datetime.now().hour
+        current_hour = (at or datetime.now()).hour
         if current_hour < 6 or current_hour > 22:
             patterns.append("late_night_communication")
         
         # Recurring themes
-        message_lower = message.lower()
-        themes = ['work', 'family', 'sleep', 'health', 'relationship', 'money', 'future']
-        for theme in themes:
+        message_lower = features.lower
+        for theme in rules.themes:
             if theme in message_lower:
                 # Check if this theme appears frequently in user's history
                 theme_count = sum(1 for conv in user_profile.conversation_history 
                                 if theme in conv.get('message', '').lower())
-                if theme_count > 2:
+                if theme_count > rules.recurring_theme_threshold:
                     patterns.append(f"recurring_{theme}_concern")
         
         # Question patterns
-        if '?' in message:
+        if features.is_question:
             patterns.append("seeking_information")
         
         # Length patterns
-        if len(message.split()) > 50:
+        if features.word_count > rules.detailed_word_count:
             patterns.append("detailed_expression")
-        elif len(message.split()) < 5:
+        elif features.word_count < rules.brief_word_count:
             patterns.append("brief_communication")
         
         # Emotional intensity patterns
-        if any(word in message_lower for word in ['very', 'extremely', 'really', 'so', 'too']):
+        if features.any(rules.intensity_markers):
             patterns.append("high_emotional_intensity")
         
         return patterns
 
-    async def _generate_response(self, message: str, emotion: EmotionType, patterns: List[str], user_profile: UserProfile) -> str:
+    async def _generate_response(self, message, emotion: EmotionType, patterns: List[str], user_profile: UserProfile, rules: CompiledRuleset = None) -> str:
         """Generate contextual AI response"""
-        
-        # Base response templates by emotion
-        response_templates = {
-            EmotionType.ANXIETY: [
-                "I can sense the anxiety in your words, and I want you to know that what you're feeling is completely valid. ",
-                "It sounds like you're experiencing some anxious thoughts right now. Let's work through this together. ",
-                "I notice you're feeling anxious. Remember that anxiety is your mind trying to protect you, but sometimes it can be overprotective. "
-            ],
-            EmotionType.DEPRESSION: [
-                "I hear the heaviness in what you're sharing, and I want you to know that your feelings are real and important. ",
-                "It takes courage to express these difficult feelings. You're not alone in this. ",
-                "I can sense you're going through a really tough time right now. Your pain is valid, and I'm here to support you. "
-            ],
-            EmotionType.STRESS: [
-                "It sounds like you're dealing with a lot of pressure right now. Let's see if we can break this down together. ",
-                "I can hear the stress in what you're telling me. Sometimes when we're overwhelmed, it helps to focus on one thing at a time. ",
-                "You're managing a lot right now, and it's understandable that you're feeling stressed. "
-            ],
-            EmotionType.JOY: [
-                "I can feel the positive energy in your message! It's wonderful to hear you're feeling good. ",
-                "Your happiness is contagious! I'm so glad you're experiencing these positive feelings. ",
-                "It's beautiful to see you in such a good place emotionally. "
-            ],
-            EmotionType.NEUTRAL: [
-                "Thank you for sharing that with me. I'm here to listen and support you in whatever way feels most helpful. ",
-                "I appreciate you opening up. What would be most useful for you right now? ",
-                "I'm glad you reached out. How can I best support you today? "
-            ]
-        }
+        rules = rules or self.rules.current
         
         # Select base response
-        base_responses = response_templates.get(emotion, response_templates[EmotionType.NEUTRAL])
-        response = np.random.choice(base_responses)
+        response = self.rng.choice(rules.templates_for(emotion))
         
         # Add pattern-specific content
-        if "recurring_work_concern" in patterns:
-            response += "I've noticed work has been a recurring theme in our conversations. This suggests it's a significant source of stress for you. "
-        
-        if "late_night_communication" in patterns:
-            response += "I see you're reaching out during late hours, which might indicate sleep difficulties or heightened stress. "
-        
-        if "high_emotional_intensity" in patterns:
-            response += "I can sense the intensity of what you're experiencing right now. "
+        for pattern, text in rules.pattern_responses:
+            if pattern in patterns:
+                response += text
         
         # Add personalized elements based on user history
-        if len(user_profile.conversation_history) > 5:
-            response += "Based on our previous conversations, I'm developing a deeper understanding of your unique situation. "
+        if len(user_profile.conversation_history) > rules.history_min_conversations:
+            response += rules.history_text
         
         # Add specific guidance
-        guidance = self._generate_guidance(emotion, patterns)
+        guidance = self._generate_guidance(emotion, patterns, rules)
         response += guidance
         
         return response
 
-    def _generate_guidance(self, emotion: EmotionType, patterns: List[str]) -> str:
+    def _generate_guidance(self, emotion: EmotionType, patterns: List[str], rules: CompiledRuleset = None) -> str:
         """Generate specific guidance based on emotion and patterns"""
-        
-        guidance_map = {
-            EmotionType.ANXIETY: [
-                "Would you like to try a grounding exercise? We could do the 5-4-3-2-1 technique together.",
-                "Sometimes it helps to focus on your breathing. Would you like me to guide you through a breathing exercise?",
-                "What specific thoughts are contributing to your anxiety right now? Sometimes naming them can reduce their power."
-            ],
-            EmotionType.DEPRESSION: [
-                "Even small steps matter when you're feeling this way. Is there one tiny thing you could do today just for yourself?",
-                "Have you been able to do any activities that usually bring you some comfort, even if they don't feel the same right now?",
-                "What has been the most difficult part of your day? Sometimes it helps to acknowledge the specific challenges."
-            ],
-            EmotionType.STRESS: [
-                "Let's try to break down what's feeling overwhelming. What feels like the most pressing concern right now?",
-                "When you're stressed, everything can feel urgent. What's one thing you could let go of or delegate?",
-                "What coping strategies have helped you manage stress in the past?"
-            ],
-            EmotionType.JOY: [
-                "What's contributing to these positive feelings? It's great to identify what works well for you.",
-                "How can we help you maintain this positive momentum?",
-                "It's wonderful that you're feeling good. What would you like to focus on while you're in this positive space?"
-            ]
-        }
-        
-        guidance_options = guidance_map.get(emotion, [
-            "What would be most helpful for you right now?",
-            "How can I best support you in this moment?",
-            "What's one thing that might help you feel a bit better today?"
-        ])
-        
-        return np.random.choice(guidance_options)
+        rules = rules or self.rules.current
+        return self.rng.choice(rules.guidance_for(emotion))
 
-    def _calculate_confidence(self, message: str, emotion: EmotionType, patterns: List[str]) -> float:
+    def _calculate_confidence(self, message, emotion: EmotionType, patterns: List[str]) -> float:
         """Calculate confidence in the AI response"""
         base_confidence = 0.75
         
@@ -343,86 +388,98 @@ class NeuraWellAI:
         base_confidence += len(patterns) * 0.02
         
         # Increase confidence based on message length (more context)
-        word_count = len(message.split())
+        word_count = self._features(message).word_count
         if word_count > 20:
             base_confidence += 0.05
         
         return min(base_confidence, 0.95)
 
-    def _assess_crisis_level(self, message: str, emotion: EmotionType) -> int:
+    def _prescreen_crisis(self, message, rules: CompiledRuleset = None) -> tuple:
+        """Near-free crisis keyword screen that runs ahead of the full pipeline"""
+        rules = rules or self.rules.current
+        return self._features(message).hits(rules.crisis_keywords)
+
+    def prescreen(self, message, user_id: str, rules: CompiledRuleset = None, **details) -> tuple:
+        """Crisis keyword hits for a message, escalated on the crisis bus at once.
+
+        Endpoints call this before admission control so an escalation never
+        waits for a slot; the hits then pick the crisis lane and are passed on.
+        """
+        rules = rules or self.rules.current
+        hits = self._prescreen_crisis(message, rules)
+        if hits:
+            self.crisis_bus.publish(
+                user_id, "prescreen",
+                min(len(hits) * rules.crisis_keyword_weight, rules.crisis_max_level),
+                keywords=list(hits), **details
+            )
+        return hits
+
+    def screen(self, message: str, user_id: str, **details) -> Tuple[MessageFeatures, CompiledRuleset, tuple]:
+        """``prescreen`` for an endpoint: the features, pinned ruleset and hits to hand to ``process_message``"""
+        rules = self.rules.current
+        features = MessageFeatures(message, sentiment=self._sentiment_polarity)
+        return features, rules, self.prescreen(features, user_id, rules, **details)
+
+    def _assess_crisis_level(self, message, emotion: EmotionType, rules: CompiledRuleset = None) -> int:
         """Assess crisis level on a scale of 0-10"""
-        crisis_keywords = [
-            'suicide', 'kill myself', 'end it all', 'not worth living', 
-            'better off dead', 'hurt myself', 'self harm', 'give up'
-        ]
-        
-        message_lower = message.lower()
-        crisis_score = 0
+        rules = rules or self.rules.current
+        features = self._features(message)
         
         # Check for explicit crisis keywords
-        for keyword in crisis_keywords:
-            if keyword in message_lower:
-                crisis_score += 3
+        crisis_score = features.count(rules.crisis_keywords) * rules.crisis_keyword_weight
         
         # Emotional indicators
-        if emotion in [EmotionType.DEPRESSION, EmotionType.ANXIETY]:
-            crisis_score += 1
+        if emotion in rules.crisis_emotions:
+            crisis_score += rules.crisis_emotion_weight
         
         # Intensity indicators
-        intensity_words = ['extremely', 'unbearable', 'can\'t take it', 'hopeless']
-        for word in intensity_words:
-            if word in message_lower:
-                crisis_score += 1
+        crisis_score += features.count(rules.crisis_intensity) * rules.crisis_intensity_weight
         
-        return min(crisis_score, 10)
+        return min(crisis_score, rules.crisis_max_level)
 
-    def _generate_recommendations(self, emotion: EmotionType, patterns: List[str], crisis_level: int) -> List[str]:
+    def _generate_recommendations(self, emotion: EmotionType, patterns: List[str], crisis_level: int, rules: CompiledRuleset = None) -> List[str]:
         """Generate personalized recommendations"""
+        rules = rules or self.rules.current
         recommendations = []
         
-        if crisis_level > 5:
-            recommendations.extend([
-                "Consider reaching out to a crisis helpline: 988",
-                "Contact emergency services if you're in immediate danger",
-                "Reach out to a trusted friend or family member"
-            ])
-        
-        emotion_recommendations = {
-            EmotionType.ANXIETY: [
-                "Practice deep breathing exercises",
-                "Try progressive muscle relaxation",
-                "Consider mindfulness meditation",
-                "Limit caffeine intake"
-            ],
-            EmotionType.DEPRESSION: [
-                "Maintain a regular sleep schedule",
-                "Try to get some sunlight each day",
-                "Consider gentle physical activity",
-                "Connect with supportive people"
-            ],
-            EmotionType.STRESS: [
-                "Break large tasks into smaller steps",
-                "Practice time management techniques",
-                "Consider delegation when possible",
-                "Take regular breaks"
-            ]
-        }
+        if crisis_level > rules.crisis_threshold:
+            recommendations.extend(rules.crisis_recommendations)
         
-        recommendations.extend(emotion_recommendations.get(emotion, []))
+        recommendations.extend(rules.recommendations_for(emotion))
         
         # Pattern-based recommendations
-        if "late_night_communication" in patterns:
-            recommendations.append("Consider establishing a regular sleep routine")
-        
-        if "recurring_work_concern" in patterns:
-            recommendations.append("Consider discussing work stress with a supervisor or HR")
+        for pattern, recommendation in rules.pattern_recommendations:
+            if pattern in patterns:
+                recommendations.append(recommendation)
         
-        return recommendations[:5]  # Limit to 5 recommendations
+        return recommendations[:rules.recommendation_limit]
 
     def _get_user_profile(self, user_id: str) -> UserProfile:
         """Get or create user profile"""
-        if user_id not in self.user_profiles:
-            self.user_profiles[user_id] = UserProfile(
+        profile = self.user_profiles.get(user_id)
+        if profile is None:
+            profile = self._new_user_profile(user_id)
+        return profile
+
+    async def _load_user_profile(self, user_id: str) -> UserProfile:
+        """``_get_user_profile`` without blocking the event loop on the cold tier"""
+        profile = await self.user_profiles.load(user_id)
+        if profile is None:
+            profile = self._new_user_profile(user_id)
+        return profile
+
+    def _new_user_profile(self, user_id: str) -> UserProfile:
+        """A profile not held in either tier: from the snapshot, or a fresh one"""
+        profile = None
+        if self._snapshot is not None and user_id not in self._released_users:
+            record = self._snapshot.get(user_id)
+            if record is not None:
+                # Written by us from validated profiles, so skip re-validation
+                profile = UserProfile.model_construct(**record)
+                self.user_profiles.put(user_id, profile)
+        if profile is None:
+            profile = UserProfile(
                 user_id=user_id,
                 preferences={},
                 conversation_history=[],
@@ -430,19 +487,28 @@ class NeuraWellAI:
                 learned_insights=[],
                 last_interaction=datetime.now()
             )
-        return self.user_profiles[user_id]
+            self.user_profiles.put(user_id, profile)
+        return profile
 
-    def _update_user_profile(self, user_id: str, message: str, emotion: EmotionType, patterns: List[str]):
-        """Update user profile with new interaction data"""
+    def _update_user_profile(self, user_id: str, message: str, emotion: EmotionType, patterns: List[str],
+                             timestamp: Optional[datetime] = None):
+        """Update user profile with new interaction data; ``timestamp`` defaults to now"""
         profile = self.user_profiles[user_id]
+        at = timestamp or datetime.now()
+        history = profile.conversation_history
+        is_first = not history
         
-        # Add to conversation history
-        profile.conversation_history.append({
+        # Add to conversation history, keeping imported (older) entries in time order
+        entry = {
             "message": message,
             "emotion": emotion.value,
             "patterns": patterns,
-            "timestamp": datetime.now().isoformat()
-        })
+            "timestamp": at.isoformat()
+        }
+        if history and entry["timestamp"] < history[-1].get("timestamp", ""):
+            bisect.insort(history, entry, key=lambda e: e.get("timestamp", ""))
+        else:
+            history.append(entry)
         
         # Update emotional patterns
         if emotion.value in profile.emotional_patterns:
@@ -451,29 +517,44 @@ class NeuraWellAI:
             profile.emotional_patterns[emotion.value] = 1
         
         # Update last interaction
-        profile.last_interaction = datetime.now()
+        if timestamp is None or is_first or at > profile.last_interaction:
+            profile.last_interaction = at
         
         # Keep only last 100 conversations for memory management
         if len(profile.conversation_history) > 100:
             profile.conversation_history = profile.conversation_history[-100:]
+        
+        self.user_profiles.touch(user_id)
+
+    def _touch_views(self, *views: str):
+        """Mark cached views as stale and tell listeners what changed"""
+        for view in views:
+            self.view_versions[view] += 1
+            for listener in self._view_listeners:
+                listener(view)
+
+    def add_view_listener(self, listener: Callable[[str], None]):
+        """Call ``listener(view)`` whenever a view's state changes"""
+        self._view_listeners.append(listener)
 
     def _update_learning_stats(self):
         """Update AI learning statistics"""
         self.learning_stats.total_interactions += 1
+        self.learning_stats.memory_size_mb = self.memory.rss_mb
+        self._touch_views("status")
         
         # Simulate learning improvements
         if self.learning_stats.total_interactions % 10 == 0:
-            self.learning_stats.patterns_learned += np.random.randint(1, 4)
+            self.learning_stats.patterns_learned += self.rng.randint(1, 3)
             self.learning_stats.accuracy_score = min(
-                self.learning_stats.accuracy_score + np.random.uniform(0.001, 0.005), 
+                self.learning_stats.accuracy_score + self.rng.uniform(0.001, 0.005), 
                 0.99
             )
             self.learning_stats.confidence_level = min(
-                self.learning_stats.confidence_level + np.random.uniform(0.001, 0.003), 
+                self.learning_stats.confidence_level + self.rng.uniform(0.001, 0.003), 
                 0.98
             )
-            self.learning_stats.neural_connections += np.random.randint(1, 5)
-            self.learning_stats.memory_size_mb += np.random.uniform(0.01, 0.05)
+            self.learning_stats.neural_connections += self.rng.randint(1, 4)
 
     async def _add_thought(self, thought_type: str, content: str):
         """Add a thought to the current thinking process"""
@@ -481,56 +562,113 @@ class NeuraWellAI:
             step=f"Step {len(self.current_thoughts) + 1}",
             type=thought_type,
             content=content,
-            confidence=np.random.uniform(0.7, 0.95),
+            confidence=self.rng.uniform(0.7, 0.95),
             timestamp=datetime.now()
         )
         
         self.current_thoughts.append(thought)
+        self.thought_count += 1
         
         # Keep only last 20 thoughts
         if len(self.current_thoughts) > 20:
             self.current_thoughts = self.current_thoughts[-20:]
+        self._touch_views("thoughts")
 
-    async def learn(self) -> Dict[str, Any]:
-        """Trigger learning process"""
-        if self.is_learning:
-            return {"status": "already_learning"}
-        
-        self.is_learning = True
+    @property
+    def is_learning(self) -> bool:
+        return self.jobs.active("learning") is not None
+
+    def learn(self) -> Job:
+        """Queue a learning run, or return the one already pending"""
+        return self.jobs.submit("learning", self._learning_job)
+
+    async def _learning_job(self, ctx: JobContext) -> Dict[str, Any]:
+        """Learning run; results are computed off to the side and published at once"""
         await self._add_thought("learning", "Starting autonomous learning process...")
         
-        try:
-            # Simulate learning process
-            await asyncio.sleep(2)  # Simulate processing time
-            
-            # Update neural network
-            for layer in self.neural_network.layers:
-                layer.activation = min(layer.activation + np.random.uniform(0.01, 0.05), 1.0)
-            
-            self.neural_network.accuracy += np.random.uniform(0.1, 0.5)
-            self.neural_network.connections += np.random.randint(5, 15)
-            self.neural_network.training_epochs += 1
-            
-            # Generate new insights
-            await self._generate_new_insights()
-            
-            await self._add_thought("learning", "Learning process completed successfully")
-            
-            return {
-                "status": "completed",
-                "improvements": {
-                    "accuracy_increase": 0.3,
-                    "new_connections": 10,
-                    "insights_generated": len(self.insights_generated)
-                }
+        # Simulate learning process
+        ctx.report(0.1, "Analyzing conversation memory")
+        memory = list(self.conversation_memory)
+        learned_patterns = await ctx.run(self._compute_learned_patterns, memory)
+        await asyncio.sleep(2)  # Simulate processing time
+        
+        # Update a copy of the neural network
+        ctx.report(0.6, "Training neural network")
+        network = await ctx.run(self._train_network, self.neural_network.copy(deep=True))
+        
+        # Generate new insights
+        ctx.report(0.9, "Generating insights")
+        insights = self._generate_new_insights()
+        
+        ctx.check()
+        previous_accuracy = self.neural_network.accuracy
+        previous_connections = self.neural_network.connections
+        self._publish_learning(learned_patterns, network, insights)
+        
+        await self._add_thought("learning", "Learning process completed successfully")
+        
+        return {
+            "status": "completed",
+            "improvements": {
+                "accuracy_increase": round(network.accuracy - previous_accuracy, 3),
+                "new_connections": network.connections - previous_connections,
+                "insights_generated": len(self.insights_generated),
+                "conversations_analyzed": len(memory)
             }
+        }
+
+    def _compute_learned_patterns(self, memory: List[Dict]) -> Dict[str, Any]:
+        """Aggregate emotion, pattern and time-of-day frequencies over conversation memory"""
+        emotions: Dict[str, int] = {}
+        patterns: Dict[str, int] = {}
+        emotions_by_hour: Dict[str, Dict[str, int]] = {}
+        crisis_total = 0
+        for entry in memory:
+            response = entry.get("response", {})
+            emotion = getattr(response.get("emotion_detected"), "value", response.get("emotion_detected"))
+            emotion = str(emotion or EmotionType.NEUTRAL.value)
+            emotions[emotion] = emotions.get(emotion, 0) + 1
+            for pattern in response.get("patterns_identified", []):
+                patterns[pattern] = patterns.get(pattern, 0) + 1
+            crisis_total += response.get("crisis_level", 0)
+            try:
+                hour = str(datetime.fromisoformat(entry["timestamp"]).hour)
+            except (KeyError, TypeError, ValueError):
+                continue
+            by_hour = emotions_by_hour.setdefault(hour, {})
+            by_hour[emotion] = by_hour.get(emotion, 0) + 1
         
-        finally:
-            self.is_learning = False
+        return {
+            "conversations_analyzed": len(memory),
+            "emotion_frequencies": emotions,
+            "pattern_frequencies": patterns,
+            "emotions_by_hour": emotions_by_hour,
+            "average_crisis_level": round(crisis_total / len(memory), 3) if memory else 0.0,
+            "updated_at": datetime.now().isoformat()
+        }
+
+    def _train_network(self, network: NeuralNetwork) -> NeuralNetwork:
+        """Simulated training step on a private copy of the network"""
+        for layer in network.layers:
+            layer.activation = min(layer.activation + np.random.uniform(0.01, 0.05), 1.0)
+        
+        network.accuracy += np.random.uniform(0.1, 0.5)
+        network.connections += np.random.randint(5, 15)
+        network.training_epochs += 1
+        return network
+
+    def _publish_learning(self, learned_patterns: Dict[str, Any], network: NeuralNetwork, insights: List[AIInsight]):
+        """Swap in a learning run's results in one step, with no await in between"""
+        self.learned_patterns = learned_patterns
+        self.neural_network = network
+        # Keep only last 10 insights
+        self.insights_generated = (self.insights_generated + insights)[-10:]
+        self.insight_count += len(insights)
+        self._touch_views("status", "insights")
 
-    async def _generate_new_insights(self):
+    def _generate_new_insights(self) -> List[AIInsight]:
         """Generate new AI insights based on accumulated data"""
-        insights = [
+        return [
             AIInsight(
                 type="pattern",
                 title="Evening Anxiety Pattern Detected",
@@ -550,24 +688,57 @@ class NeuraWellAI:
                 timestamp=datetime.now()
             )
         ]
-        
-        self.insights_generated.extend(insights)
-        
-        # Keep only last 10 insights
-        if len(self.insights_generated) > 10:
-            self.insights_generated = self.insights_generated[-10:]
 
-    async def continuous_learning(self):
+    async def continuous_learning(self, should_pause: Optional[Callable[[], bool]] = None):
         """Background continuous learning process"""
         while True:
             try:
                 await asyncio.sleep(300)  # Learn every 5 minutes
+                # Yield the loop to request traffic while the service is saturated
+                while should_pause is not None and should_pause():
+                    logger.info("Service saturated, deferring background learning")
+                    await asyncio.sleep(5)
                 if not self.is_learning and len(self.conversation_memory) > 0:
-                    await self.learn()
+                    self.learn()
             except Exception as e:
                 logger.error(f"Error in continuous learning: {e}")
                 await asyncio.sleep(60)  # Wait 1 minute before retrying
 
+    def trim_memory(self, level: str) -> Dict[str, Any]:
+        """Release memory when over budget; "hard" evicts every unpinned profile"""
+        idle_seconds = self.user_profiles.idle_seconds / 4 if level == "soft" else 0
+        evicted = self.user_profiles.evict_idle(idle_seconds=idle_seconds)
+        
+        keep = CONVERSATION_MEMORY_KEEP[level]
+        dropped = max(len(self.conversation_memory) - keep, 0)
+        if dropped:
+            self.conversation_memory = self.conversation_memory[-keep:]
+        return {"profiles_evicted": evicted, "conversations_dropped": dropped}
+
+    def memory_report(self, sample: int = 100) -> Dict[str, Any]:
+        """Approximate deep sizes of the agent's in-memory structures"""
+        def entry(obj, count):
+            return {"count": count, "approx_mb": round(deep_sizeof(obj, sample) / (1024 * 1024), 3)}
+        
+        profiles = self.user_profiles.resident_profiles()
+        return {
+            "user_profiles": {
+                **entry(profiles, len(profiles)),
+                **self.user_profiles.get_stats()
+            },
+            "conversation_memory": entry(self.conversation_memory, len(self.conversation_memory)),
+            "current_thoughts": entry(self.current_thoughts, len(self.current_thoughts)),
+            "insights_generated": entry(self.insights_generated, len(self.insights_generated)),
+            "learned_patterns": entry(self.learned_patterns, len(self.learned_patterns)),
+            "crisis_events": entry(self.crisis_bus.recent, len(self.crisis_bus.recent)),
+            "jobs": entry(self.jobs.list(), len(self.jobs.list())),
+            "snapshot": {
+                "profiles": len(self._snapshot) if self._snapshot is not None else 0,
+                "mapped_mb": round(os.path.getsize(self._snapshot.path) / (1024 * 1024), 3)
+                if self._snapshot is not None else 0
+            }
+        }
+
     def get_capabilities(self) -> Dict[str, Any]:
         """Get AI capabilities and status"""
         return {
@@ -594,9 +765,25 @@ class NeuraWellAI:
         """Get current AI thoughts"""
         return [thought.dict() for thought in self.current_thoughts[-10:]]
 
+    def get_thoughts_since(self, cursor: int) -> tuple:
+        """Thoughts added after ``cursor`` (a previous ``thought_count``) and the new cursor"""
+        added = self.thought_count - cursor
+        thoughts = self.current_thoughts[-added:] if added > 0 else []
+        return [thought.dict() for thought in thoughts], self.thought_count
+
+    def get_insights(self) -> List[Dict[str, Any]]:
+        """Get generated AI insights"""
+        return [insight.dict() for insight in self.insights_generated]
+
+    def get_insights_since(self, cursor: int) -> tuple:
+        """Insights published after ``cursor`` (a previous ``insight_count``) and the new cursor"""
+        added = self.insight_count - cursor
+        insights = self.insights_generated[-added:] if added > 0 else []
+        return [insight.dict() for insight in insights], self.insight_count
+
     async def generate_insights(self) -> List[Dict[str, Any]]:
         """Generate and return AI insights"""
-        return [insight.dict() for insight in self.insights_generated]
+        return self.get_insights()
 
     async def analyze_assessment(self, assessment_data: Dict[str, Any]) -> AssessmentResult:
         """Analyze mental health assessment data"""
@@ -692,47 +879,153 @@ class NeuraWellAI:
             confidence=0.78
         )
 
+    def _state_meta(self) -> Dict[str, Any]:
+        return {
+            "learning_stats": self.learning_stats.dict(),
+            "neural_network": self.neural_network.dict(),
+            "learned_patterns": self.learned_patterns,
+            "personality": self.personality
+        }
+
+    def _apply_state_meta(self, state: Dict[str, Any]):
+        # Load learning stats
+        if "learning_stats" in state:
+            self.learning_stats = LearningStats(**state["learning_stats"])
+        
+        # Load neural network
+        if "neural_network" in state:
+            self.neural_network = NeuralNetwork(**state["neural_network"])
+        
+        # Load other data
+        self.learned_patterns = state.get("learned_patterns", {})
+        self.personality = state.get("personality", self.personality)
+
+    def _snapshot_only(self, user_id: str) -> bool:
+        return user_id not in self.user_profiles and user_id not in self._released_users
+
+    def _all_profile_dicts(self):
+        """Every profile as a dict, including ones still only in the snapshot"""
+        for profile in self.user_profiles.values():
+            yield profile.dict()
+        if self._snapshot is not None:
+            for row in range(len(self._snapshot)):
+                if self._snapshot_only(self._snapshot.user_id_at(row)):
+                    yield self._snapshot.record_at(row)
+
+    def profile_ids(self) -> List[str]:
+        """Every user with a profile on this instance: resident, cold or snapshot-only"""
+        user_ids = self.user_profiles.user_ids()
+        if self._snapshot is not None:
+            user_ids.extend(uid for uid in self._snapshot.user_ids() if self._snapshot_only(uid))
+        return user_ids
+
+    def export_profiles(self, user_ids: List[str]) -> List[Dict[str, Any]]:
+        """Profiles of the given users, for handing them to another shard"""
+        exported = []
+        for user_id in user_ids:
+            profile = self.user_profiles.get(user_id)
+            if profile is not None:
+                exported.append(profile.dict())
+            elif self._snapshot is not None and user_id not in self._released_users:
+                record = self._snapshot.get(user_id)
+                if record is not None:
+                    exported.append(record)
+        return exported
+
+    def release_profiles(self, user_ids: List[str]) -> int:
+        """Forget users another shard has taken over"""
+        for user_id in user_ids:
+            self.user_profiles.discard(user_id)
+            self._released_users.add(user_id)
+        if user_ids:
+            self._touch_views("status")
+        return len(user_ids)
+
+    def import_profiles(self, profiles: List[Dict[str, Any]]) -> int:
+        """Take over handed-off profiles; a newer local copy is kept. Returns how many were taken"""
+        imported = 0
+        for data in profiles:
+            profile = UserProfile(**data)
+            existing = self.user_profiles.get(profile.user_id)
+            if existing is not None and existing.last_interaction > profile.last_interaction:
+                continue
+            self._released_users.discard(profile.user_id)
+            self.user_profiles.put(profile.user_id, profile)
+            imported += 1
+        if imported:
+            self._touch_views("status")
+        return imported
+
     def _save_state(self):
         """Save AI state to file"""
         try:
-            state = {
-                "user_profiles": {uid: profile.dict() for uid, profile in self.user_profiles.items()},
-                "learning_stats": self.learning_stats.dict(),
-                "neural_network": self.neural_network.dict(),
-                "learned_patterns": self.learned_patterns,
-                "personality": self.personality
-            }
+            if STATE_FORMAT == "binary":
+                self._save_snapshot()
+                logger.info("AI state snapshot saved successfully")
+                return
             
-            os.makedirs("data", exist_ok=True)
-            with open("data/ai_state.json", "w") as f:
-                json.dump(state, f, default=str)
+            os.makedirs(os.path.dirname(STATE_PATH) or ".", exist_ok=True)
+            # Write then rename so a crash or a concurrent worker never leaves a torn file
+            tmp_path = f"{STATE_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                self._write_json_state(f)
+            os.replace(tmp_path, STATE_PATH)
             
             logger.info("AI state saved successfully")
         except Exception as e:
             logger.error(f"Error saving AI state: {e}")
 
+    def _write_json_state(self, f):
+        """Stream the JSON state one profile at a time, so saving never holds them all as dicts"""
+        f.write('{"user_profiles": {')
+        for i, profile in enumerate(self._all_profile_dicts()):
+            f.write(", " if i else "")
+            f.write(f"{json.dumps(profile['user_id'])}: {json.dumps(profile, default=str)}")
+        f.write("}")
+        for key, value in self._state_meta().items():
+            f.write(f", {json.dumps(key)}: {json.dumps(value, default=str)}")
+        f.write("}")
+
+    def _save_snapshot(self):
+        """Write a binary snapshot; untouched profiles are copied without decoding"""
+        writer = SnapshotWriter(SNAPSHOT_PATH, self._state_meta())
+        for profile in self.user_profiles.values():
+            writer.add(profile.dict())
+        previous = self._snapshot
+        if previous is not None:
+            for row in range(len(previous)):
+                if self._snapshot_only(previous.user_id_at(row)):
+                    writer.add_raw(previous, row)
+        writer.close()
+        
+        # Remap the new file; the old mapping stays valid until closed
+        self._snapshot = SnapshotReader(SNAPSHOT_PATH)
+        if previous is not None:
+            try:
+                previous.close()
+            except BufferError:
+                logger.warning("Previous snapshot still referenced, leaving it mapped")
+
     def _load_state(self):
         """Load AI state from file"""
         try:
-            if os.path.exists("data/ai_state.json"):
-                with open("data/ai_state.json", "r") as f:
+            # Prefer the configured format; fall back to the other one when migrating
+            use_snapshot = os.path.exists(SNAPSHOT_PATH) and (
+                STATE_FORMAT == "binary" or not os.path.exists(STATE_PATH)
+            )
+            if use_snapshot:
+                self._snapshot = SnapshotReader(SNAPSHOT_PATH)
+                self._apply_state_meta(self._snapshot.meta)
+                logger.info(f"AI state snapshot mapped ({len(self._snapshot)} profiles)")
+            elif os.path.exists(STATE_PATH):
+                with open(STATE_PATH, "r") as f:
                     state = json.load(f)
                 
                 # Load user profiles
                 for uid, profile_data in state.get("user_profiles", {}).items():
                     self.user_profiles[uid] = UserProfile(**profile_data)
                 
-                # Load learning stats
-                if "learning_stats" in state:
-                    self.learning_stats = LearningStats(**state["learning_stats"])
-                
-                # Load neural network
-                if "neural_network" in state:
-                    self.neural_network = NeuralNetwork(**state["neural_network"])
-                
-                # Load other data
-                self.learned_patterns = state.get("learned_patterns", {})
-                self.personality = state.get("personality", self.personality)
+                self._apply_state_meta(state)
                 
                 logger.info("AI state loaded successfully")
         except Exception as e:
@@ -740,4 +1033,11 @@ class NeuraWellAI:
 
     async def save_state(self):
         """Async wrapper for saving state"""
-        self._save_state()
\ No newline at end of file
+        self._save_state()
+
+    async def shutdown(self):
+        """Stop background schedulers and jobs, then persist state"""
+        await self.jobs.stop()
+        await self.memory.stop()
+        await self.emotion_scheduler.stop()
+        await self.save_state()
\ No newline at end of file
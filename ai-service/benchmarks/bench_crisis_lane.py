@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Crisis fast-lane latency under synthetic load.
+
+Drives ordinary traffic through an InferenceScheduler backed by a stub model
+while a fraction of messages are crisis-flagged. Reports the time from message
+arrival to delivery on a crisis subscriber, and scheduler latency for crisis
+vs ordinary messages with and without the priority lane.
+
+    python benchmarks/bench_crisis_lane.py --requests 2000 --concurrency 256
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crisis import CrisisEventBus
+from inference_scheduler import InferenceScheduler, PRIORITY_CRISIS, PRIORITY_NORMAL
+
+SCREEN = re.compile("kill myself|suicide|end it all|better off dead")
+
+
+def stub_model(items):
+    time.sleep(0.008 + 0.0005 * len(items))
+    return [0] * len(items)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def run(requests, concurrency, crisis_ratio, use_priority):
+    bus = CrisisEventBus()
+    scheduler = InferenceScheduler(stub_model, name="bench", max_batch_size=16, max_wait_ms=5)
+    scheduler.start()
+    subscription = bus.subscribe()
+    delivery = []
+    latencies = {"crisis": [], "normal": []}
+
+    async def consume():
+        async for event in subscription:
+            delivery.append((time.perf_counter() - event["arrived"]) * 1000)
+
+    consumer = asyncio.create_task(consume())
+    rng = random.Random(7)
+    messages = [
+        "I want to kill myself" if rng.random() < crisis_ratio else "work has been stressful lately"
+        for _ in range(requests)
+    ]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(user, message):
+        async with semaphore:
+            arrived = time.perf_counter()
+            flagged = SCREEN.search(message.lower()) is not None
+            if flagged:
+                bus.publish(user, "prescreen", 3, arrived=arrived)
+            priority = PRIORITY_CRISIS if flagged and use_priority else PRIORITY_NORMAL
+            await scheduler.submit(message, priority)
+            latencies["crisis" if flagged else "normal"].append((time.perf_counter() - arrived) * 1000)
+
+    await asyncio.gather(*(one(f"user{i}", m) for i, m in enumerate(messages)))
+    await asyncio.sleep(0)
+    consumer.cancel()
+    subscription.close()
+    await scheduler.stop()
+    return delivery, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--crisis-ratio", type=float, default=0.02)
+    args = parser.parse_args()
+    logging.getLogger("crisis").setLevel(logging.ERROR)
+
+    for use_priority in (False, True):
+        delivery, latencies = asyncio.run(run(args.requests, args.concurrency, args.crisis_ratio, use_priority))
+        label = "priority lane" if use_priority else "fifo"
+        print(f"[{label}]")
+        if delivery:
+            print(f"  escalation delivery  p50 {statistics.median(delivery):.3f} ms  p99 {percentile(delivery, 99):.3f} ms")
+        for kind in ("crisis", "normal"):
+            values = latencies[kind]
+            if values:
+                print(
+                    f"  {kind:<6} pipeline   p50 {statistics.median(values):7.1f} ms  "
+                    f"p99 {percentile(values, 99):7.1f} ms  (n={len(values)})"
+                )
+
+
+if __name__ == "__main__":
+    main()
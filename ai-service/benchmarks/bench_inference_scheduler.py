@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Throughput vs latency benchmark for the inference micro-batching scheduler.
+
+Uses a deterministic stub model whose cost is a fixed per-call overhead plus a
+small per-item cost, which is the shape of a CPU transformer forward pass.
+
+    python benchmarks/bench_inference_scheduler.py --requests 400 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_scheduler import InferenceScheduler
+
+
+def make_stub_model(call_overhead_ms: float, per_item_ms: float):
+    def batch_fn(items):
+        time.sleep((call_overhead_ms + per_item_ms * len(items)) / 1000.0)
+        return [len(item) % 7 for item in items]
+    return batch_fn
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(scheduler: InferenceScheduler, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            await scheduler.submit(f"message {i}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    scheduler.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    await scheduler.stop()
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--call-overhead-ms", type=float, default=8.0)
+    parser.add_argument("--per-item-ms", type=float, default=0.5)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    model = make_stub_model(args.call_overhead_ms, args.per_item_ms)
+    print(f"{'max_batch':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'avg batch':>9}")
+    for max_batch in (1, 4, 16, 64):
+        scheduler = InferenceScheduler(model, name="bench", max_batch_size=max_batch, max_wait_ms=args.max_wait_ms)
+        elapsed, latencies = asyncio.run(run(scheduler, args.requests, args.concurrency))
+        stats = scheduler.get_stats()
+        print(
+            f"{max_batch:>9} {args.requests / elapsed:>9.1f} "
+            f"{statistics.median(latencies):>8.1f} {percentile(latencies, 95):>8.1f} "
+            f"{percentile(latencies, 99):>8.1f} {stats['avg_batch_size']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
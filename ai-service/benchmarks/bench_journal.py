@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Journal analysis cost at 1KB / 100KB / 1MB, whole-message vs sectioned.
+
+"whole" runs one entry through the chat pipeline's text stages as a single
+message (crisis screen, sentiment, emotion keyword counts, themes, crisis
+assessment); "sections" cuts it with journal.split_sections and runs the
+same stages per section. Reports total time, time per KB (flat when cost is
+linear), the longest single step, which is how long the event loop is held
+at once, and the sectioned time when a crisis keyword sits 1% into the
+entry. Uses the standard-library stand-ins from bench_message_features.
+
+    python benchmarks/bench_journal.py --sizes 1000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_message_features import FILLER, load_matchers, sentiment
+from journal import JOURNAL_SECTION_CHARS, split_sections
+from message_features import MessageFeatures
+
+
+def analyze(text, m):
+    features = MessageFeatures(text, sentiment=sentiment)
+    hits = features.hits(m["crisis"])
+    features.polarity
+    [features.count(matcher) for matcher in m["emotions"]]
+    [theme for theme in m["themes"] if theme in features.lower]
+    features.any(m["intensity"])
+    features.count(m["crisis"]) + features.count(m["crisis_intensity"])
+    return hits
+
+
+def whole(text, m, section_chars):
+    started = time.perf_counter()
+    analyze(text, m)
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed, 1
+
+
+def sections(text, m, section_chars):
+    longest = 0.0
+    count = 0
+    started = time.perf_counter()
+    step = started
+    for start, end in split_sections(text, section_chars):
+        hits = analyze(text[start:end], m)
+        count += 1
+        now = time.perf_counter()
+        longest = max(longest, now - step)
+        step = now
+        if hits:
+            break
+    return time.perf_counter() - started, longest, count
+
+
+def make_entry(rng, size, crisis_at=None):
+    vocabulary = FILLER + ["worried.", "tired,", "deadline!", "happy", "work", "family.\n\n"]
+    words, length = [], 0
+    while length < size:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        length += len(word) + 1
+    text = " ".join(words)[:size]
+    if crisis_at is not None:
+        at = int(size * crisis_at)
+        text = text[:at] + " I want to end it all. " + text[at:]
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--section-chars", type=int, default=JOURNAL_SECTION_CHARS)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    m = load_matchers()
+    print(f"{'size':>9} {'mode':>9} {'sections':>9} {'total ms':>10} {'us/KB':>8} {'longest step ms':>16}")
+    for size in args.sizes:
+        entry = make_entry(rng, size)
+        crisis_entry = make_entry(rng, size, crisis_at=0.01)
+        for name, fn, text in (
+            ("whole", whole, entry),
+            ("sections", sections, entry),
+            ("crisis@1%", sections, crisis_entry),
+        ):
+            total, longest, count = fn(text, m, args.section_chars)
+            print(f"{size:>9} {name:>9} {count:>9} {total * 1e3:>10.2f} "
+                  f"{total * 1e6 / (size / 1000):>8.1f} {longest * 1e3:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
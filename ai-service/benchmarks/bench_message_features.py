@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Per-message text work across the analysis stages, legacy vs MessageFeatures.
+
+"legacy" lower-cases, splits and scans the message in every stage the way
+_prescreen_crisis, _score_emotion, _identify_patterns, _calculate_confidence
+and _assess_crisis_level did on their own; "features" builds one
+MessageFeatures and lets the stages share it. Reports best-of-N latency,
+tracemalloc peak and how many lower()/split() copies each message costs.
+Sentiment is a stand-in scorer so the benchmark runs on the standard library
+alone.
+
+    python benchmarks/bench_message_features.py --requests 20000 --words 40
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_features import MessageFeatures
+
+RULESET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rulesets", "default.json")
+FILLER = "today I went to work and then came home to my family but could not sleep again".split()
+
+
+class Matcher:
+    """Same semantics as ruleset.KeywordMatcher, without the models import"""
+
+    def __init__(self, keywords):
+        self.keywords = tuple(k.lower() for k in keywords)
+        ordered = sorted(set(self.keywords), key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(k) for k in ordered)) if ordered else None
+
+    def any(self, text_lower):
+        return self._pattern is not None and self._pattern.search(text_lower) is not None
+
+    def count(self, text_lower):
+        return len(self.hits(text_lower))
+
+    def hits(self, text_lower):
+        if not self.any(text_lower):
+            return ()
+        return tuple(k for k in self.keywords if k in text_lower)
+
+
+class CountingStr(str):
+    """str that counts the copies lower() and split() make of it"""
+
+    calls = 0
+
+    def lower(self):
+        CountingStr.calls += 1
+        return str.lower(self)
+
+    def split(self, *args):
+        CountingStr.calls += 1
+        return str.split(self, *args)
+
+
+def load_matchers():
+    with open(RULESET) as f:
+        spec = json.load(f)
+    crisis = spec["crisis"]
+    return {
+        "emotions": [Matcher(words) for words in spec["emotion_keywords"].values()],
+        "intensity": Matcher(spec["patterns"]["intensity_markers"]),
+        "crisis": Matcher(crisis["keywords"]),
+        "crisis_intensity": Matcher(crisis["intensity_words"]),
+        "themes": spec["patterns"]["themes"],
+    }
+
+
+def sentiment(text):
+    # Stand-in for TextBlob: tokenizes and scores the text on every call
+    words = text.lower().split()
+    return (sum(len(w) for w in words) % 7 - 3) / 3
+
+
+def legacy(message, m):
+    m["crisis"].hits(message.lower())
+    message_lower = message.lower()
+    polarity = sentiment(message)
+    scores = [matcher.count(message_lower) for matcher in m["emotions"]]
+    message_lower = message.lower()
+    themes = [theme for theme in m["themes"] if theme in message_lower]
+    detailed = len(message.split()) > 50 or len(message.split()) < 5
+    intense = m["intensity"].any(message_lower)
+    long = len(message.split()) > 20
+    message_lower = message.lower()
+    level = m["crisis"].count(message_lower) + m["crisis_intensity"].count(message_lower)
+    return polarity, scores, themes, detailed, intense, long, level
+
+
+def shared(message, m):
+    features = MessageFeatures(message, sentiment=sentiment)
+    features.hits(m["crisis"])
+    polarity = features.polarity
+    scores = [features.count(matcher) for matcher in m["emotions"]]
+    themes = [theme for theme in m["themes"] if theme in features.lower]
+    detailed = features.word_count > 50 or features.word_count < 5
+    intense = features.any(m["intensity"])
+    long = features.word_count > 20
+    level = features.count(m["crisis"]) + features.count(m["crisis_intensity"])
+    return polarity, scores, themes, detailed, intense, long, level
+
+
+def run(name, fn, messages, matchers, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for message in messages:
+            fn(message, matchers)
+        best = min(best, time.perf_counter() - started)
+
+    CountingStr.calls = 0
+    for message in messages[:1000]:
+        fn(CountingStr(message), matchers)
+    copies = CountingStr.calls / min(len(messages), 1000)
+
+    tracemalloc.start()
+    for message in messages[:1000]:
+        fn(message, matchers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>9} {best / len(messages) * 1e6:>10.1f} {peak / 1024:>10.1f} {copies:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    matchers = load_matchers()
+    vocabulary = FILLER + ["Worried", "TIRED", "really", "hopeless", "deadline", "happy", "upset"]
+    messages = [" ".join(rng.choice(vocabulary) for _ in range(args.words)) for _ in range(args.requests)]
+    for a, b in zip(messages[:200], messages[:200]):
+        assert legacy(a, matchers) == shared(b, matchers)
+
+    print(f"{'mode':>9} {'us/msg':>10} {'peak KiB':>10} {'copies/msg':>12}")
+    run("legacy", legacy, messages, matchers, args.repeat)
+    run("features", shared, messages, matchers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Resident memory vs total user count for the profile LRU.
+
+Creates ``--users`` profiles with ``--history`` entries each through a
+ProfileCache with a small memory budget and prints process RSS, resident
+profiles and eviction/rehydration counters at checkpoints. RSS should level
+off once the budget is reached, however many users exist in total.
+
+    python benchmarks/bench_profile_cache.py --users 200000 --budget-mb 32
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import UserProfile
+from profile_cache import ProfileCache
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--history", type=int, default=20)
+    parser.add_argument("--budget-mb", type=float, default=32)
+    parser.add_argument("--revisit", type=float, default=0.1, help="fraction of requests for earlier users")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ProfileCache(cold_path=os.path.join(tmp, "cold.db"), max_mb=args.budget_mb,
+                             max_entries=10 ** 9, idle_seconds=0)
+        started = time.perf_counter()
+        print(f"{'users':>9} {'rss MB':>8} {'resident':>9} {'evictions':>10} {'rehydrated':>10}")
+        for i in range(args.users):
+            if i and rng.random() < args.revisit:
+                cache.get(f"user-{rng.randrange(i)}")
+            profile = UserProfile(
+                user_id=f"user-{i}",
+                preferences={},
+                conversation_history=[
+                    {"message": "I have been feeling anxious about work", "emotion": "anxiety",
+                     "patterns": [], "timestamp": datetime.now().isoformat()}
+                    for _ in range(args.history)
+                ],
+                emotional_patterns={"anxiety": args.history},
+                learned_insights=[],
+                last_interaction=datetime.now(),
+            )
+            cache.put(profile.user_id, profile)
+            if (i + 1) % max(args.users // 10, 1) == 0:
+                stats = cache.get_stats()
+                print(f"{i + 1:>9} {rss_mb():>8.1f} {stats['resident']:>9} {stats['evictions']:>10} "
+                      f"{stats['rehydrations']:>10}")
+        print(f"{args.users / (time.perf_counter() - started):.0f} profiles/s")
+        cache.cold.close()
+
+
+if __name__ == "__main__":
+    main()
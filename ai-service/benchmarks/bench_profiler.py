@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Request profiler overhead: disabled, sampling and cProfile.
+
+Runs concurrent asyncio "requests" that each do the per-message text
+analysis from bench_message_features a few times with awaits in between,
+wrapped in RequestProfiler.profile() the way the endpoints are. Reports
+requests/s with no wrapper, with the wrapper but no session (the normal
+production state), and with a sampling or cProfile session covering every
+request. Standard library only.
+
+    python benchmarks/bench_profiler.py --requests 3000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_message_features import FILLER, load_matchers, shared
+from profiler import CPROFILE, SAMPLE, RequestProfiler
+
+
+async def workload(messages, matchers, concurrency, wrap):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def request(i, message):
+        async with slots:
+            with wrap("chat", f"user-{i % 50}"):
+                for _ in range(4):
+                    shared(message, matchers)
+                    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(i, message) for i, message in enumerate(messages)))
+    return len(messages) / (time.perf_counter() - started)
+
+
+async def run(args):
+    rng = random.Random(7)
+    matchers = load_matchers()
+    vocabulary = FILLER + ["Worried", "TIRED", "really", "hopeless", "deadline", "happy", "upset"]
+    messages = [" ".join(rng.choice(vocabulary) for _ in range(40)) for _ in range(args.requests)]
+    profiler = RequestProfiler()
+
+    def unwrapped(endpoint, user_id):
+        return _NULL
+
+    print(f"{'profiler':>24} {'req/s':>10} {'vs none':>9}")
+    baseline = None
+    cases = [
+        ("none", None, None),
+        ("disabled", None, None),
+        ("sample 5ms", SAMPLE, 5),
+        ("sample 1ms", SAMPLE, 1),
+        ("sample 5ms, one user", SAMPLE, 5),
+        ("cprofile", CPROFILE, None),
+    ]
+    for name, mode, interval in cases:
+        best = 0.0
+        for _ in range(args.repeat):
+            session = None
+            if mode is not None:
+                user_id = "user-7" if "one user" in name else None
+                session = asyncio.create_task(profiler.run(mode, seconds=600, user_id=user_id, interval_ms=interval))
+                await asyncio.sleep(0)
+            wrap = unwrapped if name == "none" else profiler.profile
+            best = max(best, await workload(messages, matchers, args.concurrency, wrap))
+            if session is not None:
+                profiler.session.finished.set()
+                await session
+        baseline = baseline or best
+        print(f"{name:>24} {best:>10.0f} {(best / baseline - 1) * 100:>+8.1f}%")
+
+
+class _Null:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _Null()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Chat response payload size and encode/compress CPU, full vs sparse fields.
+
+"full" builds everything process_message returns (recommendations, reasoning,
+the last five thoughts) and encodes it; "sparse" builds and encodes only
+``text`` and ``crisis_level`` the way _sparse_response does. Each body is
+then compressed as it would go over the wire: gzip for REST (levels 1, 6, 9)
+and permessage-deflate for /ws, with and without context takeover (one
+compressor per connection vs one per message). Response text comes from the
+default ruleset. Only the standard library is used, so the full path here
+skips pydantic validation and jsonable_encoder and understates its real cost.
+
+    python benchmarks/bench_response_fields.py --responses 5000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+import zlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RULESET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rulesets", "default.json")
+
+
+class Thought:
+    """Stand-in for ThoughtProcess with the same fields"""
+
+    def __init__(self, step, kind, content, confidence):
+        self.step, self.type, self.content = step, kind, content
+        self.confidence = confidence
+        self.timestamp = datetime.now()
+
+    def dict(self):
+        return {
+            "step": self.step,
+            "type": self.type,
+            "content": self.content,
+            "confidence": self.confidence,
+            "timestamp": self.timestamp,
+        }
+
+
+def make_inputs(rng, spec):
+    emotion = rng.choice(["anxiety", "depression", "stress", "joy"])
+    patterns = rng.sample(sorted(spec["pattern_responses"]), rng.randint(0, 2))
+    text = (
+        rng.choice(spec["response_templates"][emotion])
+        + "".join(spec["pattern_responses"][p] for p in patterns)
+        + rng.choice(spec["guidance"][emotion])
+    )
+    thoughts = [
+        Thought(f"Step {i}", kind, f"{kind}: {text[:60]}", rng.uniform(0.7, 0.95))
+        for i, kind in enumerate(["analysis", "emotion", "pattern", "generation", "analysis"], 1)
+    ]
+    return emotion, patterns, text, rng.randint(0, 10), thoughts
+
+
+def full(inputs, spec):
+    emotion, patterns, text, crisis_level, thoughts = inputs
+    recommendations = list(spec["recommendations"]["emotions"].get(emotion, []))
+    recommendations += [spec["recommendations"]["patterns"][p] for p in patterns if p in spec["recommendations"]["patterns"]]
+    return json.dumps({
+        "text": text,
+        "confidence": 0.85,
+        "reasoning": f"Emotion-based response for {emotion} with {len(patterns)} patterns identified",
+        "emotion_detected": emotion,
+        "patterns_identified": patterns,
+        "recommendations": recommendations[:spec["recommendations"]["limit"]],
+        "crisis_level": crisis_level,
+        "timestamp": datetime.now().isoformat(),
+        "thinking_process": [
+            {k: v.isoformat() if isinstance(v, datetime) else str(v) for k, v in t.dict().items()}
+            for t in thoughts[-5:]
+        ],
+    })
+
+
+def sparse(inputs, spec):
+    _, _, text, crisis_level, _ = inputs
+    return json.dumps({"text": text, "crisis_level": crisis_level})
+
+
+def deflate_stream():
+    """permessage-deflate with context takeover: one compressor per connection"""
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return lambda data: (compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+
+def deflate_message(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return (compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+
+def timed(fn, items):
+    started = time.process_time()
+    out = [fn(item) for item in items]
+    return out, (time.process_time() - started) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--responses", type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(RULESET) as f:
+        spec = json.load(f)
+    rng = random.Random(7)
+    inputs = [make_inputs(rng, spec) for _ in range(args.responses)]
+
+    print(f"{'fields':>7} {'encoding':>18} {'bytes/msg':>10} {'cpu us/msg':>11}")
+    for name, build in (("full", full), ("sparse", sparse)):
+        bodies, cpu = timed(lambda item: build(item, spec).encode(), inputs)
+        print(f"{name:>7} {'build+json':>18} {sum(map(len, bodies)) / len(bodies):>10.0f} {cpu:>11.1f}")
+        for level in (1, 6, 9):
+            out, cpu = timed(lambda body: gzip.compress(body, compresslevel=level, mtime=0), bodies)
+            print(f"{name:>7} {f'gzip -{level}':>18} {sum(map(len, out)) / len(out):>10.0f} {cpu:>11.1f}")
+        out, cpu = timed(deflate_message, bodies)
+        print(f"{name:>7} {'deflate/message':>18} {sum(map(len, out)) / len(out):>10.0f} {cpu:>11.1f}")
+        out, cpu = timed(deflate_stream(), bodies)
+        print(f"{name:>7} {'deflate/connection':>18} {sum(map(len, out)) / len(out):>10.0f} {cpu:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
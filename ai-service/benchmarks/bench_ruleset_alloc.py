@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Per-request allocation of the template/keyword/recommendation stage.
+
+"legacy" rebuilds the emotion-keyed dicts and lists on every call, the way
+_generate_response, _generate_guidance, _generate_recommendations and
+_assess_crisis_level did before the ruleset was compiled; "compiled" reads
+the immutable tuples from CompiledRuleset.
+
+    python benchmarks/bench_ruleset_alloc.py --requests 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import EmotionType
+from ruleset import DEFAULT_RULESET_PATH, CompiledRuleset
+
+MESSAGES = [
+    ("I'm so worried about my deadline at work", EmotionType.ANXIETY, ["high_emotional_intensity"]),
+    ("I feel hopeless and tired, I want to give up", EmotionType.DEPRESSION, []),
+    ("Had a great day, feeling grateful", EmotionType.JOY, ["brief_communication"]),
+    ("can't sleep again", EmotionType.NEUTRAL, ["late_night_communication"]),
+]
+
+
+def legacy_request(spec, rng, message, emotion, patterns):
+    # Fresh containers per call, mirroring the old inline literals
+    templates = {EmotionType(k): list(v) for k, v in spec["response_templates"].items()}
+    response = rng.choice(list(templates.get(emotion, templates[EmotionType.NEUTRAL])))
+    guidance = {EmotionType(k): list(v) for k, v in spec["guidance"].items()}
+    response += rng.choice(list(guidance.get(emotion, list(spec["default_guidance"]))))
+
+    crisis_keywords = list(spec["crisis"]["keywords"])
+    message_lower = message.lower()
+    crisis = sum(3 for k in crisis_keywords if k in message_lower)
+    intensity_words = list(spec["crisis"]["intensity_words"])
+    crisis += sum(1 for k in intensity_words if k in message_lower)
+
+    recommendations = []
+    if crisis > 5:
+        recommendations.extend(list(spec["recommendations"]["crisis"]))
+    emotion_recs = {EmotionType(k): list(v) for k, v in spec["recommendations"]["emotions"].items()}
+    recommendations.extend(emotion_recs.get(emotion, []))
+    return response, crisis, recommendations[:5]
+
+
+def compiled_request(rules, rng, message, emotion, patterns):
+    response = rng.choice(rules.templates_for(emotion))
+    response += rng.choice(rules.guidance_for(emotion))
+
+    message_lower = message.lower()
+    crisis = rules.crisis_keywords.count(message_lower) * rules.crisis_keyword_weight
+    crisis += rules.crisis_intensity.count(message_lower) * rules.crisis_intensity_weight
+
+    recommendations = []
+    if crisis > rules.crisis_threshold:
+        recommendations.extend(rules.crisis_recommendations)
+    recommendations.extend(rules.recommendations_for(emotion))
+    return response, crisis, recommendations[:rules.recommendation_limit]
+
+
+def measure(name, fn, target, requests):
+    rng = random.Random(0)
+
+    # Peak transient memory per request, averaged over the sample
+    tracemalloc.start()
+    peaks = 0
+    for i in range(requests):
+        message, emotion, patterns = MESSAGES[i % len(MESSAGES)]
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(target, rng, message, emotion, patterns)
+        peaks += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for i in range(requests):
+        message, emotion, patterns = MESSAGES[i % len(MESSAGES)]
+        fn(target, rng, message, emotion, patterns)
+    per_call_us = (time.perf_counter() - started) / requests * 1e6
+    print(f"{name:>9} {peaks / requests:>18.0f} {per_call_us:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(DEFAULT_RULESET_PATH) as f:
+        spec = json.load(f)
+    rules = CompiledRuleset(spec, source=DEFAULT_RULESET_PATH)
+
+    print(f"{'mode':>9} {'peak bytes/request':>18} {'us/request':>10}")
+    measure("legacy", legacy_request, spec, args.requests)
+    measure("compiled", compiled_request, rules, args.requests)
+
+
+if __name__ == "__main__":
+    main()
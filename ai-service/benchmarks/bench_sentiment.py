@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Sentiment scorers: lexicon vs TextBlob agreement and throughput.
+
+Accuracy is measured on a hand-labelled corpus of check-in style messages
+(negations, intensifiers, contrasts and neutral ones included), for each
+scorer against the labels, and lexicon vs TextBlob as correlation, sign
+agreement and agreement on the polarity bands emotion scoring acts on
+(< -0.3, > 0.3, |p| > 0.5). Throughput compares TextBlob, one message at a
+time, with the lexicon scorer at several batch sizes on a larger generated
+corpus. Needs numpy, and textblob for the comparison.
+
+The corpus was written alongside lexicons/sentiment.tsv, so the lexicon's
+accuracy here is optimistic; use --corpus with an independently labelled
+TSV (label<TAB>message, labels -1/0/1) before changing SENTIMENT_SCORER.
+
+    python benchmarks/bench_sentiment.py --messages 20000 --words 40
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from sentiment import LexiconSentiment
+
+# (hand label: -1 negative, 0 neutral, +1 positive, message)
+CORPUS = [
+    (+1, "I feel really happy today, the walk helped a lot"),
+    (-1, "I'm so tired and overwhelmed with work deadlines"),
+    (-1, "Not feeling great, I couldn't sleep at all last night"),
+    (0, "Honestly I am not sad, just a bit bored"),
+    (-1, "Everything feels hopeless and I don't see the point"),
+    (+1, "I had a wonderful time with my family this weekend"),
+    (-1, "My anxiety is really bad before exams"),
+    (-1, "I'm worried about money and the future"),
+    (0, "Work was fine, nothing special"),
+    (+1, "I am extremely grateful for my friends"),
+    (-1, "I hate how angry I get at small things"),
+    (-1, "I feel lonely since I moved to the new city"),
+    (+1, "Therapy is helping, I feel calmer and more in control"),
+    (-1, "I'm not happy with how the meeting went"),
+    (+1, "Today was a good day"),
+    (-1, "Today was a terrible day"),
+    (-1, "I'm frustrated that nothing I try seems to work"),
+    (-1, "I feel numb and empty most of the time"),
+    (+1, "I'm excited about starting my new job next week"),
+    (+1, "I don't feel anxious anymore when I wake up"),
+    (-1, "The panic attacks are getting worse"),
+    (+1, "I am proud of myself for going to the gym"),
+    (-1, "I'm kind of stressed but managing"),
+    (0, "It was an okay week, some ups and downs"),
+    (-1, "I feel like a failure at everything"),
+    (+1, "My sister has been so supportive lately"),
+    (-1, "I'm scared I'll never get better"),
+    (+1, "I feel pretty calm tonight"),
+    (0, "I'm not sure how I feel about it"),
+    (0, "I went to the store and cooked dinner"),
+    (-1, "Sleep has been awful, I'm exhausted"),
+    (+1, "Meditation makes me feel peaceful and relaxed"),
+    (-1, "I'm very disappointed in myself"),
+    (-1, "I'm irritated and everyone is annoying me"),
+    (+1, "I had a nice chat with an old friend"),
+    (-1, "Nothing feels good anymore"),
+    (+1, "I feel safe and loved at home"),
+    (-1, "My boss put a lot of pressure on me today"),
+    (-1, "I'm really really tired of feeling this way"),
+    (-1, "I am slightly nervous about tomorrow"),
+    (+1, "Life is beautiful when I slow down"),
+    (-1, "I feel worthless and like a burden to everyone"),
+    (-1, "The weather is nice but I'm still sad"),
+    (+1, "I'm hopeful things will improve"),
+    (-1, "I'm not angry, just hurt"),
+    (+1, "I love my dog, he makes me happy"),
+    (-1, "I'm stuck and don't know what to do"),
+    (+1, "I got the promotion, I'm thrilled"),
+    (-1, "I keep crying for no reason"),
+    (+1, "Things are better than last month"),
+    (+1, "I'm content with where I am"),
+    (0, "It's been a stressful but productive day"),
+    (-1, "I'm afraid of being alone"),
+    (-1, "My head aches and I feel sick"),
+    (+1, "Not bad, actually pretty good"),
+    (+1, "I'm relieved the surgery went well"),
+    (-1, "I feel insecure around new people"),
+    (-1, "I never feel rested no matter how much I sleep"),
+    (+1, "I'm doing well, thanks for asking"),
+    (-1, "Everything is a mess and I'm falling apart"),
+]
+
+FILLER = ["the", "a", "and", "my", "at", "work", "today", "about", "with", "week", "because", "it", "was"]
+
+
+# Labels are read off polarity with this neutral band
+NEUTRAL_BAND = 0.1
+
+
+def generated_corpus(count, words, rng):
+    corpus = [word for _, message in CORPUS for word in message.split()]
+    vocabulary = FILLER * 4 + corpus
+    return [" ".join(rng.choice(vocabulary) for _ in range(words)) for _ in range(count)]
+
+
+def read_corpus(path):
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                label, message = line.rstrip("\n").split("\t", 1)
+                corpus.append((int(label), message))
+    return corpus
+
+
+def band(p):
+    return np.where(p < -0.3, -1, np.where(p > 0.3, 1, 0))
+
+
+def accuracy(name, polarities, labels):
+    p = np.asarray(polarities)
+    predicted = np.where(p < -NEUTRAL_BAND, -1, np.where(p > NEUTRAL_BAND, 1, 0))
+    polar = labels != 0
+    print(f"{name + ' label accuracy':>28} {(predicted == labels).mean():.1%}"
+          f"  (polar messages {(predicted[polar] == labels[polar]).mean():.1%})")
+
+
+def agreement(lexicon, reference):
+    a, b = np.asarray(lexicon), np.asarray(reference)
+    print(f"{'pearson r':>28} {np.corrcoef(a, b)[0, 1]:.3f}")
+    sign = (np.sign(np.round(a, 2)) == np.sign(np.round(b, 2))).mean()
+    print(f"{'sign agreement':>28} {sign:.1%}")
+    print(f"{'band agreement (+-0.3)':>28} {(band(a) == band(b)).mean():.1%}")
+    print(f"{'strong agreement (|p|>0.5)':>28} {((abs(a) > 0.5) == (abs(b) > 0.5)).mean():.1%}")
+    print(f"{'mean |difference|':>28} {abs(a - b).mean():.3f}")
+
+
+def rate(fn, messages):
+    started = time.perf_counter()
+    fn(messages)
+    return len(messages) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 16, 256, 4096])
+    parser.add_argument("--show", action="store_true", help="print each corpus message's scores")
+    parser.add_argument("--corpus", help="labelled TSV (label<TAB>message) to use instead of the built-in corpus")
+    parser.add_argument("--vader", action="store_true", help="layer the lexicon over NLTK's vader_lexicon")
+    args = parser.parse_args()
+
+    scorer = LexiconSentiment.load(use_vader=args.vader)
+    print(f"lexicon: {scorer.get_stats()['entries']} entries from {', '.join(scorer.sources)}")
+    try:
+        from textblob import TextBlob
+    except ImportError:
+        TextBlob = None
+        print("textblob not installed; skipping agreement and TextBlob throughput")
+
+    corpus = read_corpus(args.corpus) if args.corpus else CORPUS
+    labels = np.array([label for label, _ in corpus])
+    texts = [message for _, message in corpus]
+    ours = scorer.polarities(texts)
+    print(f"{'messages':>28} {len(texts)}")
+    accuracy("lexicon", ours, labels)
+    theirs = None
+    if TextBlob is not None:
+        theirs = np.array([TextBlob(message).sentiment.polarity for message in texts])
+        accuracy("textblob", theirs, labels)
+        agreement(ours, theirs)
+    if args.show:
+        for (label, message), a, b in zip(corpus, ours, theirs if theirs is not None else ours):
+            print(f"{label:+d} {a:+.2f} {b:+.2f}  {message}")
+
+    messages = generated_corpus(args.messages, args.words, random.Random(7))
+    print(f"\nthroughput, {args.messages} messages of {args.words} words")
+    print(f"{'scorer':>20} {'msgs/s':>10} {'us/msg':>8}")
+    if TextBlob is not None:
+        sample = messages[: max(1, args.messages // 10)]
+        r = rate(lambda batch: [TextBlob(m).sentiment.polarity for m in batch], sample)
+        print(f"{'textblob':>20} {r:>10.0f} {1e6 / r:>8.1f}")
+    for size in args.batches:
+        def batched(batch, size=size):
+            for i in range(0, len(batch), size):
+                scorer.polarities(batch[i:i + size])
+        r = max(rate(batched, messages) for _ in range(3))
+        print(f"{f'lexicon batch {size}':>20} {r:>10.0f} {1e6 / r:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
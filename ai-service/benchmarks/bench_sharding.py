@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+User sharding: ring balance, handoff size and throughput scaling.
+
+By default reports, for each shard count, how evenly users spread over the
+ring (max/mean shard load), how many users move when one shard is added or
+removed (ideal: 1/N), and lookup cost. Standard library only.
+
+``--live`` also measures end-to-end throughput: for each shard count it
+starts ``router.py --spawn N`` (N single-worker instances behind the router)
+and drives closed-loop /ai/chat load through it with the traffic replayer.
+That needs the service's full dependencies and free ports from 8100 up.
+
+    python benchmarks/bench_sharding.py --users 100000 --shards 1 2 4 8
+    python benchmarks/bench_sharding.py --live --shards 1 2 4 --requests 4000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_ring import HashRing
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def shard_urls(count):
+    return [f"http://127.0.0.1:{8101 + i}" for i in range(count)]
+
+
+def ring_report(users, counts, vnodes):
+    print(f"{'shards':>6} {'max/mean load':>14} {'moved on add':>13} {'moved on remove':>16} {'ideal':>7} {'lookup us':>10}")
+    for count in counts:
+        ring = HashRing(shard_urls(count), vnodes=vnodes)
+        started = time.perf_counter()
+        owners = [ring.owner(user) for user in users]
+        lookup = (time.perf_counter() - started) / len(users) * 1e6
+        load = {}
+        for owner in owners:
+            load[owner] = load.get(owner, 0) + 1
+        balance = max(load.values()) / (len(users) / count)
+
+        grown = ring.copy()
+        grown.add(shard_urls(count + 1)[-1])
+        added = sum(1 for user, owner in zip(users, owners) if grown.owner(user) != owner) / len(users)
+        removed = "-"
+        if count > 1:
+            shrunk = ring.copy()
+            shrunk.remove(shard_urls(count)[-1])
+            removed = f"{sum(1 for user, owner in zip(users, owners) if shrunk.owner(user) != owner) / len(users):.1%}"
+        print(f"{count:>6} {balance:>14.3f} {added:>13.1%} {removed:>16} {1 / (count + 1):>7.1%} {lookup:>10.2f}")
+
+
+def live_report(args):
+    import httpx
+
+    from traffic import Replayer, print_report
+
+    for count in args.shards:
+        router = subprocess.Popen(
+            [sys.executable, "router.py", "--spawn", str(count), "--host", "127.0.0.1", "--port", "8100",
+             "--shard-base-port", "8101", "--data-dir", f"data/bench-shards-{count}"],
+            cwd=SERVICE_DIR,
+        )
+        try:
+            deadline = time.monotonic() + 180
+            while True:
+                try:
+                    if httpx.get("http://127.0.0.1:8100/router/shards", timeout=2).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline or router.poll() is not None:
+                    raise RuntimeError(f"router with {count} shards did not start")
+                time.sleep(1)
+
+            records = [
+                {"t": 0.0, "e": "chat", "u": f"user-{i % args.users}", "w": args.words}
+                for i in range(args.requests)
+            ]
+            replayer = Replayer("http://127.0.0.1:8100", speed=1.0, concurrency=args.concurrency, seed=7)
+            elapsed = asyncio.run(replayer.run(iter(records)))
+            print(f"\n{count} shard(s), {args.requests} requests, concurrency {args.concurrency}")
+            print_report(replayer.report(elapsed))
+        finally:
+            router.send_signal(signal.SIGTERM)
+            router.wait(timeout=120)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--vnodes", type=int, default=256)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--words", type=int, default=20)
+    args = parser.parse_args()
+
+    users = [f"user-{i}" for i in range(args.users)]
+    ring_report(users, args.shards, args.vnodes)
+    if args.live:
+        args.users = min(args.users, 5000)
+        live_report(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Dashboard polling benchmark for the versioned view cache.
+
+Simulates dashboards polling a status-sized view while the underlying state
+changes once every ``--change-every`` polls, and compares per-poll cost of
+re-serializing on every poll, serving the cached body, and answering 304 to
+clients that send If-None-Match.
+
+    python benchmarks/bench_view_cache.py --polls 20000 --change-every 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from view_cache import ViewCache
+
+
+def make_state():
+    now = datetime.now().isoformat()
+    return {
+        "status": "active",
+        "capabilities": {"supported_emotions": ["anxiety", "depression", "stress", "joy", "anger", "sadness", "neutral"]},
+        "learning_stats": {"total_interactions": 0, "patterns_learned": 12, "accuracy_score": 0.81},
+        "neural_network": {
+            "layers": [{"name": f"Layer {i}", "neurons": 128 * (i + 1), "activation": 0.8, "weights": None} for i in range(7)],
+            "connections": 2847,
+        },
+        "thoughts": [
+            {"step": f"Step {i}", "type": "analysis", "content": "Processing message " * 4, "confidence": 0.9, "timestamp": now}
+            for i in range(10)
+        ],
+    }
+
+
+def run(mode, polls, change_every):
+    state = make_state()
+    version = [0]
+    cache = ViewCache()
+    cache.register("status", lambda: state, lambda: version[0])
+    client_etag = None
+    sent = 0
+
+    started = time.perf_counter()
+    for i in range(polls):
+        if i and i % change_every == 0:
+            state["learning_stats"]["total_interactions"] += 1
+            version[0] += 1
+        if mode == "rebuild":
+            body = json.dumps(state, separators=(",", ":")).encode("utf-8")
+            sent += len(body)
+            continue
+        snapshot = cache.get("status")
+        if mode == "conditional" and snapshot.matches(client_etag):
+            continue
+        client_etag = snapshot.etag
+        sent += len(snapshot.body)
+    elapsed = time.perf_counter() - started
+    return elapsed / polls * 1e6, sent / polls, cache.stats["rebuilds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--polls", type=int, default=20000)
+    parser.add_argument("--change-every", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'mode':>12} {'us/poll':>9} {'bytes/poll':>11} {'rebuilds':>9}")
+    for mode in ("rebuild", "cached", "conditional"):
+        us, sent, rebuilds = run(mode, args.polls, args.change_every)
+        print(f"{mode:>12} {us:>9.2f} {sent:>11.0f} {rebuilds if mode != 'rebuild' else args.polls:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Streaming bulk import of historical conversations into user profiles.
+
+Input is NDJSON (optionally gzipped), one message per line::
+
+    {"user_id": "u1", "message": "I could not sleep again", "timestamp": "2024-03-02T23:41:00Z"}
+
+``text`` is accepted for ``message``; an ``emotion`` value skips emotion
+analysis for that row. Lines are read incrementally and analyzed in chunks
+on a process pool; profiles are merged on the caller's side with the
+original timestamps, through the profile cache, so neither the file nor the
+full set of profiles has to fit in memory. No responses are generated.
+
+Pool workers are spawned, not forked: a fork of the running service would
+copy its whole heap and any lock its other threads held at that moment.
+They import only this module's light dependencies (the ruleset, message
+features and sentiment scorer), never the agent. The merge runs on the
+event loop but yields to it between rows, so requests keep being served
+while an import runs.
+
+    python bulk_import.py export.ndjson.gz                 # offline, service stopped
+    python bulk_import.py export.ndjson.gz --url http://localhost:8000 --token $ADMIN_TOKEN
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from message_features import MessageFeatures
+from models import EmotionType
+from ruleset import CompiledRuleset, load_ruleset, score_emotion
+from sentiment import sentiment_polarities
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "500"))
+IMPORT_PROCESSES = int(os.getenv("IMPORT_PROCESSES", "0")) or os.cpu_count() or 1
+IMPORT_DIR = os.getenv("IMPORT_DIR", "data/imports")
+
+MAX_ERRORS_REPORTED = 20
+
+# Per-process ruleset for pool workers, set by _init_worker
+_worker_rules: Optional[CompiledRuleset] = None
+
+
+def _init_worker(ruleset_path: str):
+    global _worker_rules
+    _worker_rules = load_ruleset(ruleset_path)
+
+
+def _analyze_chunk(texts: List[str]) -> List[str]:
+    """Emotion per message, run in a pool worker"""
+    features = [MessageFeatures(text) for text in texts]
+    for item, polarity in zip(features, sentiment_polarities(texts)):
+        item.set_polarity(polarity)
+    return [score_emotion(item, _worker_rules).value for item in features]
+
+
+def parse_timestamp(value: Any) -> datetime:
+    """ISO 8601 or epoch seconds; aware times become local naive, like datetime.now()"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    parsed = datetime.fromisoformat(str(value))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def parse_row(line: bytes) -> Tuple[str, str, datetime, Optional[str]]:
+    row = json.loads(line)
+    user_id = row["user_id"]
+    text = row.get("message", row.get("text"))
+    if not isinstance(user_id, str) or not user_id or not isinstance(text, str):
+        raise ValueError("user_id and message must be non-empty strings")
+    emotion = row.get("emotion")
+    if emotion is not None:
+        emotion = EmotionType(emotion).value
+    return user_id, text, parse_timestamp(row["timestamp"]), emotion
+
+
+def _open(path: str):
+    """(line stream, raw file); progress is the raw file's position, compressed or not"""
+    raw = open(path, "rb")
+    return (gzip.GzipFile(fileobj=raw) if path.endswith(".gz") else raw), raw
+
+
+def _pool_context():
+    # A fresh interpreter per worker; it also imports the parent's __main__ as
+    # __mp_main__, which is why the service is started through start.py
+    return multiprocessing.get_context("spawn")
+
+
+class ImportRun:
+    """One import: reads chunks, fans analysis out, merges results in order"""
+
+    def __init__(self, agent, path: str, report: Optional[Callable[[float, str], None]] = None,
+                 chunk_rows: Optional[int] = None, processes: Optional[int] = None):
+        self.agent = agent
+        self.path = path
+        self.report = report or (lambda progress, message: None)
+        self.chunk_rows = chunk_rows or IMPORT_CHUNK_ROWS
+        self.processes = processes or IMPORT_PROCESSES
+        self.total_bytes = os.path.getsize(path)
+        self.stats: Dict[str, Any] = {"rows": 0, "imported": 0, "skipped": 0, "errors": []}
+        self.users = set()
+        self._stream = None
+        self._raw = None
+        self._line_no = 0
+
+    def _read_chunk(self) -> Tuple[List[Tuple[str, str, datetime, Optional[str]]], float, bool]:
+        """Next parsed chunk, the fraction of the file read so far, and whether it hit EOF"""
+        rows = []
+        eof = True
+        for line in self._stream:
+            self._line_no += 1
+            if not line.strip():
+                continue
+            self.stats["rows"] += 1
+            try:
+                rows.append(parse_row(line))
+            except (ValueError, KeyError, TypeError) as e:
+                self.stats["skipped"] += 1
+                if len(self.stats["errors"]) < MAX_ERRORS_REPORTED:
+                    self.stats["errors"].append(f"line {self._line_no}: {e}")
+            if len(rows) >= self.chunk_rows:
+                eof = False
+                break
+        fraction = self._raw.tell() / self.total_bytes if self.total_bytes else 1.0
+        return rows, min(fraction, 1.0), eof
+
+    async def _merge(self, rows: List[Tuple[str, str, datetime, Optional[str]]], emotions: List[str]):
+        agent = self.agent
+        rules = agent.rules.current
+        analyzed = iter(emotions)
+        for user_id, text, timestamp, emotion in rows:
+            emotion = EmotionType(emotion or next(analyzed))
+            profile = agent._get_user_profile(user_id)
+            patterns = agent._identify_patterns(MessageFeatures(text), profile, rules, at=timestamp)
+            agent._update_user_profile(user_id, text, emotion, patterns, timestamp=timestamp)
+            self.users.add(user_id)
+            self.stats["imported"] += 1
+            # Profiles are not thread-safe, so the merge stays on the loop but never holds it
+            await asyncio.sleep(0)
+
+    async def run(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=_pool_context(),
+            initializer=_init_worker,
+            initargs=(self.agent.rules.current.source,),
+        )
+        pending = deque()
+        self._stream, self._raw = await loop.run_in_executor(None, _open, self.path)
+        try:
+            done_reading = False
+            while not done_reading or pending:
+                # Keep a bounded window of chunks in flight; merge them in file order
+                while not done_reading and len(pending) < self.processes * 2:
+                    rows, fraction, done_reading = await loop.run_in_executor(None, self._read_chunk)
+                    if not rows:
+                        break
+                    texts = [text for _, text, _, emotion in rows if emotion is None]
+                    future = loop.run_in_executor(pool, _analyze_chunk, texts) if texts else None
+                    pending.append((rows, future, fraction))
+                if not pending:
+                    break
+                rows, future, fraction = pending.popleft()
+                emotions = await future if future is not None else []
+                await self._merge(rows, emotions)
+                elapsed = time.perf_counter() - started
+                self.report(
+                    fraction * 0.99,
+                    f"{self.stats['imported']} rows imported, {self.stats['imported'] / elapsed:.0f} rows/s"
+                )
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._stream.close()
+            self._raw.close()
+
+        elapsed = time.perf_counter() - started
+        self.agent._touch_views("status")
+        return {
+            **self.stats,
+            "users": len(self.users),
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(self.stats["imported"] / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+async def run_import(agent, path: str, report: Optional[Callable[[float, str], None]] = None,
+                     delete: bool = False, **kwargs) -> Dict[str, Any]:
+    """Import an NDJSON export into ``agent``'s profiles; ``delete`` removes the file afterwards"""
+    try:
+        return await ImportRun(agent, path, report, **kwargs).run()
+    finally:
+        if delete:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _upload(args) -> int:
+    import requests
+
+    headers = {"X-Admin-Token": args.token}
+    if args.path.endswith(".gz"):
+        headers["Content-Encoding"] = "gzip"
+    with open(args.path, "rb") as f:
+        # A file object is streamed, not read into memory
+        response = requests.post(f"{args.url}/ai/import", data=f, headers=headers, timeout=600)
+    response.raise_for_status()
+    body = response.json()
+    # A shard returns one job; the router returns one per shard the rows went to
+    jobs = [entry["job"] for entry in body["jobs"]] if "jobs" in body else [body["job"]]
+    failed = False
+    for job in jobs:
+        print(f"Import job {job['job_id']} queued")
+    for job in jobs:
+        while job["status"] in ("queued", "running"):
+            time.sleep(2)
+            job = requests.get(f"{args.url}/ai/jobs/{job['job_id']}", timeout=30).json()
+            print(f"{job['job_id']} {job['progress'] * 100:5.1f}%  {job['message']}")
+        print(json.dumps({"job_id": job["job_id"], "status": job["status"], "result": job["result"],
+                          "error": job["error"]}, indent=2))
+        failed = failed or job["status"] != "succeeded"
+    return 1 if failed else 0
+
+
+async def _offline(args) -> int:
+    from ai_agent import NeuraWellAI
+
+    agent = NeuraWellAI()
+
+    def report(progress: float, message: str):
+        print(f"{progress * 100:5.1f}%  {message}")
+
+    result = await run_import(agent, args.path, report, chunk_rows=args.chunk_rows, processes=args.processes)
+    agent._save_state()
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import historical conversations (NDJSON) into user profiles")
+    parser.add_argument("path")
+    parser.add_argument("--url", help="upload to a running service instead of importing offline")
+    parser.add_argument("--token", default=os.getenv("ADMIN_TOKEN", ""))
+    parser.add_argument("--chunk-rows", type=int, default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.url:
+        return _upload(args)
+    # Offline mode writes the state file directly; stop the service first
+    return asyncio.run(_offline(args))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CrisisSubscription:
+    """Bounded per-subscriber queue of crisis events"""
+
+    def __init__(self, bus: "CrisisEventBus", max_queue: int):
+        self.bus = bus
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def _offer(self, event: Dict[str, Any]):
+        # A slow dashboard loses its oldest events rather than delaying everyone else
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+
+class CrisisEventBus:
+    """In-process pub/sub for crisis escalations.
+
+    ``publish`` never awaits: it hands the event to synchronous listeners and
+    enqueues it for every async subscriber, so escalation costs the request
+    path microseconds regardless of how many dashboards are attached.
+    """
+
+    def __init__(self, history: int = 100, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self.recent = deque(maxlen=history)
+        self._subscribers: List[CrisisSubscription] = []
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.published = 0
+
+    def subscribe(self, max_queue: Optional[int] = None) -> CrisisSubscription:
+        """Subscribe to future events; iterate the result or await ``get()``"""
+        subscription = CrisisSubscription(self, max_queue or self.max_queue)
+        self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: CrisisSubscription):
+        if subscription in self._subscribers:
+            self._subscribers.remove(subscription)
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """Register a synchronous callback invoked inline on publish"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def publish(self, user_id: str, stage: str, crisis_level: int, **details: Any) -> Dict[str, Any]:
+        """Fan an escalation out to every listener and subscriber"""
+        event = {
+            "type": "crisis",
+            "stage": stage,
+            "user_id": user_id,
+            "crisis_level": crisis_level,
+            "timestamp": datetime.now().isoformat(),
+            "published_at": time.perf_counter(),
+            **details,
+        }
+        self.published += 1
+        self.recent.append(event)
+
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Crisis listener error: {e}")
+        for subscription in list(self._subscribers):
+            subscription._offer(event)
+
+        logger.warning(f"Crisis escalation ({stage}) for user {user_id}, level {crisis_level}")
+        return event
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "published": self.published,
+            "subscribers": len(self._subscribers),
+            "listeners": len(self._listeners),
+            "dropped": sum(s.dropped for s in self._subscribers),
+        }
@@ -0,0 +1,64 @@
+import bisect
+import hashlib
+import os
+from typing import Iterable, List, Optional
+
+
+class HashRing:
+    """Consistent hashing of user IDs onto shards.
+
+    Each shard is placed on the ring at ``vnodes`` pseudo-random points and
+    a key belongs to the shard at the first point clockwise from the key's
+    hash. Adding or removing a shard therefore only moves the keys between
+    its points and their predecessors, about 1/N of them, and leaves every
+    other key where it was.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: Optional[int] = None):
+        self.vnodes = vnodes or int(os.getenv("ROUTER_VNODES", "256"))
+        self._nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._nodes)
+
+    def add(self, node: str):
+        if node not in self._nodes:
+            self._nodes.append(node)
+            self._rebuild()
+
+    def remove(self, node: str):
+        if node in self._nodes:
+            self._nodes.remove(node)
+            self._rebuild()
+
+    def _rebuild(self):
+        points = sorted((self._hash(f"{node}#{i}"), node) for node in self._nodes for i in range(self.vnodes))
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("Hash ring has no nodes")
+        return self._owners[bisect.bisect(self._points, self._hash(key)) % len(self._points)]
+
+    def copy(self) -> "HashRing":
+        ring = HashRing(vnodes=self.vnodes)
+        ring._nodes = list(self._nodes)
+        ring._points = self._points
+        ring._owners = self._owners
+        return ring
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
@@ -0,0 +1,173 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first; crisis-flagged messages jump ahead of ordinary traffic
+PRIORITY_CRISIS = 0
+PRIORITY_NORMAL = 10
+
+
+class InferenceScheduler:
+    """Dynamic micro-batching scheduler for model inference stages.
+
+    Concurrent callers ``submit`` single items; the scheduler collects them
+    until either ``max_batch_size`` items are queued or ``max_wait_ms`` has
+    elapsed since the first one arrived, then runs ``batch_fn`` once on a
+    worker thread and resolves every caller's future with its own result.
+    The queue is ordered by priority, so urgent items are taken first.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[Sequence[Any]], List[Any]],
+        name: str = "inference",
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        workers: int = 1,
+    ):
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch_size = max_batch_size or int(os.getenv("INFERENCE_MAX_BATCH", "16"))
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+        self.workers = workers
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: set = set()
+        self._sequence = itertools.count()
+
+        self.stats: Dict[str, float] = {
+            "requests": 0,
+            "batches": 0,
+            "max_batch_seen": 0,
+            "busy_seconds": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._dispatcher is not None and not self._dispatcher.done()
+
+    def start(self):
+        """Start the dispatcher on the running event loop"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.PriorityQueue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{self.name}-batch")
+        self._dispatcher = self._loop.create_task(self._dispatch_loop())
+        logger.info(
+            f"{self.name} scheduler started (max_batch={self.max_batch_size}, max_wait={self.max_wait_ms}ms)"
+        )
+
+    async def stop(self):
+        """Flush pending work and stop the dispatcher"""
+        if not self.running:
+            return
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        # Drain whatever was queued after the last batch was cut
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            await self._run_batch(pending)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        self._dispatcher = None
+        logger.info(f"{self.name} scheduler stopped")
+
+    async def submit(self, item: Any, priority: int = PRIORITY_NORMAL) -> Any:
+        """Queue a single item and wait for its batched result"""
+        if not self.running:
+            self.start()
+        future = self._loop.create_future()
+        self.stats["requests"] += 1
+        await self._queue.put((priority, next(self._sequence), item, future))
+        return await future
+
+    async def _dispatch_loop(self):
+        while True:
+            # Only cut a batch once a worker is free, so waiting items stay in
+            # the priority queue where urgent ones can still overtake them
+            await self._slots.acquire()
+            first = await self._queue.get()
+            batch = [first]
+            deadline = self._loop.time() + self.max_wait_ms / 1000.0
+
+            try:
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - self._loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Stopped mid-collection: these items are off the queue, so run
+                # them here or their callers would never get an answer
+                self._launch(batch)
+                raise
+
+            # Run the batch without blocking collection of the next one
+            self._launch(batch)
+
+    def _launch(self, batch: List[tuple]):
+        task = self._loop.create_task(self._run_batch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        task.add_done_callback(lambda _: self._slots.release())
+
+    async def _run_batch(self, batch: List[tuple]):
+        items = [entry[2] for entry in batch]
+        started = time.perf_counter()
+        try:
+            results = await self._loop.run_in_executor(self._executor, self.batch_fn, items)
+            if len(results) != len(items):
+                raise ValueError(f"{self.name} batch returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"Error running {self.name} batch: {e}")
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except asyncio.CancelledError:
+            for *_, future in batch:
+                future.cancel()
+            raise
+        finally:
+            self.stats["batches"] += 1
+            self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(items))
+            self.stats["busy_seconds"] += time.perf_counter() - started
+
+        for (*_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        batches = self.stats["batches"] or 1
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "requests": self.stats["requests"],
+            "batches": self.stats["batches"],
+            "avg_batch_size": round(self.stats["requests"] / batches, 2),
+            "max_batch_seen": self.stats["max_batch_seen"],
+            "busy_seconds": round(self.stats["busy_seconds"], 4),
+        }
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class Job:
+    """One background job and its status, progress and accounting"""
+
+    def __init__(self, kind: str, fn: Callable[["JobContext"], Awaitable[Any]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.fn = fn
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.cancel_requested = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+        }
+
+
+class JobContext:
+    """Handed to a running job for progress, cancellation and off-loop work"""
+
+    def __init__(self, manager: "JobManager", job: Job):
+        self._manager = manager
+        self.job = job
+
+    def report(self, progress: float, message: Optional[str] = None):
+        self.job.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.job.message = message
+
+    def check(self):
+        """Cancellation point; call before publishing results"""
+        if self.job.cancel_requested:
+            raise asyncio.CancelledError()
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run CPU-bound work on the job pool, charging its CPU time to the job"""
+        self.check()
+
+        def timed():
+            started = time.thread_time()
+            try:
+                return fn(*args)
+            finally:
+                self.job.cpu_seconds += time.thread_time() - started
+
+        result = await asyncio.get_running_loop().run_in_executor(self._manager._executor, timed)
+        self.check()
+        return result
+
+
+class JobManager:
+    """Bounded background job runner, separate from request serving.
+
+    Jobs are queued and picked up by ``workers`` coroutines; each job's
+    CPU-bound steps run on a dedicated thread pool of the same size, so a
+    learning run never competes with the default executor or the inference
+    scheduler. By default only one job of a kind is pending at a time:
+    submitting a kind that is already queued or running returns the existing
+    job (``dedupe=False`` opts out, e.g. for uploads). Finished jobs are
+    kept for status queries up to ``history``.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        history: Optional[int] = None,
+    ):
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.max_queue = max_queue or int(os.getenv("JOB_MAX_QUEUE", "32"))
+        self.history = history or int(os.getenv("JOB_HISTORY", "100"))
+
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+        self.stats: Dict[str, float] = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "wall_seconds": 0.0,
+            "cpu_seconds": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._worker_tasks)
+
+    def start(self):
+        """Start the workers on the running event loop"""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Job manager started ({self.workers} workers)")
+
+    async def stop(self):
+        """Cancel queued and running jobs and stop the workers"""
+        for job in list(self._jobs.values()):
+            self.cancel(job.id)
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, kind: str, fn: Callable[[JobContext], Awaitable[Any]], dedupe: bool = True) -> Job:
+        """Queue a job, or return the one of the same kind already pending"""
+        existing = self._active.get(kind) if dedupe else None
+        if existing is not None:
+            self.stats["deduplicated"] += 1
+            return existing
+        if self._queue is None:
+            raise RuntimeError("Job manager is not running")
+        if self._queue.qsize() >= self.max_queue:
+            raise JobQueueFull(f"Job queue full ({self.max_queue} pending)")
+
+        job = Job(kind, fn)
+        if dedupe:
+            self._active[kind] = job
+        self._remember(job)
+        self._queue.put_nowait(job)
+        self.stats["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def active(self, kind: str) -> Optional[Job]:
+        return self._active.get(kind)
+
+    def list(self, kind: Optional[str] = None) -> List[Job]:
+        return [job for job in reversed(self._jobs.values()) if kind is None or job.kind == kind]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are left as they are"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_requested = True
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED)
+        elif job._task is not None:
+            job._task.cancel()
+        return job
+
+    def _remember(self, job: Job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.finished:
+                break
+            self._jobs.popitem(last=False)
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.now()
+        if self._active.get(job.kind) is job:
+            del self._active[job.kind]
+        self.stats[status] += 1
+        self.stats["wall_seconds"] += job.wall_seconds
+        self.stats["cpu_seconds"] += job.cpu_seconds
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.status != QUEUED:
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.started_at = datetime.now()
+        started = time.perf_counter()
+        job._task = asyncio.get_running_loop().create_task(job.fn(JobContext(self, job)))
+        try:
+            # wait() does not propagate the job's own cancellation into the worker
+            await asyncio.wait({job._task})
+        except asyncio.CancelledError:
+            job._task.cancel()
+            job.wall_seconds = time.perf_counter() - started
+            self._finish(job, CANCELLED, "Job manager stopped")
+            raise
+        job.wall_seconds = time.perf_counter() - started
+
+        if job._task.cancelled():
+            self._finish(job, CANCELLED)
+        elif job._task.exception() is not None:
+            error = job._task.exception()
+            logger.error(f"Job {job.kind} {job.id} failed: {error}")
+            self._finish(job, FAILED, str(error))
+        else:
+            job.result = job._task.result()
+            job.progress = 1.0
+            self._finish(job, SUCCEEDED)
+        job._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "active": {kind: job.id for kind, job in self._active.items()},
+            "tracked": len(self._jobs),
+            **{k: round(v, 4) if isinstance(v, float) else v for k, v in self.stats.items()},
+        }
@@ -0,0 +1,210 @@
+"""
+Long-form journal analysis: sections analyzed incrementally.
+
+A journal entry is cut into sections of at most ``JOURNAL_SECTION_CHARS``,
+preferring paragraph breaks, then sentence ends, then whitespace. Each
+section goes through the same emotion scheduler and crisis assessment as a
+chat message, so a multi-page entry is a stream of small steps that batch
+with other traffic instead of one long one. The crisis pre-screen runs once
+over the whole entry and escalates before any section is analyzed; reading
+stops at the first section that overlaps a hit, once it has been analyzed.
+Hits are located in the whole entry, so a phrase that a cut splits in two
+still counts for the section it starts in.
+
+Cutting looks for a boundary only in the second half of each window, so
+every step advances at least half a section and no character is scanned
+more than twice: total cost is linear in the length of the entry.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from inference_scheduler import PRIORITY_CRISIS, PRIORITY_NORMAL
+from message_features import MessageFeatures
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MAX_CHARS = int(os.getenv("JOURNAL_MAX_CHARS", "1000000"))
+JOURNAL_SECTION_CHARS = int(os.getenv("JOURNAL_SECTION_CHARS", "2000"))
+JOURNAL_WINDOW = int(os.getenv("JOURNAL_WINDOW", "8"))
+JOURNAL_HISTORY_CHARS = int(os.getenv("JOURNAL_HISTORY_CHARS", "1000"))
+
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s")
+
+# Per-message length patterns say nothing about one section of a long entry
+_LENGTH_PATTERNS = ("detailed_expression", "brief_communication")
+
+
+class JournalTooLarge(ValueError):
+    """Raised when an entry is over the configured size limit"""
+
+
+def split_sections(text: str, max_chars: int) -> Iterator[Tuple[int, int]]:
+    """``(start, end)`` spans of non-blank sections of at most ``max_chars``"""
+    n = len(text)
+    half = max(max_chars // 2, 1)
+    start = 0
+    while start < n:
+        while start < n and text[start].isspace():
+            start += 1
+        if start >= n:
+            return
+        if n - start <= max_chars:
+            yield start, n
+            return
+        low, high = start + half, start + max_chars
+        cut = text.rfind("\n\n", low, high)
+        if cut >= 0:
+            cut += 1
+        else:
+            last = None
+            for last in SENTENCE_END.finditer(text, low, high):
+                pass
+            if last is not None:
+                cut = last.end()
+            else:
+                cut = max(text.rfind(" ", low, high), text.rfind("\n", low, high))
+                cut = cut + 1 if cut >= 0 else high
+        yield start, cut
+        start = cut
+
+
+def _check_size(text: str, max_chars: Optional[int] = None):
+    max_chars = max_chars or JOURNAL_MAX_CHARS
+    if len(text) > max_chars:
+        raise JournalTooLarge(f"Journal entry is {len(text)} characters; the limit is {max_chars}")
+    if not text.strip():
+        raise ValueError("Journal entry is empty")
+
+
+def prescreen_journal(agent, text: str, user_id: str, max_chars: Optional[int] = None) -> tuple:
+    """Crisis keyword hits over the whole entry, escalated at once (one linear scan)"""
+    _check_size(text, max_chars)
+    return agent.prescreen(text, user_id, source="journal")
+
+
+async def analyze_journal(
+    agent,
+    text: str,
+    user_id: str,
+    section_chars: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    window: Optional[int] = None,
+    crisis_hits: Optional[tuple] = None,
+) -> Dict[str, Any]:
+    """Per-section emotion and crisis scores for a long entry, stopping at the first crisis hit.
+
+    ``crisis_hits`` from ``prescreen_journal`` (already escalated) skips the
+    whole-entry pre-screen.
+    """
+    _check_size(text, max_chars)
+    if crisis_hits is None:
+        crisis_hits = prescreen_journal(agent, text, user_id, max_chars)
+    section_chars = section_chars or JOURNAL_SECTION_CHARS
+    window = window or JOURNAL_WINDOW
+    started = time.perf_counter()
+
+    rules = agent.rules.current
+    profile = await agent._load_user_profile(user_id)
+    # The entry was escalated as a whole; its match spans find the section to stop at
+    crisis_spans = rules.crisis_keywords.spans(text) if crisis_hits else []
+    first_hit = crisis_spans[0][0] if crisis_spans else len(text)
+    sections: List[Dict[str, Any]] = []
+    patterns: Dict[str, None] = {}
+    emotions = Counter()
+    words = 0
+    pending = deque()
+    stopped = None
+    analyzed_to = 0
+
+    async def finish_section():
+        nonlocal words
+        index, start, end, features, hits, task = pending.popleft()
+        emotion = await task
+        emotions[emotion] += 1
+        words += features.word_count
+        crisis_level = agent._assess_crisis_level(features, emotion, rules)
+        if hits and crisis_level > rules.crisis_threshold:
+            agent.crisis_bus.publish(
+                user_id, "assessed", crisis_level,
+                emotion=emotion.value, prescreened=True, source="journal", section=index
+            )
+        for pattern in agent._identify_patterns(features, profile, rules):
+            patterns[pattern] = None
+        section = {
+            "index": index,
+            "start": start,
+            "end": end,
+            "emotion": emotion.value,
+            "sentiment": round(features.polarity, 3),
+            "crisis_level": crisis_level,
+        }
+        if hits:
+            section["crisis_keywords"] = list(hits)
+        sections.append(section)
+
+    try:
+        for index, (start, end) in enumerate(split_sections(text, section_chars)):
+            features = MessageFeatures(text[start:end], sentiment=agent._sentiment_polarity)
+            hits = ()
+            if first_hit < end:
+                hits = tuple(dict.fromkeys(keyword for s, e, keyword in crisis_spans if s < end and e > start))
+                # A phrase cut at ``end`` still counts toward this section's crisis level
+                features.set_hits(rules.crisis_keywords, hits)
+            priority = PRIORITY_CRISIS if hits else PRIORITY_NORMAL
+            task = asyncio.ensure_future(agent.emotion_scheduler.submit(features, priority))
+            pending.append((index, start, end, features, hits, task))
+            analyzed_to = end
+            if hits:
+                stopped = "crisis"
+                break
+            if len(pending) >= window:
+                await finish_section()
+        while pending:
+            await finish_section()
+    finally:
+        for *_, task in pending:
+            task.cancel()
+
+    emotion = max(emotions, key=emotions.get)
+    crisis_level = max(section["crisis_level"] for section in sections)
+    for pattern in _LENGTH_PATTERNS:
+        patterns.pop(pattern, None)
+    if words > rules.detailed_word_count:
+        patterns["detailed_expression"] = None
+    patterns = list(patterns)
+
+    # History keeps an excerpt: later theme scans must not walk whole journals
+    excerpt = text[:JOURNAL_HISTORY_CHARS]
+    agent._update_user_profile(user_id, excerpt, emotion, patterns)
+    agent._update_learning_stats()
+    agent.conversation_memory.append({
+        "user_id": user_id,
+        "message": excerpt,
+        "response": {
+            "emotion_detected": emotion.value,
+            "patterns_identified": patterns,
+            "crisis_level": crisis_level,
+        },
+        "timestamp": datetime.now().isoformat()
+    })
+
+    return {
+        "user_id": user_id,
+        "emotion_detected": emotion.value,
+        "crisis_level": crisis_level,
+        "patterns_identified": patterns,
+        "recommendations": agent._generate_recommendations(emotion, patterns, crisis_level, rules),
+        "sections": sections,
+        "total_chars": len(text),
+        "analyzed_chars": analyzed_to,
+        "complete": stopped is None,
+        "stopped": stopped,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
@@ -1,15 +1,30 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
 import asyncio
+import hmac
 import json
 import logging
+import os
+import time
+import uuid
 from datetime import datetime
 from typing import List, Dict, Optional
 import uvicorn
 
 from ai_agent import NeuraWellAI
-from models import ChatMessage, AIResponse, LearningStats, UserProfile
+from admission import AdmissionController, Rejected
+from inference_scheduler import PRIORITY_CRISIS, PRIORITY_NORMAL
+from jobs import JobQueueFull
+from view_cache import ViewCache
+from push import PushHub
+from traffic import TrafficCapture
+from profiler import CPROFILE, SAMPLE, RequestProfiler
+import bulk_import
+import journal
+import sentiment
+from models import ChatMessage, AIResponse, JournalEntry, parse_response_fields
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,9 +41,139 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip for clients that send Accept-Encoding: gzip; small bodies are not worth it
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=int(os.getenv("GZIP_MIN_BYTES", "500")),
+    compresslevel=int(os.getenv("GZIP_LEVEL", "6")),
+)
+
+# Longer input belongs in /ai/journal, which analyzes it section by section
+CHAT_MAX_CHARS = int(os.getenv("CHAT_MAX_CHARS", "20000"))
+
+def _chat_too_long(text: str) -> Optional[str]:
+    if CHAT_MAX_CHARS and len(text) > CHAT_MAX_CHARS:
+        return f"Message is {len(text)} characters; the limit is {CHAT_MAX_CHARS} (use /ai/journal for long entries)"
+    return None
+
+# permessage-deflate on /ws, used when the client offers it (uvicorn's websockets backend)
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+
 # Initialize AI Agent
 ai_agent = NeuraWellAI()
 
+# Concurrency limits, bounded wait queue and per-user rate limits
+admission = AdmissionController()
+
+# Opt-in capture of /ai/chat and WebSocket traffic for replay (traffic.py)
+capture = TrafficCapture()
+
+# On-demand request profiling (/ai/debug/profile); a no-op until a session starts
+profiler = RequestProfiler()
+
+# Pre-encoded snapshots of the dashboard views, rebuilt only on change
+views = ViewCache()
+views.register(
+    "status",
+    lambda: jsonable_encoder({
+        "status": "active",
+        "capabilities": ai_agent.get_capabilities(),
+        "learning_stats": ai_agent.get_learning_stats(),
+        "neural_network": ai_agent.get_neural_network_status(),
+        "timestamp": datetime.now().isoformat()
+    }),
+    lambda: ai_agent.view_versions["status"]
+)
+views.register(
+    "insights",
+    lambda: jsonable_encoder({"insights": ai_agent.get_insights(), "timestamp": datetime.now().isoformat()}),
+    lambda: ai_agent.view_versions["insights"]
+)
+views.register(
+    "thoughts",
+    lambda: jsonable_encoder({"thoughts": ai_agent.get_current_thoughts(), "timestamp": datetime.now().isoformat()}),
+    lambda: ai_agent.view_versions["thoughts"]
+)
+
+def _thoughts_delta(cursor):
+    thoughts, cursor = ai_agent.get_thoughts_since(cursor)
+    return (jsonable_encoder(thoughts) if thoughts else None), cursor
+
+def _insights_delta(cursor):
+    insights, cursor = ai_agent.get_insights_since(cursor)
+    return (jsonable_encoder(insights) if insights else None), cursor
+
+def _learning_stats_delta(previous):
+    current = jsonable_encoder(ai_agent.get_learning_stats())
+    changed = {k: v for k, v in current.items() if previous is None or previous.get(k) != v}
+    return (changed or None), current
+
+# Topic subscriptions on /ws/{user_id}; deltas are pushed only on change
+push = PushHub()
+push.register(
+    "thoughts",
+    lambda: (jsonable_encoder(ai_agent.get_current_thoughts()), ai_agent.thought_count),
+    _thoughts_delta
+)
+push.register(
+    "insights",
+    lambda: (jsonable_encoder(ai_agent.get_insights()), ai_agent.insight_count),
+    _insights_delta
+)
+push.register(
+    "learning_stats",
+    lambda: (jsonable_encoder(ai_agent.get_learning_stats()),) * 2,
+    _learning_stats_delta
+)
+PUSH_TOPICS = {"thoughts": "thoughts", "insights": "insights", "status": "learning_stats"}
+ai_agent.add_view_listener(lambda view: push.notify(PUSH_TOPICS[view]))
+
+def cached_view(request: Request, name: str) -> Response:
+    """Serve a view snapshot, or 304 if the client already has it"""
+    snapshot = views.get(name)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if snapshot.matches(request.headers.get("if-none-match")):
+        views.stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+# Shared secret for clinician crisis feeds; unset disables them
+CLINICIAN_TOKEN = os.getenv("CLINICIAN_TOKEN", "")
+
+# Shared secret for admin endpoints (debug, import, profile handoff); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def _token_matches(given: Optional[str], expected: str) -> bool:
+    return bool(given) and hmac.compare_digest(given.encode(), expected.encode())
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Fails closed: admin endpoints answer 403 until ADMIN_TOKEN is configured.
+
+    The token is read from the ``X-Admin-Token`` header so it stays out of
+    access logs.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if not _token_matches(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def require_clinician(x_clinician_token: Optional[str] = Header(None)):
+    """Fails closed like ``require_admin``: crisis feeds carry user IDs and keywords"""
+    if not CLINICIAN_TOKEN:
+        raise HTTPException(status_code=403, detail="Crisis feeds are disabled: CLINICIAN_TOKEN is not set")
+    if not _token_matches(x_clinician_token, CLINICIAN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid clinician token")
+
+# Upper bound on draining sessions and flushing state at shutdown, together
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+_shutdown_started: Optional[float] = None
+
+def begin_shutdown():
+    """Start the SHUTDOWN_TIMEOUT clock; start.py calls this when the drain begins"""
+    global _shutdown_started
+    if _shutdown_started is None:
+        _shutdown_started = time.monotonic()
+
 # WebSocket connections manager
 class ConnectionManager:
     def __init__(self):
@@ -39,12 +184,18 @@ class ConnectionManager:
         await websocket.accept()
         self.active_connections.append(websocket)
         self.user_sessions[user_id] = websocket
+        # Keep the profile resident for the whole session
+        ai_agent.user_profiles.pin(user_id)
         logger.info(f"User {user_id} connected")
 
     def disconnect(self, websocket: WebSocket, user_id: str):
+        if websocket not in self.active_connections:
+            return  # the handshake failed before the session was registered
         self.active_connections.remove(websocket)
+        push.unsubscribe(websocket)
         if user_id in self.user_sessions:
             del self.user_sessions[user_id]
+        ai_agent.user_profiles.unpin(user_id)
         logger.info(f"User {user_id} disconnected")
 
     async def send_personal_message(self, message: str, user_id: str):
@@ -62,60 +213,318 @@ async def root():
     return {"message": "NeuraWell AI Service is running", "status": "active"}
 
 @app.get("/ai/status")
-async def get_ai_status():
+async def get_ai_status(request: Request):
     """Get current AI agent status and capabilities"""
+    return cached_view(request, "status")
+
+@app.get("/ai/metrics")
+async def get_metrics():
+    """Get live service counters (not cached)"""
     return {
-        "status": "active",
-        "capabilities": ai_agent.get_capabilities(),
-        "learning_stats": ai_agent.get_learning_stats(),
-        "neural_network": ai_agent.get_neural_network_status(),
+        "inference": ai_agent.emotion_scheduler.get_stats(),
+        "crisis_events": ai_agent.crisis_bus.get_stats(),
+        "admission": admission.get_stats(),
+        "view_cache": views.get_stats(),
+        "push": push.get_stats(),
+        "profiles": ai_agent.user_profiles.get_stats(),
+        "jobs": ai_agent.jobs.get_stats(),
+        "memory": ai_agent.memory.get_stats(),
+        "profiler": profiler.get_stats(),
+        "sentiment": sentiment.get_stats(),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/ai/debug/memory", dependencies=[Depends(require_admin)])
+async def get_memory_report(
+    sample_seconds: float = 0,
+    top: int = 15,
+    frames: int = 1,
+    check: bool = False
+):
+    """Process RSS, approximate structure sizes, budgets and alarms.
+
+    ``sample_seconds`` > 0 (at most 60) traces allocations for that long and
+    adds the top allocation sites, ``frames`` deep (at most 25); ``check`` runs
+    a budget check (and trimming) now.
+    """
+    report = {"process": ai_agent.memory.get_stats()}
+    if check:
+        report["process"]["level"] = ai_agent.memory.check()
+    report["structures"] = ai_agent.memory_report()
+    report["caches"] = {"view_cache": views.get_stats()}
+    report["alarms"] = list(ai_agent.memory.alarms)
+    if sample_seconds > 0:
+        try:
+            report["tracemalloc"] = await ai_agent.memory.sample_allocations(
+                min(sample_seconds, 60), top=top, frames=frames
+            )
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    report["timestamp"] = datetime.now().isoformat()
+    return report
+
+@app.get("/ai/debug/profile", dependencies=[Depends(require_admin)])
+async def profile_requests(
+    mode: str = SAMPLE,
+    requests: Optional[int] = None,
+    seconds: Optional[float] = None,
+    user_id: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    interval_ms: Optional[float] = None,
+    format: Optional[str] = None,
+    sort: str = "cumulative",
+    limit: int = 50
+):
+    """Profile the next ``requests`` matching requests or the next ``seconds``.
+
+    ``mode=sample`` returns collapsed stacks (flamegraph.pl, speedscope);
+    ``mode=cprofile`` returns pstats text, or with ``format=prof`` the binary
+    stats file for snakeviz or flameprof. ``user_id`` and ``endpoint``
+    (chat, ws, journal) restrict which requests are profiled.
+    """
+    formats = {SAMPLE: ("collapsed",), CPROFILE: ("pstats", "prof")}
+    if mode not in formats:
+        raise HTTPException(status_code=400, detail="mode must be sample or cprofile")
+    format = format or formats[mode][0]
+    if format not in formats[mode]:
+        raise HTTPException(status_code=400, detail=f"{mode} mode supports format={' or '.join(formats[mode])}")
+    if requests is None and seconds is None:
+        seconds = 30
+    try:
+        session = await profiler.run(mode, requests, seconds, user_id, endpoint, interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    headers = {f"X-Profile-{k.replace('_', '-').title()}": str(v) for k, v in session.summary().items() if v is not None}
+    if format == "prof":
+        return Response(content=session.pstats_binary(), media_type="application/octet-stream", headers={
+            **headers, "Content-Disposition": 'attachment; filename="neurawell.prof"'
+        })
+    body = session.collapsed() if format == "collapsed" else session.pstats_text(sort, limit)
+    return Response(content=body, media_type="text/plain", headers=headers)
+
+@app.post("/ai/debug/capture", dependencies=[Depends(require_admin)])
+async def control_capture(action: str):
+    """Start or stop traffic capture (writes to TRAFFIC_CAPTURE_PATH)"""
+    if action == "start":
+        try:
+            capture.start()
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    elif action == "stop":
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, capture.stop)
+    elif action != "status":
+        raise HTTPException(status_code=400, detail="action must be start, stop or status")
+    return capture.get_stats()
+
+@app.get("/ai/profiles/ids", dependencies=[Depends(require_admin)])
+async def list_profile_ids():
+    """Users with a profile on this instance (router handoff)"""
+    return {"user_ids": ai_agent.profile_ids()}
+
+@app.post("/ai/profiles/export", dependencies=[Depends(require_admin)])
+async def export_profiles(payload: dict):
+    """Profiles for ``user_ids``, to be imported by another instance"""
+    return {"profiles": jsonable_encoder(ai_agent.export_profiles(payload.get("user_ids", [])))}
+
+@app.post("/ai/profiles/release", dependencies=[Depends(require_admin)])
+async def release_profiles(payload: dict):
+    """Forget ``user_ids`` once another instance has imported them"""
+    return {"released": ai_agent.release_profiles(payload.get("user_ids", []))}
+
+@app.post("/ai/profiles/import", dependencies=[Depends(require_admin)])
+async def import_profiles(payload: dict):
+    """Take over profiles exported by another instance"""
+    try:
+        return {"imported": ai_agent.import_profiles(payload.get("profiles", []))}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid profile: {e}")
+
+@app.get("/ai/admission")
+async def get_admission_stats():
+    """Get admission control and load shedding counters"""
+    return admission.get_stats()
+
+def _encode_response(response) -> str:
+    """A chat response as JSON text: full AIResponse or a sparse field dict"""
+    if isinstance(response, AIResponse):
+        response = jsonable_encoder(response)
+    return json.dumps(response)
+
 @app.post("/ai/chat")
-async def chat_with_ai(message: ChatMessage):
-    """Send a message to the AI agent and get a response"""
+async def chat_with_ai(message: ChatMessage, fields: Optional[str] = None):
+    """Send a message to the AI agent and get a response.
+
+    ``fields`` (query, comma-separated, or the body's list) selects a subset
+    of the response, e.g. ``?fields=text,crisis_level``.
+    """
     try:
-        response = await ai_agent.process_message(
-            message.text, 
-            message.user_id, 
-            message.context
-        )
+        selected = parse_response_fields(message.fields if message.fields is not None else fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    too_long = _chat_too_long(message.text)
+    if too_long:
+        raise HTTPException(status_code=413, detail=too_long)
+    arrived = time.perf_counter()
+    status = 200
+    # Escalate before waiting for a slot; the hits also pick the crisis lane
+    features, rules, crisis_hits = ai_agent.screen(message.text, message.user_id)
+    priority = PRIORITY_CRISIS if crisis_hits else PRIORITY_NORMAL
+    try:
+        async with admission.slot(message.user_id, priority):
+            with profiler.profile("chat", message.user_id):
+                response = await ai_agent.process_message(
+                    message.text, 
+                    message.user_id, 
+                    message.context,
+                    fields=selected,
+                    crisis_hits=crisis_hits,
+                    features=features,
+                    rules=rules
+                )
+        if selected is not None:
+            # Already JSON-ready; skip response-model validation and encoding
+            return Response(content=json.dumps(response), media_type="application/json")
         return response
+    except Rejected as e:
+        status = 429
+        raise HTTPException(
+            status_code=429,
+            detail=e.reason,
+            headers={"Retry-After": e.retry_after_header}
+        )
     except Exception as e:
+        status = 500
         logger.error(f"Error processing message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if capture.active:
+            capture.record("chat", message.user_id, message.text, arrived, status,
+                           (time.perf_counter() - arrived) * 1000)
+
+@app.post("/ai/journal")
+async def analyze_journal(entry: JournalEntry):
+    """Analyze a long journal entry section by section, stopping at the first crisis hit"""
+    try:
+        # Whole-entry pre-screen escalates before waiting for a slot
+        crisis_hits = journal.prescreen_journal(ai_agent, entry.text, entry.user_id)
+        priority = PRIORITY_CRISIS if crisis_hits else PRIORITY_NORMAL
+        async with admission.slot(entry.user_id, priority):
+            with profiler.profile("journal", entry.user_id):
+                return await journal.analyze_journal(ai_agent, entry.text, entry.user_id, crisis_hits=crisis_hits)
+    except Rejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=e.reason,
+            headers={"Retry-After": e.retry_after_header}
+        )
+    except journal.JournalTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error analyzing journal: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/ai/learn")
+@app.post("/ai/learn", status_code=202)
 async def trigger_learning():
-    """Trigger AI learning process"""
+    """Queue an AI learning run; poll /ai/jobs/{job_id} for progress"""
     try:
-        result = await ai_agent.learn()
-        return {"status": "learning_started", "result": result}
+        job = ai_agent.learn()
+        return {"status": "learning_started", "job": job.to_dict()}
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error triggering learning: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ai/import", status_code=202, dependencies=[Depends(require_admin)])
+async def import_conversations(request: Request):
+    """Stream an NDJSON conversation export to disk and import it as a background job"""
+    compressed = request.headers.get("content-encoding", "").lower() == "gzip"
+    os.makedirs(bulk_import.IMPORT_DIR, exist_ok=True)
+    path = os.path.join(bulk_import.IMPORT_DIR, f"{uuid.uuid4().hex}.ndjson{'.gz' if compressed else ''}")
+    loop = asyncio.get_running_loop()
+    received = 0
+    try:
+        with open(path, "wb") as f:
+            async for chunk in request.stream():
+                received += len(chunk)
+                await loop.run_in_executor(None, f.write, chunk)
+    except Exception as e:
+        os.remove(path)
+        logger.error(f"Error receiving import: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        job = ai_agent.jobs.submit(
+            "import",
+            lambda ctx: bulk_import.run_import(ai_agent, path, ctx.report, delete=True),
+            dedupe=False
+        )
+    except JobQueueFull as e:
+        os.remove(path)
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"status": "import_started", "bytes": received, "job": job.to_dict()}
+
+@app.get("/ai/jobs")
+async def list_jobs(kind: Optional[str] = None):
+    """List recent background jobs, newest first"""
+    return {
+        "jobs": [job.to_dict() for job in ai_agent.jobs.list(kind)],
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/ai/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get a background job's status, progress and result"""
+    job = ai_agent.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/ai/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running background job"""
+    job = ai_agent.jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 @app.get("/ai/insights")
-async def get_ai_insights():
+async def get_ai_insights(request: Request):
     """Get AI-generated insights and patterns"""
     try:
-        insights = await ai_agent.generate_insights()
-        return {"insights": insights, "timestamp": datetime.now().isoformat()}
+        return cached_view(request, "insights")
     except Exception as e:
         logger.error(f"Error getting insights: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/ai/thoughts")
-async def get_ai_thoughts():
+async def get_ai_thoughts(request: Request):
     """Get current AI thought processes"""
     try:
-        thoughts = ai_agent.get_current_thoughts()
-        return {"thoughts": thoughts, "timestamp": datetime.now().isoformat()}
+        return cached_view(request, "thoughts")
     except Exception as e:
         logger.error(f"Error getting thoughts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ai/ruleset")
+async def get_ruleset():
+    """Get the active response ruleset"""
+    return ai_agent.rules.current.describe()
+
+@app.post("/ai/ruleset/reload")
+async def reload_ruleset():
+    """Recompile the ruleset file and swap it in without interrupting requests"""
+    try:
+        loop = asyncio.get_running_loop()
+        ruleset = await loop.run_in_executor(None, ai_agent.rules.reload)
+        return {"status": "reloaded", "ruleset": ruleset.describe()}
+    except Exception as e:
+        logger.error(f"Error reloading ruleset: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/ai/assessment")
 async def process_assessment(assessment_data: dict):
     """Process mental health assessment with AI analysis"""
@@ -139,23 +548,73 @@ async def analyze_mood(mood_data: dict):
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
     """WebSocket endpoint for real-time AI communication"""
-    await manager.connect(websocket, user_id)
     try:
+        admission.connect_ws()
+    except Rejected as e:
+        await websocket.close(code=1013, reason=f"retry-after={e.retry_after_header}")
+        return
+    try:
+        # Inside the try: a failed handshake must still give back the connection slot
+        await manager.connect(websocket, user_id)
         while True:
             # Receive message from client
             data = await websocket.receive_text()
             message_data = json.loads(data)
             
-            # Process with AI
-            response = await ai_agent.process_message(
-                message_data["text"], 
-                user_id, 
-                message_data.get("context", {})
-            )
+            # Topic subscriptions: {"type": "subscribe", "topics": ["thoughts", ...]}
+            if message_data.get("type") in ("subscribe", "unsubscribe"):
+                topics = message_data.get("topics", [])
+                if message_data["type"] == "subscribe":
+                    topics = push.subscribe(websocket, topics, websocket.send_text)
+                else:
+                    push.unsubscribe(websocket, topics)
+                await websocket.send_text(json.dumps({"type": f"{message_data['type']}d", "topics": topics}))
+                continue
+            
+            # Process with AI, shedding when over limits
+            text = message_data["text"]
+            arrived = time.perf_counter()
+            try:
+                selected = parse_response_fields(message_data.get("fields"))
+            except ValueError as e:
+                if capture.active:
+                    capture.record("ws", user_id, text, arrived, 400)
+                await manager.send_personal_message(json.dumps({"type": "error", "detail": str(e)}), user_id)
+                continue
+            too_long = _chat_too_long(text)
+            if too_long:
+                if capture.active:
+                    capture.record("ws", user_id, text, arrived, 413)
+                await manager.send_personal_message(json.dumps({"type": "error", "detail": too_long}), user_id)
+                continue
+            features, rules, crisis_hits = ai_agent.screen(text, user_id)
+            priority = PRIORITY_CRISIS if crisis_hits else PRIORITY_NORMAL
+            try:
+                async with admission.slot(user_id, priority):
+                    with profiler.profile("ws", user_id):
+                        response = await ai_agent.process_message(
+                            text, 
+                            user_id, 
+                            message_data.get("context", {}),
+                            fields=selected,
+                            crisis_hits=crisis_hits,
+                            features=features,
+                            rules=rules
+                        )
+                if capture.active:
+                    capture.record("ws", user_id, text, arrived, 200, (time.perf_counter() - arrived) * 1000)
+            except Rejected as e:
+                if capture.active:
+                    capture.record("ws", user_id, text, arrived, 429)
+                await manager.send_personal_message(
+                    json.dumps({"type": "throttled", "reason": e.reason, "retry_after": e.retry_after_header}),
+                    user_id
+                )
+                continue
             
             # Send AI response back
             await manager.send_personal_message(
-                json.dumps(response.dict()), 
+                _encode_response(response), 
                 user_id
             )
             
@@ -172,29 +631,79 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         manager.disconnect(websocket, user_id)
+    finally:
+        admission.disconnect_ws()
+
+def _crisis_payload(event: Dict) -> str:
+    return json.dumps({k: v for k, v in event.items() if k != "published_at"})
+
+@app.get("/ai/crisis/events", dependencies=[Depends(require_clinician)])
+async def get_crisis_events():
+    """Get the most recent crisis escalations"""
+    events = [json.loads(_crisis_payload(e)) for e in ai_agent.crisis_bus.recent]
+    return {"events": events, "timestamp": datetime.now().isoformat()}
+
+@app.websocket("/ws/clinician/crisis")
+async def crisis_stream(websocket: WebSocket, token: Optional[str] = None):
+    """WebSocket stream of crisis escalations for clinician dashboards.
+
+    The token comes from the ``X-Clinician-Token`` header, or from ``?token=``
+    for browsers, which cannot set headers on a WebSocket.
+    """
+    token = websocket.headers.get("x-clinician-token") or token
+    if not CLINICIAN_TOKEN or not _token_matches(token, CLINICIAN_TOKEN):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    subscription = ai_agent.crisis_bus.subscribe()
+    try:
+        async for event in subscription:
+            await websocket.send_text(_crisis_payload(event))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Crisis stream error: {e}")
+    finally:
+        subscription.close()
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize AI agent on startup"""
     logger.info("Starting NeuraWell AI Service...")
     await ai_agent.initialize()
+    if os.getenv("TRAFFIC_CAPTURE_PATH"):
+        capture.start()
     
     # Start background learning process
-    asyncio.create_task(ai_agent.continuous_learning())
+    asyncio.create_task(ai_agent.continuous_learning(should_pause=lambda: admission.saturated))
     logger.info("AI Agent initialized and learning started")
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Cleanup on shutdown"""
+    """Flush state in what is left of SHUTDOWN_TIMEOUT.
+
+    Uvicorn has already closed the WebSocket sessions (code 1012) and drained
+    requests by now, so the flush gets the rest of the same deadline rather
+    than a second one.
+    """
     logger.info("Shutting down NeuraWell AI Service...")
-    await ai_agent.save_state()
-    logger.info("AI Agent state saved")
+    begin_shutdown()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, capture.stop)
+    remaining = _shutdown_started + SHUTDOWN_TIMEOUT - time.monotonic()
+    try:
+        await asyncio.wait_for(ai_agent.shutdown(), timeout=max(remaining, 1))
+        logger.info("AI Agent state saved")
+    except asyncio.TimeoutError:
+        logger.error("Timed out flushing AI Agent state")
 
 if __name__ == "__main__":
+    # Development entry point; use `python start.py --production` for deployments
     uvicorn.run(
         "main:app", 
-        host="0.0.0.0", 
-        port=8000, 
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+        host=os.getenv("API_HOST", "0.0.0.0"), 
+        port=int(os.getenv("API_PORT", "8000")), 
+        reload=os.getenv("DEBUG", "False").lower() == "true",
+        log_level="info",
+        ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE
+    )
@@ -0,0 +1,209 @@
+import asyncio
+import gc
+import itertools
+import logging
+import os
+import sys
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None), datetime)
+
+# tracemalloc stores this many frames for every live allocation while tracing
+MAX_TRACE_FRAMES = 25
+
+
+def process_memory_mb() -> Dict[str, float]:
+    """Current and peak resident set size of this process"""
+    usage = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    usage["rss_mb"] = round(int(line.split()[1]) / 1024, 2)
+                elif line.startswith("VmHWM:"):
+                    usage["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 2)
+    except OSError:
+        # No procfs (macOS): peak is all getrusage offers
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["peak_rss_mb"] = usage["rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+    return usage
+
+
+def deep_sizeof(obj: Any, sample: int = 100, max_depth: int = 10) -> int:
+    """Approximate recursive size in bytes.
+
+    Containers with more than ``sample`` children are measured on the first
+    ``sample`` of them and extrapolated, so the cost is bounded by the sample
+    size and depth rather than by the size of the structure. Shared objects
+    are counted once.
+    """
+    seen = set()
+
+    def size(o: Any, depth: int) -> float:
+        if id(o) in seen:
+            return 0
+        seen.add(id(o))
+        total = sys.getsizeof(o)
+        if depth >= max_depth or isinstance(o, _ATOMIC):
+            return total
+
+        if isinstance(o, dict):
+            children, count = o.items(), len(o)
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            children, count = o, len(o)
+        elif hasattr(o, "__dict__"):
+            children, count = (vars(o),), 1
+        else:
+            return total
+
+        measured = 0.0
+        taken = 0
+        for child in itertools.islice(children, sample):
+            if isinstance(o, dict):
+                measured += size(child[0], depth + 1) + size(child[1], depth + 1)
+            else:
+                measured += size(child, depth + 1)
+            taken += 1
+        if taken:
+            measured *= count / taken
+        return total + measured
+
+    return int(size(obj, 0))
+
+
+class MemoryMonitor:
+    """Samples process RSS against soft and hard budgets.
+
+    ``check`` runs every ``interval`` seconds once started. Above the soft
+    budget registered trimmers are called with ``"soft"``; above the hard
+    budget with ``"hard"``. Each over-budget check is recorded as an alarm.
+    ``sample_allocations`` turns tracemalloc on only for the requested
+    window, so allocation tracing costs nothing the rest of the time.
+    """
+
+    def __init__(
+        self,
+        soft_mb: Optional[float] = None,
+        hard_mb: Optional[float] = None,
+        interval: Optional[float] = None,
+    ):
+        self.soft_mb = soft_mb if soft_mb is not None else float(os.getenv("MEMORY_SOFT_MB", "768"))
+        self.hard_mb = hard_mb if hard_mb is not None else float(os.getenv("MEMORY_HARD_MB", "1024"))
+        self.interval = interval or float(os.getenv("MEMORY_CHECK_SECONDS", "30"))
+        self.rss_mb = 0.0
+        self.level = "ok"
+        self.alarms = deque(maxlen=50)
+        self._trimmers: List[Callable[[str], Dict[str, Any]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, int] = {"checks": 0, "soft_trims": 0, "hard_trims": 0}
+
+    def add_trimmer(self, trimmer: Callable[[str], Dict[str, Any]]):
+        """``trimmer(level)`` frees what it can and returns what it freed"""
+        self._trimmers.append(trimmer)
+
+    def sample(self) -> float:
+        self.rss_mb = process_memory_mb().get("rss_mb", self.rss_mb)
+        return self.rss_mb
+
+    def _level_for(self, rss_mb: float) -> str:
+        if self.hard_mb and rss_mb > self.hard_mb:
+            return "hard"
+        if self.soft_mb and rss_mb > self.soft_mb:
+            return "soft"
+        return "ok"
+
+    def check(self) -> str:
+        """Sample RSS and trim if over budget; returns the budget level"""
+        self.stats["checks"] += 1
+        before = self.sample()
+        level = self._level_for(before)
+        if level != "ok":
+            trimmed = {}
+            for trimmer in self._trimmers:
+                try:
+                    trimmed.update(trimmer(level))
+                except Exception as e:
+                    logger.error(f"Memory trimmer failed: {e}")
+            gc.collect()
+            after = self.sample()
+            self.stats[f"{level}_trims"] += 1
+            self.alarms.append({
+                "level": level,
+                "rss_before_mb": before,
+                "rss_after_mb": after,
+                "trimmed": trimmed,
+                "timestamp": datetime.now().isoformat(),
+            })
+            if level != self.level:
+                log = logger.error if level == "hard" else logger.warning
+                log(f"Memory over {level} budget: {before} MB RSS, {after} MB after trimming ({trimmed})")
+        elif self.level != "ok":
+            logger.info(f"Memory back under budget: {before} MB RSS")
+        self.level = level
+        return level
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self.sample()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Memory check failed: {e}")
+
+    async def sample_allocations(self, seconds: float, top: int = 15, frames: int = 1) -> List[Dict[str, Any]]:
+        """Trace allocations for ``seconds`` and return the top sites still allocated.
+
+        ``frames`` is clamped to 1..MAX_TRACE_FRAMES: tracing memory grows with it.
+        """
+        frames = min(max(frames, 1), MAX_TRACE_FRAMES)
+        if tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is already running")
+        tracemalloc.start(frames)
+        try:
+            await asyncio.sleep(seconds)
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        return [
+            {
+                "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("traceback" if frames > 1 else "lineno")[:top]
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **process_memory_mb(),
+            "soft_budget_mb": self.soft_mb,
+            "hard_budget_mb": self.hard_mb,
+            "level": self.level,
+            "check_interval_seconds": self.interval,
+            **self.stats,
+        }
@@ -0,0 +1,67 @@
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class MessageFeatures:
+    """Lazily computed, cached features of one message.
+
+    Built once per message and handed to every analysis stage (emotion,
+    patterns, confidence, crisis). Each feature is computed on first access
+    and reused afterwards, so the text is lower-cased, tokenized and
+    sentiment-scored at most once. Assessment free-text fields can be wrapped
+    the same way.
+    """
+
+    def __init__(self, text: str, sentiment: Optional[Callable[[str], float]] = None):
+        self.text = text
+        self._sentiment = sentiment
+        self._hits: Dict[Any, Tuple[str, ...]] = {}
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        return self.text.split()
+
+    @cached_property
+    def word_count(self) -> int:
+        return len(self.tokens)
+
+    @cached_property
+    def is_question(self) -> bool:
+        return "?" in self.text
+
+    @cached_property
+    def polarity(self) -> float:
+        """Sentiment polarity in [-1, 1]; batch scorers may assign it up front"""
+        if self._sentiment is None:
+            raise ValueError("No sentiment scorer attached to these message features")
+        return self._sentiment(self.text)
+
+    def has_polarity(self) -> bool:
+        return "polarity" in self.__dict__
+
+    def set_polarity(self, value: float):
+        self.__dict__["polarity"] = value
+
+    def set_hits(self, matcher: Any, hits: Tuple[str, ...]):
+        """Assign a matcher's hits found elsewhere, e.g. in the text around this message"""
+        self._hits[matcher] = tuple(hits)
+
+    def hits(self, matcher: Any) -> Tuple[str, ...]:
+        """Keywords of a prebuilt matcher found in the message, cached per matcher"""
+        found = self._hits.get(matcher)
+        if found is None:
+            found = self._hits[matcher] = matcher.hits(self.lower)
+        return found
+
+    def count(self, matcher: Any) -> int:
+        return len(self.hits(matcher))
+
+    def any(self, matcher: Any) -> bool:
+        return bool(self.hits(matcher))
+
+    def __repr__(self) -> str:
+        return f"MessageFeatures({self.text[:30]!r}...)"
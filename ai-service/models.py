@@ -22,6 +22,7 @@ class ChatMessage(BaseModel):
     user_id: str
     context: Optional[Dict[str, Any]] = {}
     timestamp: Optional[datetime] = None
+    fields: Optional[List[str]] = None  # AIResponse fields to return; all when omitted
 
 class AIResponse(BaseModel):
     text: str
@@ -34,6 +35,26 @@ class AIResponse(BaseModel):
     timestamp: datetime
     thinking_process: List[Dict[str, str]]
 
+RESPONSE_FIELDS = frozenset(AIResponse.model_fields)
+
+def parse_response_fields(fields) -> Optional[frozenset]:
+    """Validate a field selection (list or comma-separated string); None selects everything"""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    selected = frozenset(name.strip() for name in fields if name and name.strip())
+    unknown = selected - RESPONSE_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown response fields: {', '.join(sorted(unknown))}")
+    if not selected:
+        raise ValueError("Empty response field selection")
+    return selected
+
+class JournalEntry(BaseModel):
+    text: str
+    user_id: str
+
 class UserProfile(BaseModel):
     user_id: str
     preferences: Dict[str, Any]
@@ -0,0 +1,348 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models import UserProfile
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one process per file is up to the deployment
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Connections inherited across fork, kept referenced so the child never closes the parent's
+_INHERITED: List[tuple] = []
+
+
+def estimate_profile_bytes(profile: UserProfile) -> int:
+    """Approximate resident size of a profile (object overhead + history text)"""
+    history = sum(200 + len(entry.get("message", "")) for entry in profile.conversation_history)
+    return 1024 + history + 80 * len(profile.emotional_patterns) + 120 * len(profile.learned_insights)
+
+
+class ColdProfileStore:
+    """Local on-disk tier for evicted profiles (SQLite, one row per user).
+
+    The connection is opened on first use by the process that uses it, so
+    a store created before a fork is never shared with the children. Each
+    file belongs to one process: ``{pid}`` in the path gives every process
+    its own file, and opening a file another live process holds raises
+    instead of sharing its rows. Rows from an earlier run are dropped on
+    open because the saved state file is authoritative at startup; with
+    ``{pid}``, files left by processes that have exited are removed.
+    """
+
+    def __init__(self, path: str):
+        self.path_template = path
+        self.path = path.replace("{pid}", str(os.getpid()))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = None
+        self._pid: Optional[int] = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._open()
+        return self._conn
+
+    def _open(self):
+        if self._conn is not None:
+            # Inherited from the parent; SQLite connections must not be used or closed across fork
+            _INHERITED.append((self._conn, self._lock))
+            self._conn = self._lock = None
+        pid = os.getpid()
+        path = self.path_template.replace("{pid}", str(pid))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if "{pid}" in self.path_template:
+            self._remove_exited(path)
+        lock = open(f"{path}.lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                raise RuntimeError(
+                    f"Cold profile store {path} is in use by another process; "
+                    "put {pid} in PROFILE_COLD_PATH to give each process its own file"
+                ) from None
+        db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        db.execute("DELETE FROM profiles")
+        self.path, self._conn, self._lock, self._pid = path, db, lock, pid
+
+    def _remove_exited(self, own: str):
+        """Delete per-process files whose lock no live process holds"""
+        if fcntl is None:
+            return
+        for lock_path in glob.glob(glob.escape(self.path_template).replace("{pid}", "*") + ".lock"):
+            path = lock_path[:-len(".lock")]
+            if path == own:
+                continue
+            with open(lock_path, "a") as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+                for stale in (path, f"{path}-wal", f"{path}-shm", lock_path):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+
+    def put(self, user_id: str, profile: UserProfile):
+        data = json.dumps(profile.dict(), separators=(",", ":"), default=str)
+        self._db.execute("INSERT OR REPLACE INTO profiles (user_id, data) VALUES (?, ?)", (user_id, data))
+
+    def get(self, user_id: str) -> Optional[UserProfile]:
+        row = self._db.execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return UserProfile(**json.loads(row[0])) if row else None
+
+    def take(self, user_id: str) -> Optional[UserProfile]:
+        """``get`` then ``delete``, for a worker thread (the connection is serialized)"""
+        profile = self.get(user_id)
+        if profile is not None:
+            self.delete(user_id)
+        return profile
+
+    def delete(self, user_id: str):
+        self._db.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,))
+
+    def __contains__(self, user_id: str) -> bool:
+        return self._db.execute("SELECT 1 FROM profiles WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def user_ids(self) -> List[str]:
+        return [row[0] for row in self._db.execute("SELECT user_id FROM profiles")]
+
+    def items(self) -> Iterator[Tuple[str, UserProfile]]:
+        for user_id, data in self._db.execute("SELECT user_id, data FROM profiles"):
+            yield user_id, UserProfile(**json.loads(data))
+
+    def clear(self):
+        self._db.execute("DELETE FROM profiles")
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+            self._lock.close()
+        self._conn = self._lock = None
+
+
+class ProfileCache:
+    """Memory-budgeted LRU of user profiles backed by a cold tier.
+
+    Profiles beyond ``max_mb`` / ``max_entries``, or idle for longer than
+    ``idle_seconds``, are written to the cold store and dropped from memory;
+    ``get`` brings them back transparently, and ``load`` does so with the
+    cold read on a worker thread. Pinned users (open WebSocket sessions) are
+    never evicted.
+    """
+
+    def __init__(
+        self,
+        cold_path: Optional[str] = None,
+        max_mb: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        idle_seconds: Optional[float] = None,
+    ):
+        self.max_bytes = int((max_mb or float(os.getenv("PROFILE_CACHE_MB", "256"))) * 1024 * 1024)
+        self.max_entries = max_entries or int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "50000"))
+        self.idle_seconds = idle_seconds if idle_seconds is not None else float(os.getenv("PROFILE_IDLE_SECONDS", "1800"))
+        # Opened lazily and emptied on open: the saved state file is authoritative at startup
+        self.cold = ColdProfileStore(cold_path or os.getenv("PROFILE_COLD_PATH", "data/profiles_cold_{pid}.db"))
+
+        # user_id -> [profile, estimated bytes, last access]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._pins: Dict[str, int] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.resident_bytes = 0
+        self._last_idle_sweep = time.monotonic()
+
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "idle_evictions": 0,
+            "rehydrations": 0,
+        }
+
+    def get(self, user_id: str) -> Optional[UserProfile]:
+        """Resident profile, rehydrated from the cold tier if it was evicted"""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            self.stats["hits"] += 1
+            entry[2] = time.monotonic()
+            self._entries.move_to_end(user_id)
+            return entry[0]
+
+        profile = self.cold.get(user_id)
+        if profile is None:
+            self.stats["misses"] += 1
+            return None
+        # Resident and cold tiers stay disjoint; the resident copy is authoritative
+        self.cold.delete(user_id)
+        self.stats["rehydrations"] += 1
+        self._insert(user_id, profile)
+        return profile
+
+    async def load(self, user_id: str) -> Optional[UserProfile]:
+        """``get`` for the request path: a cold profile is read and decoded off the event loop.
+
+        Concurrent loads of one user share a single read, so the row is
+        taken from the cold tier exactly once.
+        """
+        if user_id in self._entries:
+            return self.get(user_id)
+        pending = self._loading.get(user_id)
+        if pending is None:
+            pending = self._loading[user_id] = asyncio.ensure_future(self._rehydrate(user_id))
+            pending.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        await asyncio.shield(pending)
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        entry[2] = time.monotonic()
+        self._entries.move_to_end(user_id)
+        return entry[0]
+
+    async def _rehydrate(self, user_id: str):
+        profile = await asyncio.get_running_loop().run_in_executor(None, self.cold.take, user_id)
+        # A profile put meanwhile is newer than the cold copy
+        if profile is not None and user_id not in self._entries:
+            self.stats["rehydrations"] += 1
+            self._insert(user_id, profile)
+
+    def put(self, user_id: str, profile: UserProfile):
+        existing = self._entries.pop(user_id, None)
+        if existing is not None:
+            self.resident_bytes -= existing[1]
+        else:
+            self.cold.delete(user_id)
+        self._insert(user_id, profile)
+
+    def touch(self, user_id: str):
+        """Re-estimate a profile's size after it was mutated in place"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        size = estimate_profile_bytes(entry[0])
+        self.resident_bytes += size - entry[1]
+        entry[1] = size
+        entry[2] = time.monotonic()
+        self._entries.move_to_end(user_id)
+        self._enforce_budget()
+
+    def _insert(self, user_id: str, profile: UserProfile):
+        size = estimate_profile_bytes(profile)
+        self._entries[user_id] = [profile, size, time.monotonic()]
+        self.resident_bytes += size
+        self._enforce_budget()
+        self._maybe_sweep_idle()
+
+    def _evict(self, user_id: str):
+        profile, size, _ = self._entries.pop(user_id)
+        self.cold.put(user_id, profile)
+        self.resident_bytes -= size
+        self.stats["evictions"] += 1
+
+    def _enforce_budget(self):
+        skipped = 0
+        while (self.resident_bytes > self.max_bytes or len(self._entries) > self.max_entries) \
+                and skipped < len(self._entries):
+            user_id = next(iter(self._entries))
+            if user_id in self._pins:
+                # Pinned users rotate to the MRU end so the scan can move on
+                self._entries.move_to_end(user_id)
+                skipped += 1
+                continue
+            self._evict(user_id)
+
+    def _maybe_sweep_idle(self):
+        now = time.monotonic()
+        if self.idle_seconds <= 0 or now - self._last_idle_sweep < min(self.idle_seconds, 60):
+            return
+        self._last_idle_sweep = now
+        self.evict_idle(now)
+
+    def evict_idle(self, now: Optional[float] = None, idle_seconds: Optional[float] = None) -> int:
+        """Move every unpinned profile idle longer than ``idle_seconds`` to the cold tier"""
+        now = now if now is not None else time.monotonic()
+        cutoff = now - (idle_seconds if idle_seconds is not None else self.idle_seconds)
+        idle = [uid for uid, entry in self._entries.items() if entry[2] < cutoff and uid not in self._pins]
+        for user_id in idle:
+            self._evict(user_id)
+        self.stats["idle_evictions"] += len(idle)
+        return len(idle)
+
+    def pin(self, user_id: str):
+        self._pins[user_id] = self._pins.get(user_id, 0) + 1
+
+    def unpin(self, user_id: str):
+        count = self._pins.get(user_id, 0) - 1
+        if count > 0:
+            self._pins[user_id] = count
+        else:
+            self._pins.pop(user_id, None)
+
+    def discard(self, user_id: str):
+        """Drop a profile from both tiers, e.g. after handing it to another shard"""
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self.resident_bytes -= entry[1]
+        self.cold.delete(user_id)
+
+    def __getitem__(self, user_id: str) -> UserProfile:
+        profile = self.get(user_id)
+        if profile is None:
+            raise KeyError(user_id)
+        return profile
+
+    def __setitem__(self, user_id: str, profile: UserProfile):
+        self.put(user_id, profile)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries or user_id in self.cold
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self.cold)
+
+    def items(self) -> Iterator[Tuple[str, UserProfile]]:
+        """Every profile, resident and cold, without rehydrating cold ones"""
+        for user_id, entry in list(self._entries.items()):
+            yield user_id, entry[0]
+        yield from self.cold.items()
+
+    def user_ids(self) -> List[str]:
+        """Every user with a profile, resident or cold, without loading any"""
+        return list(self._entries) + self.cold.user_ids()
+
+    def resident_profiles(self) -> List[UserProfile]:
+        """Profiles currently held in memory, most recently used last"""
+        return [entry[0] for entry in self._entries.values()]
+
+    def values(self) -> Iterator[UserProfile]:
+        for _, profile in self.items():
+            yield profile
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "resident": len(self._entries),
+            "resident_mb": round(self.resident_bytes / (1024 * 1024), 2),
+            "budget_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "max_entries": self.max_entries,
+            "pinned": len(self._pins),
+            "cold": len(self.cold),
+            **self.stats,
+        }
@@ -0,0 +1,246 @@
+import asyncio
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SAMPLE = "sample"
+CPROFILE = "cprofile"
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# Worker threads sampled alongside the event loop (inference batches run there)
+PROFILE_SAMPLE_THREADS = tuple(
+    prefix for prefix in os.getenv("PROFILE_SAMPLE_THREADS", "emotion-batch").split(",") if prefix
+)
+
+MAX_STACK_DEPTH = 128
+
+# Returned when nothing is being profiled, so the request path only pays a lookup
+_NOT_PROFILED = nullcontext()
+
+# A sampled thread whose innermost frame is here is idle, not working
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py")
+
+
+def collapse(frame) -> str:
+    """Root-to-leaf ``function (file:line)`` frames joined by ';', for flamegraph.pl"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class ProfileSession:
+    """One profiling window: which requests it covers and what it collected"""
+
+    def __init__(self, mode: str, requests: Optional[int], seconds: float,
+                 user_id: Optional[str], endpoint: Optional[str], interval_ms: float):
+        self.mode = mode
+        self.requests = requests
+        self.seconds = seconds
+        self.user_id = user_id
+        self.endpoint = endpoint
+        self.interval = interval_ms / 1000
+        self.admitted = 0
+        self.completed = 0
+        self.inflight: set = set()
+        self.finished = asyncio.Event()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+        self.profile = cProfile.Profile() if mode == CPROFILE else None
+        self._profiling = False
+        self.samples: Counter = Counter()
+        self.sample_ticks = 0
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def wants(self, endpoint: str, user_id: Optional[str]) -> bool:
+        return (
+            (self.requests is None or self.admitted < self.requests)
+            and (self.endpoint is None or self.endpoint == endpoint)
+            and (self.user_id is None or self.user_id == user_id)
+        )
+
+    def enter(self) -> Optional[asyncio.Task]:
+        task = asyncio.current_task()
+        self.admitted += 1
+        self.inflight.add(task)
+        if self.profile is not None and not self._profiling:
+            try:
+                self.profile.enable()
+                self._profiling = True
+            except ValueError as e:
+                # Another profiler already owns the profiling hook
+                logger.warning(f"cProfile unavailable: {e}")
+        return task
+
+    def exit(self, task: Optional[asyncio.Task]):
+        self.inflight.discard(task)
+        self.completed += 1
+        if self._profiling and not self.inflight:
+            self.profile.disable()
+            self._profiling = False
+        if self.requests is not None and self.completed >= self.requests:
+            self.finished.set()
+
+    def start_sampler(self):
+        self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        refreshed = 0.0
+        while not self._stop.wait(self.interval):
+            if not self.inflight:
+                continue
+            now = time.monotonic()
+            if now - refreshed > 1.0:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                refreshed = now
+            self.sample_ticks += 1
+            try:
+                current = asyncio.current_task(self._loop)
+            except Exception:
+                current = None
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident == self._loop_thread:
+                    # Only while one of the profiled requests holds the loop
+                    if current not in self.inflight:
+                        continue
+                    name = "event-loop"
+                else:
+                    name = names.get(ident, str(ident))
+                    if not name.startswith(PROFILE_SAMPLE_THREADS):
+                        continue
+                    if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                        continue
+                self.samples[f"{name};{collapse(frame)}"] += 1
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.started
+        if self._profiling:
+            self.profile.disable()
+            self._profiling = False
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join(timeout=5)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def pstats_text(self, sort: str = "cumulative", limit: int = 50) -> str:
+        out = io.StringIO()
+        try:
+            pstats.Stats(self.profile, stream=out).sort_stats(sort).print_stats(limit)
+        except TypeError:
+            return "No calls were profiled\n"
+        return out.getvalue()
+
+    def pstats_binary(self) -> bytes:
+        """The format ``pstats.Stats(path)``, snakeviz and flameprof read"""
+        try:
+            return marshal.dumps(pstats.Stats(self.profile).stats)
+        except TypeError:
+            return marshal.dumps({})
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "requests_profiled": self.completed,
+            "seconds": round(self.elapsed, 3),
+            "samples": sum(self.samples.values()),
+            "sample_ticks": self.sample_ticks,
+            "user_id": self.user_id,
+            "endpoint": self.endpoint,
+        }
+
+
+class RequestProfiler:
+    """On-demand profiling of the next N matching requests or the next T seconds.
+
+    Request handlers wrap their work in ``profile(endpoint, user_id)``. With
+    no session running that returns a shared no-op context, so the disabled
+    cost is one attribute check. ``run`` opens a session and returns it when
+    N requests have completed or T seconds have passed.
+
+    ``sample`` mode reads the stacks of the event loop and of inference
+    batch threads every ``interval_ms`` from a separate thread; loop samples
+    are kept only while a profiled request's task is running, so filters
+    attribute precisely. ``cprofile`` mode runs the deterministic profiler
+    on the event loop thread while any profiled request is in flight, which
+    also captures other requests interleaved with it.
+    """
+
+    def __init__(self):
+        self.session: Optional[ProfileSession] = None
+        self.stats: Dict[str, int] = {"sessions": 0, "profiled_requests": 0}
+
+    @property
+    def active(self) -> bool:
+        return self.session is not None
+
+    def profile(self, endpoint: str, user_id: Optional[str] = None):
+        session = self.session
+        if session is None or not session.wants(endpoint, user_id):
+            return _NOT_PROFILED
+        return self._profiled(session)
+
+    @contextmanager
+    def _profiled(self, session: ProfileSession):
+        task = session.enter()
+        try:
+            yield
+        finally:
+            session.exit(task)
+
+    async def run(
+        self,
+        mode: str = SAMPLE,
+        requests: Optional[int] = None,
+        seconds: Optional[float] = None,
+        user_id: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        interval_ms: Optional[float] = None,
+    ) -> ProfileSession:
+        if mode not in (SAMPLE, CPROFILE):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        if self.session is not None:
+            raise RuntimeError("A profiling session is already running")
+        seconds = min(seconds or PROFILE_MAX_SECONDS, PROFILE_MAX_SECONDS)
+        session = ProfileSession(mode, requests, seconds, user_id, endpoint,
+                                 interval_ms or PROFILE_SAMPLE_INTERVAL_MS)
+        if mode == SAMPLE:
+            session.start_sampler()
+        self.session = session
+        self.stats["sessions"] += 1
+        try:
+            await asyncio.wait_for(session.finished.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.session = None
+            session.stop()
+            self.stats["profiled_requests"] += session.completed
+        return session
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"active": self.active, **self.stats}
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (data, cursor); data is None when nothing changed since the cursor
+Delta = Tuple[Optional[Any], Any]
+Sender = Callable[[str], Awaitable[None]]
+
+
+class PushTopic:
+    """One subscribable topic with its delta cursor and subscribers"""
+
+    def __init__(self, name: str, snapshot_fn: Callable[[], Delta], delta_fn: Callable[[Any], Delta]):
+        self.name = name
+        self.snapshot_fn = snapshot_fn
+        self.delta_fn = delta_fn
+        self.cursor: Any = None
+        self.dirty = False
+        self.subscribers: Dict[Hashable, Sender] = {}
+        self.joining: Dict[Hashable, Sender] = {}
+
+
+class PushHub:
+    """Coalesced push of agent state changes to subscribed WebSocket sessions.
+
+    The agent calls ``notify(topic)`` whenever it changes something behind a
+    topic. Notifications are coalesced for ``window_ms``; then one delta per
+    dirty topic is computed from the topic's cursor, encoded once and sent to
+    every subscriber. Topics without subscribers are not even marked dirty,
+    so idle dashboards cost nothing. New subscribers get a full snapshot on
+    the next flush instead of the delta. ``notify`` must be called on the
+    event loop.
+    """
+
+    def __init__(self, window_ms: Optional[float] = None, send_timeout: float = 5.0):
+        self.window = (window_ms if window_ms is not None else float(os.getenv("PUSH_COALESCE_MS", "250"))) / 1000
+        self.send_timeout = send_timeout
+        self.topics: Dict[str, PushTopic] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+        self.stats: Dict[str, int] = {
+            "notifications": 0,
+            "flushes": 0,
+            "pushes": 0,
+            "unchanged": 0,
+            "dropped_subscribers": 0,
+        }
+
+    def register(self, name: str, snapshot_fn: Callable[[], Delta], delta_fn: Callable[[Any], Delta]):
+        """``snapshot_fn() -> (data, cursor)``; ``delta_fn(cursor) -> (data or None, cursor)``"""
+        self.topics[name] = PushTopic(name, snapshot_fn, delta_fn)
+
+    def subscribe(self, key: Hashable, topics: Iterable[str], send: Sender) -> List[str]:
+        """Subscribe a session to topics; returns the names that exist.
+
+        Topics the session already holds are accepted again without a new
+        snapshot, so the ack always lists everything the session is on.
+        """
+        accepted = []
+        joined = False
+        for name in topics:
+            topic = self.topics.get(name)
+            if topic is None:
+                continue
+            accepted.append(name)
+            if key not in topic.subscribers and key not in topic.joining:
+                topic.joining[key] = send
+                joined = True
+        if joined:
+            self._schedule(0)
+        return accepted
+
+    def unsubscribe(self, key: Hashable, topics: Optional[Iterable[str]] = None):
+        """Drop a session from the given topics, or from all of them"""
+        for name in (topics if topics is not None else list(self.topics)):
+            topic = self.topics.get(name)
+            if topic is not None:
+                topic.subscribers.pop(key, None)
+                topic.joining.pop(key, None)
+
+    def notify(self, name: str):
+        topic = self.topics.get(name)
+        if topic is None or not topic.subscribers:
+            return
+        self.stats["notifications"] += 1
+        topic.dirty = True
+        self._schedule(self.window)
+
+    def _schedule(self, delay: float):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if delay == 0:
+            self._spawn(loop)
+            return
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(delay, self._spawn, loop)
+
+    def _spawn(self, loop: asyncio.AbstractEventLoop):
+        self._flush_handle = None
+        task = loop.create_task(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self):
+        self.stats["flushes"] += 1
+        sends = []
+        for topic in self.topics.values():
+            if topic.dirty and topic.subscribers:
+                topic.dirty = False
+                data, topic.cursor = topic.delta_fn(topic.cursor)
+                if data is None:
+                    self.stats["unchanged"] += 1
+                else:
+                    message = self._encode(topic.name, "delta", data)
+                    sends.extend((topic, key, send, message) for key, send in topic.subscribers.items())
+            if topic.joining:
+                data, cursor = topic.snapshot_fn()
+                if not topic.subscribers:
+                    # First subscriber: the delta cursor starts from this snapshot
+                    topic.cursor = cursor
+                    topic.dirty = False
+                message = self._encode(topic.name, "snapshot", data)
+                sends.extend((topic, key, send, message) for key, send in topic.joining.items())
+                topic.subscribers.update(topic.joining)
+                topic.joining.clear()
+        if sends:
+            await asyncio.gather(*(self._send(*item) for item in sends))
+
+    @staticmethod
+    def _encode(name: str, mode: str, data: Any) -> str:
+        return json.dumps({"type": name, "mode": mode, "data": data}, default=str)
+
+    async def _send(self, topic: PushTopic, key: Hashable, send: Sender, message: str):
+        try:
+            await asyncio.wait_for(send(message), timeout=self.send_timeout)
+            self.stats["pushes"] += 1
+        except Exception as e:
+            # A dead or stalled session must not hold up the others
+            logger.info(f"Dropping {topic.name} subscriber: {e!r}")
+            topic.subscribers.pop(key, None)
+            self.stats["dropped_subscribers"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": round(self.window * 1000, 1),
+            "subscribers": {name: len(topic.subscribers) for name, topic in self.topics.items()},
+            **self.stats,
+        }
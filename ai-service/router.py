@@ -0,0 +1,771 @@
+#!/usr/bin/env python3
+"""
+Consistent-hash router in front of several single-process service instances.
+
+Every user belongs to one shard (``hash_ring.py``), so per-user state lives in
+exactly one process. ``/ai/chat``, ``/ai/journal`` and any other POST whose
+JSON body has a ``user_id`` are proxied to the owning shard. ``/ws/{user_id}``
+is pinned to that shard for the life of the connection.
+
+Views over every user are fanned out and merged: the crisis feed
+(``/ai/crisis/events`` and the ``/ws/clinician/crisis`` stream), ``/ai/status``,
+``/ai/insights``, ``/ai/metrics`` and ``/ai/jobs``. ``/ai/import`` is split row
+by row into one upload per owning shard, and the ring cannot change while
+those imports run. Anything else goes to the first shard.
+
+Adding or removing a shard hands the affected profiles over through the
+shards' ``/ai/profiles/*`` endpoints: requests for moving users are held,
+their WebSocket sessions closed with 1012 so clients reconnect, profiles are
+copied to their new owners, the ring is switched and the old copies
+released. Users who do not move are served throughout.
+
+    python router.py --spawn 4                   # 4 local shards on ports 8001-8004, router on 8000
+    python router.py --shards http://127.0.0.1:8001 http://127.0.0.1:8002
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional, Set
+
+import httpx
+import uvicorn
+import websockets
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response, WebSocket
+from fastapi.middleware.gzip import GZipMiddleware
+
+from hash_ring import HashRing
+
+logger = logging.getLogger(__name__)
+
+ROUTER_TIMEOUT_SECONDS = float(os.getenv("ROUTER_TIMEOUT_SECONDS", "60"))
+ROUTER_MAX_CONNECTIONS = int(os.getenv("ROUTER_MAX_CONNECTIONS", "256"))
+ROUTER_HANDOFF_BATCH = int(os.getenv("ROUTER_HANDOFF_BATCH", "500"))
+ROUTER_DRAIN_SECONDS = float(os.getenv("ROUTER_DRAIN_SECONDS", "30"))
+ROUTER_IMPORT_DIR = os.getenv("ROUTER_IMPORT_DIR", "data/router-imports")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+FORWARD_HEADERS = ("content-type", "content-encoding", "if-none-match", "x-admin-token", "x-clinician-token")
+RETURN_HEADERS = ("content-type", "retry-after", "etag", "cache-control")
+
+# Sent to WebSocket clients whose user is moving to another shard: reconnect
+CLOSE_SERVICE_RESTART = 1012
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_INTERNAL_ERROR = 1011
+
+# Learning counters that add up across shards; the other LearningStats fields are ratios
+SUMMED_LEARNING_STATS = ("total_interactions", "patterns_learned", "neural_connections", "memory_size_mb")
+
+
+class HandoffBlocked(Exception):
+    """Raised when the ring cannot change yet, e.g. while routed imports run"""
+
+
+class ProxySession:
+    """One proxied WebSocket connection"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.close_code = 1000
+        self.tasks: List[asyncio.Task] = []
+
+    def close(self, code: int):
+        self.close_code = code
+        for task in self.tasks:
+            task.cancel()
+
+
+class ImportSplitter:
+    """Splits an NDJSON upload (optionally gzipped) into one spool file per owning shard.
+
+    Rows are assigned with the ring as it was when the upload started; rows
+    without a usable ``user_id`` go to the first shard, whose import reports
+    them as skipped.
+    """
+
+    def __init__(self, ring: HashRing, directory: str, compressed: bool):
+        self.ring = ring
+        self.directory = directory
+        self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if compressed else None
+        self._partial = b""
+        self._files: Dict[str, BinaryIO] = {}
+        self.paths: Dict[str, str] = {}
+        self.rows: Dict[str, int] = {}
+
+    def feed(self, chunk: bytes):
+        if self._inflate is not None:
+            chunk = self._decompress(chunk)
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._route(line)
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        out = []
+        while chunk:
+            out.append(self._inflate.decompress(chunk))
+            if not self._inflate.eof:
+                break
+            # Concatenated gzip members, as GzipFile reads them on the shard
+            chunk = self._inflate.unused_data
+            self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return b"".join(out)
+
+    def _route(self, line: bytes):
+        if not line.strip():
+            return
+        user_id = _user_id(line)
+        shard = self.ring.owner(user_id) if user_id is not None else self.ring.nodes[0]
+        f = self._files.get(shard)
+        if f is None:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, self.paths[shard] = tempfile.mkstemp(suffix=".ndjson", dir=self.directory)
+            f = self._files[shard] = os.fdopen(fd, "wb")
+            self.rows[shard] = 0
+        f.write(line.rstrip(b"\r") + b"\n")
+        self.rows[shard] += 1
+
+    def finish(self):
+        if self._inflate is not None:
+            tail, self._inflate = self._inflate.flush(), None
+            self.feed(tail)
+        if self._partial:
+            self._route(self._partial)
+            self._partial = b""
+        for f in self._files.values():
+            f.close()
+
+    def discard(self):
+        for f in self._files.values():
+            f.close()
+        for path in self.paths.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+async def _file_chunks(path: str, size: int = 1 << 16):
+    loop = asyncio.get_running_loop()
+    with open(path, "rb") as f:
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _merge_status(bodies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One /ai/status body for the whole deployment: counters summed, ratios weighted by interactions"""
+    merged = dict(bodies[0])
+    stats = [body["learning_stats"] for body in bodies]
+    weights = [max(s.get("total_interactions", 0), 0) for s in stats]
+    total = sum(weights)
+    learning = dict(stats[0])
+    for key in learning:
+        if key in SUMMED_LEARNING_STATS:
+            learning[key] = sum(s.get(key, 0) for s in stats)
+        elif total:
+            learning[key] = sum(s.get(key, 0) * w for s, w in zip(stats, weights)) / total
+    merged["learning_stats"] = learning
+    merged["shards"] = len(bodies)
+    merged["timestamp"] = datetime.now().isoformat()
+    return merged
+
+
+class ShardRouter:
+    """Routes users to shards and moves their profiles when the ring changes"""
+
+    def __init__(self, shards: List[str], token: str = ADMIN_TOKEN):
+        self.ring = HashRing(shard.rstrip("/") for shard in shards)
+        self.token = token
+        self.client: Optional[httpx.AsyncClient] = None
+        self._next_ring: Optional[HashRing] = None
+        self._handoff_done: Optional[asyncio.Event] = None
+        self._change_lock = asyncio.Lock()
+        self._inflight: Dict[str, int] = {}
+        self._sessions: Dict[str, Set[ProxySession]] = {}
+        self._crisis_sessions: Set[ProxySession] = set()
+        # (shard, job_id) of imports this router split; the ring stays put until they finish
+        self._imports: List[tuple] = []
+
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "errors": 0,
+            "held": 0,
+            "ring_changes": 0,
+            "profiles_moved": 0,
+            "fan_outs": 0,
+            "imports_routed": 0,
+            "per_shard": {},
+        }
+
+    async def start(self):
+        self.client = httpx.AsyncClient(
+            timeout=ROUTER_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=ROUTER_MAX_CONNECTIONS,
+                                max_keepalive_connections=ROUTER_MAX_CONNECTIONS),
+        )
+
+    async def stop(self):
+        for sessions in list(self._sessions.values()):
+            for session in list(sessions):
+                session.close(1001)
+        for session in list(self._crisis_sessions):
+            session.close(1001)
+        if self.client is not None:
+            await self.client.aclose()
+
+    def _moving(self, user_id: str) -> bool:
+        return self._next_ring is not None and self._next_ring.owner(user_id) != self.ring.owner(user_id)
+
+    @asynccontextmanager
+    async def route(self, user_id: str):
+        """The user's shard, held while the user's profile is being handed off"""
+        while self._moving(user_id):
+            self.stats["held"] += 1
+            await self._handoff_done.wait()
+        shard = self.ring.owner(user_id)
+        self._inflight[user_id] = self._inflight.get(user_id, 0) + 1
+        per_shard = self.stats["per_shard"]
+        per_shard[shard] = per_shard.get(shard, 0) + 1
+        try:
+            yield shard
+        finally:
+            count = self._inflight[user_id] - 1
+            if count:
+                self._inflight[user_id] = count
+            else:
+                del self._inflight[user_id]
+
+    async def forward(self, shard: str, request: Request, body: bytes) -> Response:
+        self.stats["requests"] += 1
+        headers = {k: v for k, v in request.headers.items() if k in FORWARD_HEADERS}
+        try:
+            upstream = await self.client.request(
+                request.method, f"{shard}{request.url.path}",
+                params=request.query_params, content=body, headers=headers,
+            )
+        except httpx.HTTPError as e:
+            self.stats["errors"] += 1
+            logger.error(f"Shard {shard} unreachable: {e!r}")
+            raise HTTPException(status_code=502, detail=f"Shard unavailable: {shard}")
+        return Response(
+            content=upstream.content,
+            status_code=upstream.status_code,
+            headers={k: v for k, v in upstream.headers.items() if k in RETURN_HEADERS},
+        )
+
+    async def fan_out(self, request: Request) -> Dict[str, Any]:
+        """The same GET on every shard, as ``{shard: JSON body}``.
+
+        Any shard that is unreachable or refuses (e.g. a bad token) fails the
+        whole request: a merged view must not silently leave a shard out.
+        """
+        self.stats["fan_outs"] += 1
+        headers = {k: v for k, v in request.headers.items() if k in FORWARD_HEADERS and k != "if-none-match"}
+        shards = self.ring.nodes
+        try:
+            responses = await asyncio.gather(*(
+                self.client.get(f"{shard}{request.url.path}", params=request.query_params, headers=headers)
+                for shard in shards
+            ))
+        except httpx.HTTPError as e:
+            self.stats["errors"] += 1
+            logger.error(f"Fan-out of {request.url.path} failed: {e!r}")
+            raise HTTPException(status_code=502, detail="A shard is unavailable")
+        for shard, response in zip(shards, responses):
+            if response.status_code != 200:
+                try:
+                    detail = response.json().get("detail", response.text)
+                except ValueError:
+                    detail = response.text
+                raise HTTPException(status_code=response.status_code, detail=detail)
+        return {shard: response.json() for shard, response in zip(shards, responses)}
+
+    async def find_job(self, request: Request, body: bytes = b"") -> Response:
+        """Forward a job lookup or cancel to the shard that has the job"""
+        response = None
+        for shard in self.ring.nodes:
+            response = await self.forward(shard, request, body)
+            if response.status_code != 404:
+                return response
+        return response
+
+    async def route_import(self, request: Request) -> Dict[str, Any]:
+        """Split an NDJSON import by owning shard and queue one import job per shard"""
+        compressed = request.headers.get("content-encoding", "").lower() == "gzip"
+        headers = {"X-Admin-Token": request.headers.get("x-admin-token", "")}
+        loop = asyncio.get_running_loop()
+        # Rows are assigned with one ring; a handoff cannot start until the jobs are queued
+        async with self._change_lock:
+            splitter = ImportSplitter(self.ring, ROUTER_IMPORT_DIR, compressed)
+            try:
+                try:
+                    async for chunk in request.stream():
+                        await loop.run_in_executor(None, splitter.feed, chunk)
+                    await loop.run_in_executor(None, splitter.finish)
+                except (zlib.error, OSError) as e:
+                    raise HTTPException(status_code=400, detail=f"Could not read import: {e}")
+                jobs = []
+                for shard, path in splitter.paths.items():
+                    try:
+                        response = await self.client.post(f"{shard}/ai/import", content=_file_chunks(path),
+                                                          headers=headers)
+                    except httpx.HTTPError as e:
+                        response = None
+                        logger.error(f"Import upload to {shard} failed: {e!r}")
+                    if response is None or response.status_code != 202:
+                        # The shard's own refusal (403, 503) only stands if nothing was queued yet
+                        status = response.status_code if response is not None and not jobs else 502
+                        queued = [job["shard"] for job in jobs]
+                        raise HTTPException(
+                            status_code=status,
+                            detail=f"Import not queued on {shard}; already queued on {queued or 'no shard'}",
+                        )
+                    job = response.json()["job"]
+                    self._imports.append((shard, job["job_id"]))
+                    jobs.append({"shard": shard, "rows": splitter.rows[shard], "job": job})
+            finally:
+                splitter.discard()
+        self.stats["imports_routed"] += 1
+        return {"status": "import_started", "rows": sum(splitter.rows.values()), "jobs": jobs}
+
+    async def _imports_running(self) -> List[str]:
+        """Job IDs of routed imports still queued or running; finished ones are forgotten"""
+        running = []
+        for shard, job_id in self._imports:
+            try:
+                job = await self._admin("GET", shard, f"/ai/jobs/{job_id}")
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 404:
+                    continue
+                raise
+            if job["status"] in ("queued", "running"):
+                running.append((shard, job_id))
+        self._imports = running
+        return [job_id for _, job_id in running]
+
+    async def proxy_crisis_stream(self, websocket: WebSocket, token: Optional[str] = None):
+        """Every shard's clinician crisis stream, merged into one connection.
+
+        The clinician token is passed on to each shard, which checks it. The
+        stream is closed (1012) when the ring changes, so dashboards reconnect
+        and pick up new shards, and when any shard's stream ends (1011).
+        """
+        token = websocket.headers.get("x-clinician-token") or token
+        headers = {"X-Clinician-Token": token} if token else {}
+        upstreams = []
+        close_code = None
+        try:
+            for shard in self.ring.nodes:
+                ws_url = shard.replace("http", "ws", 1)
+                upstreams.append(await websockets.connect(f"{ws_url}/ws/clinician/crisis",
+                                                          extra_headers=headers, max_size=None))
+        except websockets.InvalidStatusCode as e:
+            close_code = CLOSE_POLICY_VIOLATION if e.status_code == 403 else CLOSE_INTERNAL_ERROR
+        except Exception as e:
+            logger.error(f"Shard crisis stream unreachable: {e!r}")
+            self.stats["errors"] += 1
+            close_code = CLOSE_INTERNAL_ERROR
+        if close_code is not None:
+            for upstream in upstreams:
+                await upstream.close()
+            await websocket.close(code=close_code)
+            return
+
+        await websocket.accept()
+        session = ProxySession(websocket)
+        session.close_code = CLOSE_INTERNAL_ERROR
+        self._crisis_sessions.add(session)
+        outgoing: asyncio.Queue = asyncio.Queue()
+
+        async def shard_to_queue(upstream):
+            async for message in upstream:
+                outgoing.put_nowait(message)
+
+        async def queue_to_client():
+            # One writer, so events from different shards never interleave mid-send
+            while True:
+                await websocket.send_text(await outgoing.get())
+
+        async def client_gone():
+            while True:
+                await websocket.receive_text()
+
+        session.tasks = [asyncio.create_task(shard_to_queue(upstream)) for upstream in upstreams]
+        session.tasks += [asyncio.create_task(queue_to_client()), asyncio.create_task(client_gone())]
+        try:
+            await asyncio.wait(session.tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in session.tasks:
+                task.cancel()
+            await asyncio.gather(*session.tasks, return_exceptions=True)
+            for upstream in upstreams:
+                await upstream.close()
+            try:
+                await websocket.close(code=session.close_code)
+            except RuntimeError:
+                pass  # Client already gone
+            self._crisis_sessions.discard(session)
+
+    async def proxy_websocket(self, websocket: WebSocket, user_id: str):
+        async with self.route(user_id) as shard:
+            ws_url = shard.replace("http", "ws", 1)
+            try:
+                upstream = await websockets.connect(f"{ws_url}/ws/{user_id}", max_size=None)
+            except Exception as e:
+                logger.error(f"Shard {shard} WebSocket unreachable: {e!r}")
+                self.stats["errors"] += 1
+                await websocket.close(code=1011)
+                return
+            await websocket.accept()
+            session = ProxySession(websocket)
+            self._sessions.setdefault(user_id, set()).add(session)
+
+            async def client_to_shard():
+                while True:
+                    await upstream.send(await websocket.receive_text())
+
+            async def shard_to_client():
+                async for message in upstream:
+                    await websocket.send_text(message)
+
+            session.tasks = [asyncio.create_task(client_to_shard()), asyncio.create_task(shard_to_client())]
+            try:
+                await asyncio.wait(session.tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in session.tasks:
+                    task.cancel()
+                await asyncio.gather(*session.tasks, return_exceptions=True)
+                await upstream.close()
+                try:
+                    await websocket.close(code=session.close_code)
+                except RuntimeError:
+                    pass  # Client already gone
+                sessions = self._sessions.get(user_id)
+                sessions.discard(session)
+                if not sessions:
+                    del self._sessions[user_id]
+
+    async def _admin(self, method: str, shard: str, path: str, payload: Optional[dict] = None) -> Dict[str, Any]:
+        response = await self.client.request(method, f"{shard}{path}", json=payload,
+                                             headers={"X-Admin-Token": self.token})
+        response.raise_for_status()
+        return response.json()
+
+    async def _drain(self):
+        """Wait for requests and sessions of moving users to finish"""
+        deadline = time.monotonic() + ROUTER_DRAIN_SECONDS
+        while any(self._moving(user_id) for user_id in self._inflight):
+            if time.monotonic() > deadline:
+                raise TimeoutError("Requests for moving users did not drain")
+            await asyncio.sleep(0.05)
+
+    async def add_shard(self, shard: str) -> Dict[str, Any]:
+        shard = shard.rstrip("/")
+        response = await self.client.get(f"{shard}/")
+        response.raise_for_status()
+        return await self._change(lambda ring: ring.add(shard))
+
+    async def remove_shard(self, shard: str) -> Dict[str, Any]:
+        return await self._change(lambda ring: ring.remove(shard.rstrip("/")))
+
+    async def _change(self, mutate) -> Dict[str, Any]:
+        async with self._change_lock:
+            ring = self.ring.copy()
+            mutate(ring)
+            if not len(ring):
+                raise ValueError("Cannot remove the last shard")
+            running = await self._imports_running()
+            if running:
+                raise HandoffBlocked(f"Imports still running on the current ring: {running}")
+            started = time.perf_counter()
+            self._next_ring = ring
+            self._handoff_done = asyncio.Event()
+            # (target, user_ids) already imported; dropped again if the ring does not switch
+            copies: List[tuple] = []
+            switched = False
+            try:
+                for user_id, sessions in list(self._sessions.items()):
+                    if self._moving(user_id):
+                        for session in list(sessions):
+                            session.close(CLOSE_SERVICE_RESTART)
+                await self._drain()
+
+                # Copy every profile whose owner changes before switching anything
+                moves: List[tuple] = []
+                for shard in self.ring.nodes:
+                    user_ids = (await self._admin("GET", shard, "/ai/profiles/ids"))["user_ids"]
+                    by_target: Dict[str, List[str]] = {}
+                    for user_id in user_ids:
+                        target = ring.owner(user_id)
+                        if target != shard:
+                            by_target.setdefault(target, []).append(user_id)
+                    for target, moving in by_target.items():
+                        for i in range(0, len(moving), ROUTER_HANDOFF_BATCH):
+                            batch = moving[i:i + ROUTER_HANDOFF_BATCH]
+                            exported = await self._admin("POST", shard, "/ai/profiles/export", {"user_ids": batch})
+                            await self._admin("POST", target, "/ai/profiles/import", exported)
+                            copies.append((target, batch))
+                            moves.append((shard, batch))
+
+                self.ring = ring
+                switched = True
+                self.stats["ring_changes"] += 1
+            finally:
+                self._next_ring = None
+                self._handoff_done.set()
+                if not switched:
+                    # The old owners still serve these users: the copies must
+                    # not outlive the failed handoff and shadow them later
+                    await self._release(copies)
+
+            # Merged crisis streams reconnect so they cover the new set of shards
+            for session in list(self._crisis_sessions):
+                session.close(CLOSE_SERVICE_RESTART)
+
+            # Old copies are only dropped once the new owners serve them
+            await self._release(moves)
+            moved = sum(len(batch) for _, batch in moves)
+            self.stats["profiles_moved"] += moved
+            seconds = round(time.perf_counter() - started, 3)
+            logger.info(f"Ring now {ring.nodes}; moved {moved} profiles in {seconds}s")
+            return {"shards": ring.nodes, "profiles_moved": moved, "seconds": seconds}
+
+    async def _release(self, copies: List[tuple]):
+        for shard, batch in copies:
+            try:
+                await self._admin("POST", shard, "/ai/profiles/release", {"user_ids": batch})
+            except httpx.HTTPError as e:
+                logger.warning(f"Could not release {len(batch)} profiles on {shard}: {e!r}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "shards": self.ring.nodes,
+            "vnodes": self.ring.vnodes,
+            "in_handoff": self._next_ring is not None,
+            "inflight_users": len(self._inflight),
+            "websocket_sessions": sum(len(sessions) for sessions in self._sessions.values()),
+            "crisis_streams": len(self._crisis_sessions),
+            "imports_tracked": len(self._imports),
+            **self.stats,
+        }
+
+
+def _user_id(body: bytes) -> Optional[str]:
+    try:
+        user_id = json.loads(body).get("user_id")
+    except (ValueError, AttributeError):
+        return None
+    return user_id if isinstance(user_id, str) and user_id else None
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Same fail-closed ``X-Admin-Token`` check as the shards"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def create_app(shards: List[str]) -> FastAPI:
+    router = ShardRouter(shards)
+    app = FastAPI(title="NeuraWell AI Router", version="1.0.0")
+    app.state.router = router
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=int(os.getenv("GZIP_MIN_BYTES", "500")),
+        compresslevel=int(os.getenv("GZIP_LEVEL", "6")),
+    )
+
+    @app.on_event("startup")
+    async def startup():
+        await router.start()
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await router.stop()
+
+    @app.get("/router/shards")
+    async def list_shards():
+        return router.get_stats()
+
+    @app.post("/router/shards", dependencies=[Depends(require_admin)])
+    async def add_shard(url: str):
+        """Add a running instance; profiles that now hash to it are moved over"""
+        try:
+            return await router.add_shard(url)
+        except HandoffBlocked as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except (httpx.HTTPError, TimeoutError) as e:
+            raise HTTPException(status_code=502, detail=f"Handoff failed, ring unchanged: {e}")
+
+    @app.delete("/router/shards", dependencies=[Depends(require_admin)])
+    async def remove_shard(url: str):
+        """Remove an instance after moving its profiles to the remaining shards"""
+        if url.rstrip("/") not in router.ring:
+            raise HTTPException(status_code=404, detail="Unknown shard")
+        try:
+            return await router.remove_shard(url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except HandoffBlocked as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except (httpx.HTTPError, TimeoutError) as e:
+            raise HTTPException(status_code=502, detail=f"Handoff failed, ring unchanged: {e}")
+
+    @app.get("/ai/crisis/events")
+    async def crisis_events(request: Request):
+        """Recent crisis escalations from every shard, oldest first"""
+        events = [event for body in (await router.fan_out(request)).values() for event in body["events"]]
+        events.sort(key=lambda event: event.get("timestamp", ""))
+        return {"events": events, "timestamp": datetime.now().isoformat()}
+
+    @app.get("/ai/status")
+    async def status(request: Request):
+        return _merge_status(list((await router.fan_out(request)).values()))
+
+    @app.get("/ai/insights")
+    async def insights(request: Request):
+        """Insights from every shard, oldest first"""
+        found = [insight for body in (await router.fan_out(request)).values() for insight in body["insights"]]
+        found.sort(key=lambda insight: insight.get("timestamp", ""))
+        return {"insights": found, "timestamp": datetime.now().isoformat()}
+
+    @app.get("/ai/metrics")
+    async def metrics(request: Request):
+        """The router's counters and each shard's own metrics"""
+        return {
+            "router": router.get_stats(),
+            "shards": await router.fan_out(request),
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    @app.get("/ai/jobs")
+    async def jobs(request: Request):
+        """Recent jobs on every shard, newest first"""
+        found = [
+            dict(job, shard=shard)
+            for shard, body in (await router.fan_out(request)).items() for job in body["jobs"]
+        ]
+        found.sort(key=lambda job: job["created_at"], reverse=True)
+        return {"jobs": found, "timestamp": datetime.now().isoformat()}
+
+    @app.get("/ai/jobs/{job_id}")
+    async def job(request: Request, job_id: str):
+        return await router.find_job(request)
+
+    @app.post("/ai/jobs/{job_id}/cancel")
+    async def cancel_job(request: Request, job_id: str):
+        return await router.find_job(request, await request.body())
+
+    @app.post("/ai/import", status_code=202, dependencies=[Depends(require_admin)])
+    async def import_conversations(request: Request):
+        """Split an NDJSON export by owning shard; poll each job through /ai/jobs/{job_id}"""
+        return await router.route_import(request)
+
+    @app.websocket("/ws/clinician/crisis")
+    async def crisis_stream(websocket: WebSocket, token: Optional[str] = None):
+        await router.proxy_crisis_stream(websocket, token)
+
+    @app.websocket("/ws/{user_id}")
+    async def websocket_proxy(websocket: WebSocket, user_id: str):
+        await router.proxy_websocket(websocket, user_id)
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
+    async def proxy(request: Request, path: str):
+        body = await request.body()
+        user_id = _user_id(body) if request.method == "POST" and body else None
+        if user_id is None:
+            return await router.forward(router.ring.nodes[0], request, body)
+        async with router.route(user_id) as shard:
+            return await router.forward(shard, request, body)
+
+    return app
+
+
+def spawn_shards(count: int, base_port: int, data_dir: str) -> List[tuple]:
+    """Start ``count`` single-worker instances with their own state files"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    shards = []
+    for index in range(count):
+        port = base_port + index
+        shard_dir = os.path.join(data_dir, f"shard-{index}")
+        os.makedirs(shard_dir, exist_ok=True)
+        env = dict(
+            os.environ,
+            AI_STATE_PATH=os.path.join(shard_dir, "ai_state.json"),
+            AI_SNAPSHOT_PATH=os.path.join(shard_dir, "ai_state.snap"),
+            PROFILE_COLD_PATH=os.path.join(shard_dir, "profiles_cold.db"),
+            IMPORT_DIR=os.path.join(shard_dir, "imports"),
+        )
+        process = subprocess.Popen(
+            [sys.executable, "start.py", "--production", "--workers", "1",
+             "--host", "127.0.0.1", "--port", str(port)],
+            cwd=here, env=env,
+        )
+        shards.append((f"http://127.0.0.1:{port}", process))
+    return shards
+
+
+def wait_ready(urls: List[str], timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        while True:
+            try:
+                if httpx.get(f"{url}/", timeout=2).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{url} did not become ready")
+            time.sleep(0.5)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Consistent-hash router for NeuraWell AI instances")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--shards", nargs="+", help="base URLs of running instances")
+    group.add_argument("--spawn", type=int, help="start this many local instances first")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--shard-base-port", type=int, default=8001)
+    parser.add_argument("--data-dir", default="data/shards")
+    args = parser.parse_args()
+
+    children = []
+    try:
+        if args.spawn:
+            children = spawn_shards(args.spawn, args.shard_base_port, args.data_dir)
+            shards = [url for url, _ in children]
+            wait_ready(shards)
+        else:
+            shards = args.shards
+        logger.info(f"Routing to {len(shards)} shards: {shards}")
+        uvicorn.run(create_app(shards), host=args.host, port=args.port, log_level="info")
+    finally:
+        for _, process in children:
+            process.send_signal(signal.SIGTERM)
+        for _, process in children:
+            try:
+                process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models import EmotionType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULESET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rulesets", "default.json")
+
+# Position of each emotion in the per-emotion lookup tuples
+EMOTION_INDEX: Dict[EmotionType, int] = {emotion: i for i, emotion in enumerate(EmotionType)}
+
+# Emotions whose keyword scores the sentiment adjustment in score_emotion adds to
+REQUIRED_EMOTIONS: Tuple[EmotionType, ...] = (EmotionType.DEPRESSION, EmotionType.JOY, EmotionType.STRESS)
+
+
+class KeywordMatcher:
+    """Prebuilt matcher over a fixed keyword list (substring semantics)"""
+
+    __slots__ = ("keywords", "_pattern", "_any_case")
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: Tuple[str, ...] = tuple(k.lower() for k in keywords)
+        # Longest first so the alternation prefers full phrases
+        ordered = sorted(set(self.keywords), key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(k) for k in ordered)) if ordered else None
+        # For spans in the original text, whose offsets lower() could shift
+        self._any_case = re.compile(self._pattern.pattern, re.IGNORECASE) if ordered else None
+
+    def any(self, text_lower: str) -> bool:
+        """True if any keyword occurs in the lower-cased text"""
+        return self._pattern is not None and self._pattern.search(text_lower) is not None
+
+    def count(self, text_lower: str) -> int:
+        """Number of distinct keywords occurring in the lower-cased text"""
+        if not self.any(text_lower):
+            return 0
+        return sum(1 for keyword in self.keywords if keyword in text_lower)
+
+    def hits(self, text_lower: str) -> Tuple[str, ...]:
+        """Keywords occurring in the lower-cased text, in ruleset order"""
+        if not self.any(text_lower):
+            return ()
+        return tuple(keyword for keyword in self.keywords if keyword in text_lower)
+
+    def spans(self, text: str) -> List[Tuple[int, int, str]]:
+        """``(start, end, keyword)`` of each non-overlapping match in the text, in order"""
+        if self._any_case is None:
+            return []
+        return [(m.start(), m.end(), m.group().lower()) for m in self._any_case.finditer(text)]
+
+
+class CompiledRuleset:
+    """Immutable lookup structures compiled from a ruleset file"""
+
+    def __init__(self, spec: Dict[str, Any], source: str = "<memory>"):
+        self.version: str = str(spec["version"])
+        self.source = source
+
+        default_emotion = EmotionType(spec.get("default_emotion", EmotionType.NEUTRAL.value))
+
+        self.emotion_matchers: Tuple[Tuple[EmotionType, KeywordMatcher], ...] = tuple(
+            (EmotionType(name), KeywordMatcher(words))
+            for name, words in spec["emotion_keywords"].items()
+        )
+        missing = set(REQUIRED_EMOTIONS) - {emotion for emotion, _ in self.emotion_matchers}
+        if missing:
+            names = ", ".join(sorted(emotion.value for emotion in missing))
+            raise ValueError(f"Ruleset emotion_keywords must include: {names}")
+
+        patterns = spec["patterns"]
+        self.themes: Tuple[str, ...] = tuple(patterns["themes"])
+        self.recurring_theme_threshold: int = int(patterns["recurring_theme_threshold"])
+        self.intensity_markers = KeywordMatcher(patterns["intensity_markers"])
+        self.detailed_word_count: int = int(patterns["detailed_word_count"])
+        self.brief_word_count: int = int(patterns["brief_word_count"])
+
+        templates = spec["response_templates"]
+        self.response_templates = self._per_emotion(templates, tuple(templates[default_emotion.value]))
+        self.pattern_responses: Tuple[Tuple[str, str], ...] = tuple(spec["pattern_responses"].items())
+        self.history_min_conversations: int = int(spec["history_response"]["min_conversations"])
+        self.history_text: str = spec["history_response"]["text"]
+
+        self.guidance = self._per_emotion(spec["guidance"], tuple(spec["default_guidance"]))
+
+        crisis = spec["crisis"]
+        self.crisis_keywords = KeywordMatcher(crisis["keywords"])
+        self.crisis_keyword_weight: int = int(crisis["keyword_weight"])
+        self.crisis_emotions = frozenset(EmotionType(name) for name in crisis["emotions"])
+        self.crisis_emotion_weight: int = int(crisis["emotion_weight"])
+        self.crisis_intensity = KeywordMatcher(crisis["intensity_words"])
+        self.crisis_intensity_weight: int = int(crisis["intensity_weight"])
+        self.crisis_max_level: int = int(crisis["max_level"])
+
+        recommendations = spec["recommendations"]
+        self.crisis_threshold: int = int(recommendations["crisis_threshold"])
+        self.crisis_recommendations: Tuple[str, ...] = tuple(recommendations["crisis"])
+        self.emotion_recommendations = self._per_emotion(recommendations["emotions"], ())
+        self.pattern_recommendations: Tuple[Tuple[str, str], ...] = tuple(recommendations["patterns"].items())
+        self.recommendation_limit: int = int(recommendations["limit"])
+
+        if not self.response_templates[EMOTION_INDEX[default_emotion]]:
+            raise ValueError("Ruleset needs response templates for the default emotion")
+        if not spec["default_guidance"]:
+            raise ValueError("Ruleset needs at least one default guidance entry")
+
+    @staticmethod
+    def _per_emotion(table: Dict[str, Iterable[str]], default: Tuple[str, ...]) -> Tuple[Tuple[str, ...], ...]:
+        """Flatten an emotion-keyed table into a tuple indexed by EMOTION_INDEX"""
+        return tuple(tuple(table.get(emotion.value, default)) for emotion in EmotionType)
+
+    def templates_for(self, emotion: EmotionType) -> Tuple[str, ...]:
+        return self.response_templates[EMOTION_INDEX[emotion]]
+
+    def guidance_for(self, emotion: EmotionType) -> Tuple[str, ...]:
+        return self.guidance[EMOTION_INDEX[emotion]]
+
+    def recommendations_for(self, emotion: EmotionType) -> Tuple[str, ...]:
+        return self.emotion_recommendations[EMOTION_INDEX[emotion]]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "emotions": [emotion.value for emotion, _ in self.emotion_matchers],
+            "crisis_keywords": len(self.crisis_keywords.keywords),
+        }
+
+
+def score_emotion(features, rules: CompiledRuleset) -> EmotionType:
+    """Combine keyword hits and sentiment polarity (``MessageFeatures``) into a single emotion"""
+    polarity = features.polarity
+    emotion_scores = {}
+
+    # Keyword-based detection
+    for emotion, matcher in rules.emotion_matchers:
+        emotion_scores[emotion] = features.count(matcher)
+
+    # Adjust scores based on sentiment
+    if polarity < -0.3:
+        emotion_scores[EmotionType.SADNESS] = emotion_scores.get(EmotionType.SADNESS, 0) + 2
+        emotion_scores[EmotionType.DEPRESSION] += 1
+    elif polarity > 0.3:
+        emotion_scores[EmotionType.JOY] += 2
+
+    if abs(polarity) > 0.5:
+        emotion_scores[EmotionType.STRESS] += 1
+
+    # Return emotion with highest score
+    if max(emotion_scores.values()) > 0:
+        return max(emotion_scores, key=emotion_scores.get)
+    return EmotionType.NEUTRAL
+
+
+def load_ruleset(path: str) -> CompiledRuleset:
+    """Read and compile a ruleset file"""
+    with open(path, "r") as f:
+        spec = json.load(f)
+    return CompiledRuleset(spec, source=path)
+
+
+class RulesetManager:
+    """Holds the active ruleset and swaps it atomically on reload.
+
+    Readers take ``manager.current`` once per request and keep using that
+    object, so a reload never changes the rules underneath an in-flight
+    request and never blocks one.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("RULESET_PATH", DEFAULT_RULESET_PATH)
+        self._reload_lock = threading.Lock()
+        self.current: CompiledRuleset = load_ruleset(self.path)
+        logger.info(f"Loaded ruleset {self.current.version} from {self.path}")
+
+    def reload(self, path: Optional[str] = None) -> CompiledRuleset:
+        """Compile a ruleset and make it active; the old one stays on failure"""
+        with self._reload_lock:
+            target = path or self.path
+            compiled = load_ruleset(target)
+            previous = self.current.version
+            self.current = compiled
+            self.path = target
+        logger.info(f"Ruleset swapped {previous} -> {compiled.version}")
+        return compiled
@@ -0,0 +1,241 @@
+import logging
+import os
+import re
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LEXICON = "lexicon"
+TEXTBLOB = "textblob"
+
+# TextBlob stays the default until the lexicon is evaluated on an independent corpus
+SENTIMENT_SCORER = os.getenv("SENTIMENT_SCORER", TEXTBLOB)  # lexicon | textblob
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons", "sentiment.tsv")
+SENTIMENT_LEXICON_PATH = os.getenv("SENTIMENT_LEXICON_PATH", DEFAULT_LEXICON_PATH)
+# Layer the built-in lexicon over NLTK's vader_lexicon; opt-in, and it must be installed
+# (python -m nltk.downloader vader_lexicon) so the table never depends on a download
+SENTIMENT_USE_VADER = os.getenv("SENTIMENT_USE_VADER", "false").lower() == "true"
+
+# A message's polarity is its mean (modified) valence over this, so one
+# clearly negative word lands near TextBlob's -0.5
+VALENCE_SCALE = 4.0
+
+# Intensifier and negation constants from VADER (Hutto & Gilbert, 2014)
+BOOST_INCREMENT = 0.293
+NEGATION_SCALAR = -0.74
+NEGATION_WINDOW = 3
+# Weight of an intensifier two tokens before the word ("very very sad", "so really tired")
+SECOND_BOOST_WEIGHT = 0.95
+# Words before a "but" count less and words after it more ("nice out but I'm sad")
+CONTRAST_WORD = "but"
+BEFORE_CONTRAST_WEIGHT = 0.5
+AFTER_CONTRAST_WEIGHT = 1.5
+
+BOOSTERS = frozenset((
+    "absolutely", "amazingly", "awfully", "completely", "considerably", "deeply", "enormously",
+    "entirely", "especially", "exceptionally", "extremely", "fully", "greatly", "highly", "hugely",
+    "incredibly", "intensely", "majorly", "particularly", "purely", "quite", "really", "remarkably",
+    "so", "substantially", "super", "thoroughly", "too", "totally", "tremendously", "truly",
+    "unbelievably", "unusually", "utterly", "very",
+))
+DAMPENERS = frozenset((
+    "almost", "barely", "hardly", "kinda", "less", "little", "marginally", "occasionally", "partly",
+    "scarcely", "slightly", "somewhat", "sorta",
+))
+NEGATIONS = frozenset((
+    "aint", "ain't", "arent", "aren't", "cannot", "cant", "can't", "couldnt", "couldn't", "didnt",
+    "didn't", "doesnt", "doesn't", "dont", "don't", "hadnt", "hadn't", "hasnt", "hasn't", "havent",
+    "haven't", "isnt", "isn't", "neither", "never", "no", "nobody", "none", "nope", "nor", "not",
+    "nothing", "nowhere", "rarely", "seldom", "shouldnt", "shouldn't", "wasnt", "wasn't", "werent",
+    "weren't", "without", "wont", "won't", "wouldnt", "wouldn't",
+))
+
+_TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def _read_lexicon(path: str) -> Dict[str, float]:
+    """Parse ``token<TAB>valence[<TAB>...]`` lines (the vader_lexicon.txt layout)"""
+    table: Dict[str, float] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            try:
+                table[fields[0].lower()] = float(fields[1])
+            except (IndexError, ValueError):
+                continue
+    return table
+
+
+def _vader_lexicon_path() -> Optional[str]:
+    try:
+        import nltk
+
+        return str(nltk.data.find("sentiment/vader_lexicon.zip/vader_lexicon/vader_lexicon.txt"))
+    except (ImportError, LookupError):
+        return None
+
+
+class LexiconSentiment:
+    """Token-valence sentiment with negation and intensifiers, scored in batches.
+
+    Every known token gets an integer ID from one dict lookup; its valence,
+    negation flag and intensifier increment sit in NumPy arrays indexed by
+    that ID (0 is "unknown"). Scoring a batch tokenizes all messages, maps
+    the tokens to IDs, and then does the rest with array operations over
+    the whole batch:
+
+    - an intensifier one or two tokens before a word pushes that word's
+      valence away from zero, and a dampener pulls it toward zero;
+    - an odd number of negations in the three tokens before a word scales
+      its valence by -0.74;
+    - words after a "but" weigh 1.5x and words before one 0.5x;
+    - polarity is the mean modified valence of the message's sentiment
+      words over ``VALENCE_SCALE``, clipped to [-1, 1], like TextBlob's.
+
+    Windows never reach across message boundaries.
+    """
+
+    def __init__(self, lexicon: Dict[str, float], sources: Sequence[str] = ()):
+        self.sources = list(sources)
+        tokens = sorted(set(lexicon) | BOOSTERS | DAMPENERS | NEGATIONS | {CONTRAST_WORD})
+        self._ids: Dict[str, int] = {token: i for i, token in enumerate(tokens, start=1)}
+        size = len(tokens) + 1
+        self._valence = np.zeros(size, dtype=np.float64)
+        self._boost = np.zeros(size, dtype=np.float64)
+        self._negation = np.zeros(size, dtype=np.int32)
+        self._contrast_id = self._ids[CONTRAST_WORD]
+        for token, i in self._ids.items():
+            self._valence[i] = lexicon.get(token, 0.0)
+            if token in BOOSTERS:
+                self._boost[i] = BOOST_INCREMENT
+            elif token in DAMPENERS:
+                self._boost[i] = -BOOST_INCREMENT
+            if token in NEGATIONS:
+                self._negation[i] = 1
+        self.stats = {"batches": 0, "messages": 0, "tokens": 0}
+
+    @classmethod
+    def load(cls, path: Optional[str] = None, use_vader: Optional[bool] = None) -> "LexiconSentiment":
+        path = path or SENTIMENT_LEXICON_PATH
+        use_vader = SENTIMENT_USE_VADER if use_vader is None else use_vader
+        lexicon: Dict[str, float] = {}
+        sources = []
+        if use_vader:
+            vader = _vader_lexicon_path()
+            if vader is None:
+                raise FileNotFoundError(
+                    "SENTIMENT_USE_VADER is set but NLTK's vader_lexicon is not installed; "
+                    "run: python -m nltk.downloader vader_lexicon"
+                )
+            lexicon.update(_read_lexicon(vader))
+            sources.append(vader)
+        lexicon.update(_read_lexicon(path))
+        sources.append(path)
+        scorer = cls(lexicon, sources)
+        logger.info(f"Sentiment lexicon loaded: {len(lexicon)} entries from {', '.join(sources)}")
+        return scorer
+
+    def polarities(self, messages: Sequence[str]) -> np.ndarray:
+        """Polarity in [-1, 1] for each message"""
+        count = len(messages)
+        token_lists = [_TOKEN.findall(message.lower()) for message in messages]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=count)
+        total = int(lengths.sum())
+        self.stats["batches"] += 1
+        self.stats["messages"] += count
+        self.stats["tokens"] += total
+        if total == 0:
+            return np.zeros(count, dtype=np.float64)
+
+        get = self._ids.get
+        ids = np.fromiter(
+            (i for tokens in token_lists for i in map(get, tokens, repeat(0))),
+            dtype=np.int64, count=total,
+        )
+        owner = np.repeat(np.arange(count), lengths)
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        position = np.arange(total) - starts
+
+        valence = self._valence[ids]
+        boost = self._boost[ids]
+        adjust = np.zeros(total)
+        adjust[1:] += np.where(position[1:] >= 1, boost[:-1], 0.0)
+        adjust[2:] += np.where(position[2:] >= 2, SECOND_BOOST_WEIGHT * boost[:-2], 0.0)
+        valence = valence + np.sign(valence) * adjust
+
+        negations = np.concatenate(([0], np.cumsum(self._negation[ids])))
+        window_start = np.maximum(np.arange(total) - NEGATION_WINDOW, starts)
+        negated = (negations[np.arange(total)] - negations[window_start]) % 2 == 1
+        valence = np.where(negated, valence * NEGATION_SCALAR, valence)
+
+        contrast = (ids == self._contrast_id).astype(np.int64)
+        if contrast.any():
+            seen = np.cumsum(contrast)
+            # "but"s in the message up to and including each token
+            upto = seen - np.concatenate(([0], seen))[starts]
+            after = upto > 0
+            before = np.bincount(owner, weights=contrast, minlength=count)[owner] - upto > 0
+            valence = valence * np.where(after, AFTER_CONTRAST_WEIGHT, np.where(before, BEFORE_CONTRAST_WEIGHT, 1.0))
+
+        scored = np.bincount(owner, weights=(self._valence[ids] != 0), minlength=count)
+        sums = np.bincount(owner, weights=valence, minlength=count)
+        means = np.divide(sums, scored * VALENCE_SCALE, out=np.zeros(count), where=scored > 0)
+        return np.clip(means, -1.0, 1.0)
+
+    def polarity(self, message: str) -> float:
+        return float(self.polarities([message])[0])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"entries": int(np.count_nonzero(self._valence)), "sources": self.sources, **self.stats}
+
+
+_lexicon: Optional[LexiconSentiment] = None
+
+
+def get_lexicon() -> LexiconSentiment:
+    """The process-wide lexicon scorer, built on first use"""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = LexiconSentiment.load()
+    return _lexicon
+
+
+def preload(scorer: Optional[str] = None):
+    """Build the configured scorer now, so a missing lexicon fails at startup"""
+    if (scorer or SENTIMENT_SCORER) == LEXICON:
+        get_lexicon()
+
+
+def textblob_polarities(messages: Sequence[str]) -> List[float]:
+    from textblob import TextBlob
+
+    return [TextBlob(message).sentiment.polarity for message in messages]
+
+
+def lexicon_polarities(messages: Sequence[str]) -> List[float]:
+    return get_lexicon().polarities(messages).tolist()
+
+
+SCORERS = {LEXICON: lexicon_polarities, TEXTBLOB: textblob_polarities}
+
+
+def sentiment_polarities(messages: Sequence[str], scorer: Optional[str] = None) -> List[float]:
+    """Polarity per message from the configured scorer (``SENTIMENT_SCORER``)"""
+    name = scorer or SENTIMENT_SCORER
+    try:
+        score = SCORERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown sentiment scorer: {name}") from None
+    return score(messages) if messages else []
+
+
+def get_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {"scorer": SENTIMENT_SCORER}
+    if _lexicon is not None:
+        stats["lexicon"] = _lexicon.get_stats()
+    return stats
@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 """
 NeuraWell AI Service Startup Script
+
+    python start.py                          # interactive development server (--reload)
+    python start.py --production             # single-worker production server
+    python start.py --production --workers 4 # 4 sharded instances behind router.py
 """
 
+import argparse
+import importlib.util
 import os
 import sys
 import subprocess
 import logging
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,8 +21,8 @@ logger = logging.getLogger(__name__)
 
 def check_python_version():
     """Check if Python version is compatible"""
-    if sys.version_info < (3, 8):
-        logger.error("Python 3.8 or higher is required")
+    if sys.version_info < (3, 10):
+        logger.error("Python 3.10 or higher is required")
         sys.exit(1)
     logger.info(f"Python version: {sys.version}")
 
@@ -58,8 +65,82 @@ def start_ai_service():
         logger.error(f"Error starting AI service: {e}")
         sys.exit(1)
 
+def _optional_impl(module: str, fallback: str) -> str:
+    """Use an optional accelerator (uvloop, httptools) when it is installed"""
+    if importlib.util.find_spec(module) is not None:
+        return module
+    logger.info(f"{module} not installed, using {fallback}")
+    return fallback
+
+def _memory_mb(pid: int) -> dict:
+    """RSS and PSS for a pid, Linux only"""
+    usage = {}
+    for path, key, label in (
+        (f"/proc/{pid}/status", "VmRSS:", "rss_mb"),
+        (f"/proc/{pid}/smaps_rollup", "Pss:", "pss_mb"),
+    ):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(key):
+                        usage[label] = round(int(line.split()[1]) / 1024, 1)
+                        break
+        except OSError:
+            pass
+    return usage
+
+def start_production(args):
+    """Serve one preloaded worker; more workers run as router.py shards"""
+    if args.workers > 1:
+        # Workers sharing one port would split each user's profile, history and
+        # crisis stream across processes and overwrite each other's state file.
+        # Shards get their own state files and users are routed consistently.
+        here = os.path.dirname(os.path.abspath(__file__))
+        logger.info(f"Starting {args.workers} single-worker shards behind router.py")
+        os.execv(sys.executable, [
+            sys.executable, os.path.join(here, "router.py"), "--spawn", str(args.workers),
+            "--host", args.host, "--port", str(args.port), "--shard-base-port", str(args.port + 1),
+        ])
+
+    started = time.perf_counter()
+    loop_impl = _optional_impl("uvloop", "asyncio")
+    http_impl = _optional_impl("httptools", "h11")
+
+    # Importing main builds the agent: rulesets compiled, state loaded, NLTK data read
+    import main as service
+    import uvicorn
+    logger.info(f"Preloaded application in {time.perf_counter() - started:.2f}s, "
+                f"memory: {_memory_mb(os.getpid())}")
+
+    class Server(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            # The drain and the state flush share one SHUTDOWN_TIMEOUT deadline
+            service.begin_shutdown()
+            super().handle_exit(sig, frame)
+
+    # On SIGTERM sessions close with 1012 and state is flushed on shutdown
+    service.SHUTDOWN_TIMEOUT = args.shutdown_timeout
+    config = uvicorn.Config(service.app, host=args.host, port=args.port, loop=loop_impl, http=http_impl,
+                            log_level="info", timeout_graceful_shutdown=int(args.shutdown_timeout),
+                            ws_per_message_deflate=service.WS_PER_MESSAGE_DEFLATE)
+    Server(config).run()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="NeuraWell AI Service launcher")
+    parser.add_argument("--production", action="store_true",
+                        default=os.getenv("AI_ENV", "").lower() == "production",
+                        help="non-interactive, no reload")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "1")),
+                        help="more than 1 starts that many sharded instances behind router.py")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--install", action="store_true", help="install requirements before starting")
+    parser.add_argument("--shutdown-timeout", type=float, default=float(os.getenv("SHUTDOWN_TIMEOUT", "30")))
+    return parser.parse_args()
+
 def main():
     """Main startup function"""
+    args = parse_args()
     logger.info("=" * 50)
     logger.info("NeuraWell AI Service Startup")
     logger.info("=" * 50)
@@ -67,12 +148,21 @@ def main():
     check_python_version()
     create_directories()
     
+    if args.production:
+        if args.install:
+            install_requirements()
+        start_production(args)
+        return
+    
     # Ask user if they want to install requirements
-    install_deps = input("Install/update requirements? (y/n): ").lower().strip()
-    if install_deps in ['y', 'yes', '']:
+    if args.install:
         install_requirements()
+    elif sys.stdin.isatty():
+        install_deps = input("Install/update requirements? (y/n): ").lower().strip()
+        if install_deps in ['y', 'yes', '']:
+            install_requirements()
     
     start_ai_service()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
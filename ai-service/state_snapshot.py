@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Binary, memory-mappable snapshot format for agent state.
+
+Layout (little-endian, sections 8-byte aligned)::
+
+    header   magic, format version, profile count, section offsets,
+             CRC-32 of meta, columns and index
+    meta     JSON: learning_stats, neural_network, learned_patterns, personality
+    columns  one fixed-width array per field, ``count`` entries each:
+             last_interaction (int64 us), utc offset (int32 s), history length,
+             one uint32 counter per emotion, blob offset (uint64), blob length,
+             blob CRC-32
+    index    (uint64 blake2b hash of user_id, uint32 row), sorted by hash
+    blobs    per profile, length-prefixed fields: user_id, preferences,
+             conversation_history, learned_insights, extra emotional_patterns
+
+Opening a snapshot maps the file, checks the header's section bounds and the
+checksum of everything before the blobs; a profile is decoded, and its blob
+checked, when it is first asked for. A truncated or corrupted file raises
+``ValueError`` rather than yielding garbage profiles. Counters and
+timestamps can be read from the columns without decoding any blob. Version 1
+files (no checksums) are still read.
+
+    python state_snapshot.py convert data/ai_state.json data/ai_state.snap
+    python state_snapshot.py verify data/ai_state.json data/ai_state.snap
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+MAGIC = b"NWSNAP\x00\x00"
+FORMAT_VERSION = 2
+PREFIX = struct.Struct("<8sH")  # magic, version
+HEADER_V1 = struct.Struct("<8sHHIQQQQQ")  # magic, version, flags, count, meta off/len, columns, index, blobs
+HEADER = struct.Struct("<8sHHIQQQQQII")  # ..., CRC-32 of meta through index, reserved
+FIELD_LENGTH = struct.Struct("<I")
+
+# Fixed counter columns; other emotional_patterns keys are kept in the blob
+EMOTION_COLUMNS = ("anxiety", "depression", "stress", "joy", "anger", "sadness", "neutral")
+
+NAIVE = -(2 ** 31)
+_EPOCH = datetime(1970, 1, 1)
+
+# (name, array typecode) in on-disk order
+COLUMNS_V1 = (
+    ("last_interaction_us", "q"),
+    ("utc_offset_s", "i"),
+    ("history_length", "I"),
+    *((f"emotion_{name}", "I") for name in EMOTION_COLUMNS),
+    ("blob_offset", "Q"),
+    ("blob_length", "I"),
+)
+COLUMNS = COLUMNS_V1 + (("blob_crc", "I"),)
+
+if sys.byteorder != "little":
+    raise ImportError("state_snapshot requires a little-endian platform")
+
+
+def user_hash(user_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _encode_time(value: Any) -> Tuple[int, int]:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    offset = value.utcoffset()
+    wall = value.replace(tzinfo=None)
+    micros = (wall - _EPOCH) // timedelta(microseconds=1)
+    return micros, NAIVE if offset is None else int(offset.total_seconds())
+
+
+def _decode_time(micros: int, offset: int) -> datetime:
+    wall = _EPOCH + timedelta(microseconds=micros)
+    if offset == NAIVE:
+        return wall
+    return wall.replace(tzinfo=timezone(timedelta(seconds=offset)))
+
+
+def _pack_fields(*fields: bytes) -> bytes:
+    return b"".join(FIELD_LENGTH.pack(len(field)) + field for field in fields)
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class SnapshotWriter:
+    """Streams profiles into a snapshot file, written atomically on close"""
+
+    def __init__(self, path: str, meta: Dict[str, Any]):
+        self.path = path
+        self.meta = _dumps(meta)
+        self.columns = {name: array(code) for name, code in COLUMNS}
+        self.hashes = array("Q")
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        self._blobs = tempfile.TemporaryFile(dir=directory)
+        self._blob_size = 0
+        self._seen = set()
+
+    def add(self, profile: Dict[str, Any]):
+        """Append a profile given as a plain dict (UserProfile.dict() shape)"""
+        user_id = profile["user_id"]
+        patterns = profile.get("emotional_patterns") or {}
+        # Unknown emotions and explicit zeros do not fit the counter columns
+        extra = {k: v for k, v in patterns.items() if k not in EMOTION_COLUMNS or not v}
+        blob = _pack_fields(
+            user_id.encode("utf-8"),
+            _dumps(profile.get("preferences") or {}),
+            _dumps(profile.get("conversation_history") or []),
+            _dumps(profile.get("learned_insights") or []),
+            _dumps(extra),
+        )
+        micros, offset = _encode_time(profile["last_interaction"])
+        counters = [int(patterns.get(name, 0)) for name in EMOTION_COLUMNS]
+        self._append(user_id, blob, micros, offset, len(profile.get("conversation_history") or []), counters)
+
+    def add_raw(self, reader: "SnapshotReader", row: int):
+        """Copy a profile from another snapshot without decoding it"""
+        user_id = reader.user_id_at(row)
+        columns = reader._columns
+        self._append(
+            user_id,
+            reader.blob_at(row),
+            columns["last_interaction_us"][row],
+            columns["utc_offset_s"][row],
+            columns["history_length"][row],
+            [columns[f"emotion_{name}"][row] for name in EMOTION_COLUMNS],
+        )
+
+    def _append(self, user_id, blob, micros, offset, history_length, counters):
+        if user_id in self._seen:
+            raise ValueError(f"Duplicate profile {user_id!r} in snapshot")
+        self._seen.add(user_id)
+        columns = self.columns
+        columns["last_interaction_us"].append(micros)
+        columns["utc_offset_s"].append(offset)
+        columns["history_length"].append(history_length)
+        for name, value in zip(EMOTION_COLUMNS, counters):
+            columns[f"emotion_{name}"].append(value)
+        columns["blob_offset"].append(self._blob_size)
+        columns["blob_length"].append(len(blob))
+        columns["blob_crc"].append(zlib.crc32(blob))
+        self.hashes.append(user_hash(user_id))
+        self._blobs.write(blob)
+        self._blob_size += len(blob)
+
+    def close(self):
+        count = len(self.hashes)
+        order = sorted(range(count), key=self.hashes.__getitem__)
+        index_hashes = array("Q", (self.hashes[i] for i in order))
+        index_rows = array("I", order)
+
+        meta_offset = _align(HEADER.size)
+        columns_offset = _align(meta_offset + len(self.meta))
+        offset = columns_offset
+        for name, _ in COLUMNS:
+            offset = _align(offset + len(self.columns[name]) * self.columns[name].itemsize)
+        index_offset = offset
+        blob_offset = _align(index_offset + count * 12)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w+b") as f:
+            f.seek(meta_offset)
+            f.write(self.meta)
+            f.seek(columns_offset)
+            for name, _ in COLUMNS:
+                self.columns[name].tofile(f)
+                f.seek(_align(f.tell()))
+            f.seek(index_offset)
+            index_hashes.tofile(f)
+            index_rows.tofile(f)
+            # Padding up to the blobs is written as zeros, so it is part of the checksum too
+            f.truncate(blob_offset)
+            f.seek(meta_offset)
+            crc = _crc_file(f, blob_offset - meta_offset)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, count, meta_offset, len(self.meta),
+                                columns_offset, index_offset, blob_offset, crc, 0))
+            f.seek(blob_offset)
+            self._blobs.seek(0)
+            shutil.copyfileobj(self._blobs, f, 1 << 20)
+            f.flush()
+            os.fsync(f.fileno())
+        self._blobs.close()
+        os.replace(tmp_path, self.path)
+
+
+def _crc_file(f, length: int, chunk: int = 1 << 20) -> int:
+    crc = 0
+    while length > 0:
+        data = f.read(min(chunk, length))
+        if not data:
+            break
+        crc = zlib.crc32(data, crc)
+        length -= len(data)
+    return crc
+
+
+class SnapshotReader:
+    """Memory-mapped view of a snapshot; profiles are decoded on demand"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        path = self.path
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_V1.size:
+            raise ValueError(f"{path} is truncated: {size} bytes")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._size = size
+
+        magic, version = PREFIX.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a NeuraWell snapshot")
+        if version == 1:
+            header, columns = HEADER_V1, COLUMNS_V1
+        elif version == FORMAT_VERSION:
+            header, columns = HEADER, COLUMNS
+        else:
+            raise ValueError(f"Unsupported snapshot version {version}")
+        if size < header.size:
+            raise ValueError(f"{path} is truncated: {size} bytes")
+        _, _, _, count, meta_off, meta_len, columns_off, index_off, blob_off, *crc = header.unpack_from(self._map, 0)
+        self.version = version
+
+        # Every section must lie inside the file, in order
+        columns_end = columns_off
+        for _, code in columns:
+            columns_end = _align(columns_end + count * array(code).itemsize)
+        if not (header.size <= meta_off and meta_off + meta_len <= columns_off and columns_end <= index_off
+                and index_off + count * 12 <= blob_off <= size):
+            raise ValueError(f"{path} is truncated or corrupted: sections out of bounds")
+        if crc and zlib.crc32(self._view[meta_off:blob_off]) != crc[0]:
+            raise ValueError(f"{path} is corrupted: header sections fail their checksum")
+
+        self.count = count
+        self._meta_range = (meta_off, meta_off + meta_len)
+        self._blob_offset = blob_off
+        self._columns: Dict[str, memoryview] = {}
+        offset = columns_off
+        for name, code in columns:
+            size = count * array(code).itemsize
+            self._columns[name] = self._view[offset:offset + size].cast(code)
+            offset = _align(offset + size)
+        self._index_hashes = self._view[index_off:index_off + count * 8].cast("Q")
+        self._index_rows = self._view[index_off + count * 8:index_off + count * 12].cast("I")
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        start, end = self._meta_range
+        return json.loads(bytes(self._view[start:end]))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.find(user_id) is not None
+
+    def find(self, user_id: str) -> Optional[int]:
+        """Row number for a user, by binary search over the hash index"""
+        target = user_hash(user_id)
+        hashes = self._index_hashes
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if hashes[mid] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self.count and hashes[lo] == target:
+            row = self._index_rows[lo]
+            if self.user_id_at(row) == user_id:
+                return row
+            lo += 1
+        return None
+
+    def _blob_range(self, row: int) -> Tuple[int, int]:
+        start = self._blob_offset + self._columns["blob_offset"][row]
+        end = start + self._columns["blob_length"][row]
+        if end > self._size:
+            raise ValueError(f"{self.path} is truncated: profile {row} runs past the end of the file")
+        return start, end
+
+    def blob_at(self, row: int) -> bytes:
+        self._check_blob(row)
+        start, end = self._blob_range(row)
+        return bytes(self._view[start:end])
+
+    def _fields(self, row: int, limit: int = 5) -> list:
+        start, end = self._blob_range(row)
+        fields = []
+        for _ in range(limit):
+            if start + FIELD_LENGTH.size > end:
+                raise ValueError(f"{self.path} is corrupted: profile {row} has too few fields")
+            (length,) = FIELD_LENGTH.unpack_from(self._map, start)
+            start += FIELD_LENGTH.size
+            if start + length > end:
+                raise ValueError(f"{self.path} is corrupted: profile {row} field overruns its blob")
+            fields.append(self._view[start:start + length])
+            start += length
+        return fields
+
+    def _check_blob(self, row: int):
+        if "blob_crc" in self._columns:
+            start, end = self._blob_range(row)
+            if zlib.crc32(self._view[start:end]) != self._columns["blob_crc"][row]:
+                raise ValueError(f"{self.path} is corrupted: profile {row} fails its checksum")
+
+    def user_id_at(self, row: int) -> str:
+        return bytes(self._fields(row, 1)[0]).decode("utf-8")
+
+    def last_interaction_at(self, row: int) -> datetime:
+        return _decode_time(self._columns["last_interaction_us"][row], self._columns["utc_offset_s"][row])
+
+    def emotion_counts_at(self, row: int) -> Dict[str, int]:
+        return {name: self._columns[f"emotion_{name}"][row] for name in EMOTION_COLUMNS}
+
+    def record_at(self, row: int) -> Dict[str, Any]:
+        """Decode one profile into a UserProfile-shaped dict"""
+        self._check_blob(row)
+        user_id, preferences, history, insights, extra = self._fields(row)
+        patterns = {k: v for k, v in self.emotion_counts_at(row).items() if v}
+        patterns.update(json.loads(bytes(extra)))
+        return {
+            "user_id": bytes(user_id).decode("utf-8"),
+            "preferences": json.loads(bytes(preferences)),
+            "conversation_history": json.loads(bytes(history)),
+            "emotional_patterns": patterns,
+            "learned_insights": json.loads(bytes(insights)),
+            "last_interaction": self.last_interaction_at(row),
+        }
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        row = self.find(user_id)
+        return None if row is None else self.record_at(row)
+
+    def user_ids(self) -> Iterator[str]:
+        for row in range(self.count):
+            yield self.user_id_at(row)
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        for row in range(self.count):
+            yield self.record_at(row)
+
+    def close(self):
+        for view in getattr(self, "_columns", {}).values():
+            view.release()
+        for name in ("_index_hashes", "_index_rows", "_view"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def write_snapshot(path: str, meta: Dict[str, Any], profiles: Iterable[Dict[str, Any]]):
+    writer = SnapshotWriter(path, meta)
+    for profile in profiles:
+        writer.add(profile)
+    writer.close()
+
+
+def convert_json(json_path: str, snapshot_path: str) -> int:
+    """Convert a data/ai_state.json file into a snapshot; returns profile count"""
+    with open(json_path, "r") as f:
+        state = json.load(f)
+    profiles = state.pop("user_profiles", {})
+    write_snapshot(snapshot_path, state, profiles.values())
+    return len(profiles)
+
+
+def _normalize(profile: Dict[str, Any]) -> Dict[str, Any]:
+    normalized = dict(profile)
+    value = normalized["last_interaction"]
+    normalized["last_interaction"] = datetime.fromisoformat(value) if isinstance(value, str) else value
+    normalized["emotional_patterns"] = dict(profile.get("emotional_patterns") or {})
+    return normalized
+
+
+def verify(json_path: str, snapshot_path: str) -> int:
+    """Check that every profile and the metadata round-trip exactly"""
+    with open(json_path, "r") as f:
+        state = json.load(f)
+    profiles = state.pop("user_profiles", {})
+    reader = SnapshotReader(snapshot_path)
+    try:
+        if reader.meta != json.loads(_dumps(state)):
+            raise ValueError("Snapshot metadata differs from JSON state")
+        if len(reader) != len(profiles):
+            raise ValueError(f"Snapshot has {len(reader)} profiles, JSON has {len(profiles)}")
+        for uid, profile in profiles.items():
+            record = reader.get(uid)
+            if record is None or _normalize(record) != _normalize(profile):
+                raise ValueError(f"Profile {uid!r} differs after conversion")
+    finally:
+        reader.close()
+    return len(profiles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NeuraWell state snapshot tool")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("convert", "verify"):
+        command = sub.add_parser(name)
+        command.add_argument("json_path")
+        command.add_argument("snapshot_path")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        count = convert_json(args.json_path, args.snapshot_path)
+        print(f"Wrote {count} profiles to {args.snapshot_path}")
+    else:
+        count = verify(args.json_path, args.snapshot_path)
+        print(f"Verified {count} profiles")
+
+
+if __name__ == "__main__":
+    main()
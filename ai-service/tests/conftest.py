@@ -0,0 +1,38 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+import uvicorn
+
+# Keep the agent's state files out of data/ while the service modules load
+_state = tempfile.mkdtemp(prefix="neurawell-tests-")
+os.environ.setdefault("AI_STATE_PATH", os.path.join(_state, "ai_state.json"))
+os.environ.setdefault("AI_SNAPSHOT_PATH", os.path.join(_state, "ai_state.snap"))
+os.environ.setdefault("PROFILE_COLD_PATH", os.path.join(_state, "profiles_cold.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def serve():
+    """Run ASGI apps under uvicorn on free local ports; returns ``serve(app) -> base URL``"""
+    servers = []
+
+    def start(app) -> str:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        servers.append(server)
+        return f"http://127.0.0.1:{port}"
+
+    yield start
+    for server in servers:
+        server.should_exit = True
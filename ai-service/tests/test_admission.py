@@ -0,0 +1,83 @@
+"""Admission control: the crisis lane's budget and WebSocket slot accounting."""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Rejected
+from inference_scheduler import PRIORITY_CRISIS
+
+
+def controller(**overrides):
+    options = dict(max_concurrent=1, max_queue=1, queue_timeout=0.05, rate_per_second=0,
+                   max_crisis_queue=2, crisis_queue_timeout=0.1,
+                   crisis_rate_per_second=0, crisis_rate_burst=1)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+def test_crisis_waiters_beyond_their_queue_are_demoted_and_shed():
+    async def run():
+        admission = controller()
+        await admission.acquire("holder")
+        crisis = [asyncio.ensure_future(admission.acquire(f"c{i}", PRIORITY_CRISIS)) for i in range(2)]
+        await asyncio.sleep(0)
+        assert admission.get_stats()["crisis_waiting"] == 2
+
+        # The crisis queue is full; this one competes as normal traffic,
+        # and the normal queue (max_queue=1) is already taken by crisis waiters
+        with pytest.raises(Rejected) as shed:
+            await admission.acquire("c-extra", PRIORITY_CRISIS)
+        assert shed.value.reason == "overloaded"
+        assert admission.counters["crisis_demoted"] == 1
+
+        for _ in crisis:
+            admission.release()
+        await asyncio.gather(*crisis)
+        assert admission.get_stats()["crisis_waiting"] == 0
+
+    asyncio.run(run())
+
+
+def test_crisis_waits_are_bounded():
+    async def run():
+        admission = controller()
+        await admission.acquire("holder")
+        with pytest.raises(Rejected) as shed:
+            await admission.acquire("c1", PRIORITY_CRISIS)
+        assert shed.value.reason == "queue_timeout"
+        assert admission.get_stats()["crisis_waiting"] == 0
+        assert admission.get_stats()["waiting"] == 0
+
+    asyncio.run(run())
+
+
+def test_crisis_rate_budget_demotes_a_flood_from_one_user():
+    async def run():
+        admission = controller(rate_per_second=1, rate_burst=1,
+                               crisis_rate_per_second=0.01, crisis_rate_burst=2)
+        for _ in range(2):
+            await admission.acquire("u1", PRIORITY_CRISIS)
+            admission.release()
+        # Crisis budget spent: the next one is normal traffic and uses u1's normal token
+        await admission.acquire("u1", PRIORITY_CRISIS)
+        admission.release()
+        with pytest.raises(Rejected) as shed:
+            await admission.acquire("u1", PRIORITY_CRISIS)
+        assert shed.value.reason == "rate_limited"
+        assert admission.counters["crisis_demoted"] == 2
+
+    asyncio.run(run())
+
+
+def test_failed_websocket_handshake_returns_its_connection_slot():
+    main = pytest.importorskip("main")
+
+    class FailingHandshake:
+        async def accept(self):
+            raise RuntimeError("handshake failed")
+
+    before = main.admission.ws_connections
+    asyncio.run(main.websocket_endpoint(FailingHandshake(), "u1"))
+    assert main.admission.ws_connections == before
+    assert "u1" not in main.manager.user_sessions
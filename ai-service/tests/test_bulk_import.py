@@ -0,0 +1,74 @@
+"""Bulk import: spawned analysis workers and a merge that yields to the event loop."""
+
+import asyncio
+import json
+
+import pytest
+
+import bulk_import
+
+
+def test_import_merges_rows_in_time_order(tmp_path):
+    main = pytest.importorskip("main")
+    agent = main.ai_agent
+    rows = 300
+    path = tmp_path / "export.ndjson"
+    with open(path, "w") as f:
+        for i in range(rows):
+            f.write(json.dumps({
+                "user_id": f"import-{i % 7}",
+                "message": "I could not sleep again, so worried about work" if i % 2 else "A calm walk today",
+                "timestamp": f"2024-03-{1 + i % 28:02d}T10:00:00",
+            }) + "\n")
+
+    result = asyncio.run(bulk_import.run_import(agent, str(path), chunk_rows=100, processes=2))
+    assert result["imported"] == rows
+    assert result["users"] == 7
+    history = agent._get_user_profile("import-1").conversation_history
+    timestamps = [entry["timestamp"] for entry in history]
+    assert timestamps == sorted(timestamps)
+
+
+def test_merge_yields_to_the_event_loop_between_rows(tmp_path):
+    main = pytest.importorskip("main")
+    from datetime import datetime
+
+    path = tmp_path / "empty.ndjson"
+    path.write_text("")
+    run = bulk_import.ImportRun(main.ai_agent, str(path))
+    rows = [(f"merge-{i}", "A quiet evening", datetime(2024, 1, 1, 12, i), "neutral") for i in range(50)]
+
+    async def merge_with_ticker():
+        ticks = 0
+        merge = asyncio.ensure_future(run._merge(rows, []))
+        while not merge.done():
+            ticks += 1
+            await asyncio.sleep(0)
+        await merge
+        return ticks
+
+    assert asyncio.run(merge_with_ticker()) >= len(rows)
+    assert run.stats["imported"] == len(rows)
+
+
+def test_pool_workers_are_spawned():
+    assert bulk_import._pool_context().get_start_method() == "spawn"
+
+
+def _worker_modules(texts):
+    import sys
+
+    return bulk_import._analyze_chunk(texts), "ai_agent" in sys.modules, "main" in sys.modules
+
+
+def test_pool_workers_do_not_import_the_agent():
+    from concurrent.futures import ProcessPoolExecutor
+
+    from ruleset import DEFAULT_RULESET_PATH
+
+    with ProcessPoolExecutor(1, mp_context=bulk_import._pool_context(), initializer=bulk_import._init_worker,
+                             initargs=(DEFAULT_RULESET_PATH,)) as pool:
+        emotions, agent_imported, service_imported = pool.submit(_worker_modules, ["I feel so happy today"]).result()
+    assert emotions == ["joy"]
+    assert not agent_imported
+    assert not service_imported
@@ -0,0 +1,169 @@
+"""Crisis escalation: bus fan-out, priority lanes, and the pre-screen
+publishing before a request waits for admission."""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionController
+from crisis import CrisisEventBus
+from inference_scheduler import PRIORITY_CRISIS, PRIORITY_NORMAL, InferenceScheduler
+
+
+def test_publish_fans_out_to_listeners_and_subscribers():
+    async def run():
+        bus = CrisisEventBus()
+        heard = []
+        bus.add_listener(heard.append)
+        first, second = bus.subscribe(), bus.subscribe()
+
+        event = bus.publish("u1", "prescreen", 3, keywords=["kill myself"])
+
+        assert heard == [event]
+        assert await first.get() is event
+        assert await second.get() is event
+        assert list(bus.recent) == [event]
+        assert event["keywords"] == ["kill myself"]
+
+        second.close()
+        bus.publish("u2", "assessed", 7)
+        assert (await first.get())["user_id"] == "u2"
+        assert second.queue.empty()
+        assert bus.get_stats()["subscribers"] == 1
+
+    asyncio.run(run())
+
+
+def test_slow_subscriber_drops_oldest_without_blocking_publish():
+    async def run():
+        bus = CrisisEventBus()
+        slow = bus.subscribe(max_queue=2)
+        for level in range(5):
+            bus.publish("u1", "prescreen", level)
+        assert slow.dropped == 3
+        assert [(await slow.get())["crisis_level"] for _ in range(2)] == [3, 4]
+
+    asyncio.run(run())
+
+
+def test_failing_listener_does_not_stop_fan_out():
+    async def run():
+        bus = CrisisEventBus()
+
+        def broken(event):
+            raise RuntimeError("dashboard down")
+
+        bus.add_listener(broken)
+        subscription = bus.subscribe()
+        bus.publish("u1", "prescreen", 3)
+        assert (await subscription.get())["user_id"] == "u1"
+
+    asyncio.run(run())
+
+
+def test_scheduler_runs_crisis_items_before_queued_normal_items():
+    order = []
+
+    def batch(items):
+        order.extend(items)
+        return items
+
+    async def run():
+        scheduler = InferenceScheduler(batch, name="test", max_batch_size=1, max_wait_ms=0)
+        scheduler.start()
+        # Occupy the single worker so the rest queue up behind it
+        blocker = asyncio.ensure_future(scheduler.submit("first"))
+        await asyncio.sleep(0)
+        normal = [asyncio.ensure_future(scheduler.submit(f"normal-{i}")) for i in range(3)]
+        crisis = asyncio.ensure_future(scheduler.submit("crisis", PRIORITY_CRISIS))
+        await asyncio.gather(blocker, crisis, *normal)
+        await scheduler.stop()
+
+    asyncio.run(run())
+    assert order[0] == "first"
+    assert order[1] == "crisis"
+    assert order[2:] == ["normal-0", "normal-1", "normal-2"]
+
+
+def test_admission_hands_a_freed_slot_to_crisis_waiters_first():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=5,
+                                         rate_per_second=0)
+        await controller.acquire("holder")
+        admitted = []
+
+        async def wait(user_id, priority):
+            await controller.acquire(user_id, priority)
+            admitted.append(user_id)
+            controller.release()
+
+        waiters = [asyncio.ensure_future(wait(f"normal-{i}", PRIORITY_NORMAL)) for i in range(2)]
+        waiters.append(asyncio.ensure_future(wait("crisis", PRIORITY_CRISIS)))
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(*waiters)
+        return admitted
+
+    assert asyncio.run(run()) == ["crisis", "normal-0", "normal-1"]
+
+
+@pytest.fixture
+def service(monkeypatch):
+    main = pytest.importorskip("main")
+    monkeypatch.setattr(main, "CLINICIAN_TOKEN", "clinician-secret")
+    return main
+
+
+def test_prescreen_publishes_before_waiting_for_admission(service, monkeypatch):
+    from models import ChatMessage
+
+    async def run():
+        bus = CrisisEventBus()
+        monkeypatch.setattr(service.ai_agent, "crisis_bus", bus)
+        controller = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=5,
+                                         rate_per_second=0)
+        monkeypatch.setattr(service, "admission", controller)
+        subscription = bus.subscribe()
+
+        # Saturate admission: the chat request has to queue for its slot
+        await controller.acquire("someone-else")
+        message = ChatMessage(text="I want to kill myself tonight", user_id="crisis-user")
+        request = asyncio.ensure_future(service.chat_with_ai(message, fields="crisis_level"))
+
+        event = await asyncio.wait_for(subscription.get(), timeout=1)
+        assert not request.done()
+        assert controller.get_stats()["waiting"] == 1
+        assert event["stage"] == "prescreen"
+        assert event["user_id"] == "crisis-user"
+        assert event["keywords"] == ["kill myself"]
+
+        controller.release()
+        await asyncio.wait_for(request, timeout=30)
+        await service.ai_agent.emotion_scheduler.stop()
+        stages = [e["stage"] for e in bus.recent]
+        # Scanned once: the pre-screen event is not published a second time
+        assert stages.count("prescreen") == 1
+
+    asyncio.run(run())
+
+
+def test_crisis_feeds_require_the_clinician_token(service, monkeypatch):
+    from fastapi.testclient import TestClient
+    from starlette.websockets import WebSocketDisconnect
+
+    client = TestClient(service.app)
+    assert client.get("/ai/crisis/events").status_code == 403
+    assert client.get("/ai/crisis/events", params={"token": "clinician-secret"}).status_code == 403
+    assert client.get("/ai/crisis/events", headers={"X-Clinician-Token": "wrong"}).status_code == 403
+    assert client.get("/ai/crisis/events", headers={"X-Clinician-Token": "clinician-secret"}).status_code == 200
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/ws/clinician/crisis"):
+            pass
+    assert closed.value.code == 1008
+
+    monkeypatch.setattr(service, "CLINICIAN_TOKEN", "")
+    assert client.get("/ai/crisis/events", headers={"X-Clinician-Token": ""}).status_code == 403
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/ws/clinician/crisis?token="):
+            pass
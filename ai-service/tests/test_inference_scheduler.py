@@ -0,0 +1,141 @@
+"""Micro-batching scheduler: batch windows, priorities, failures and shutdown."""
+
+import asyncio
+import threading
+
+import pytest
+
+from inference_scheduler import PRIORITY_CRISIS, PRIORITY_NORMAL, InferenceScheduler
+
+
+def _recording(batches):
+    def batch(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+    return batch
+
+
+def test_concurrent_items_share_a_batch_up_to_max_batch_size():
+    batches = []
+
+    async def run():
+        scheduler = InferenceScheduler(_recording(batches), name="test", max_batch_size=2, max_wait_ms=50)
+        results = await asyncio.gather(*(scheduler.submit(i) for i in range(5)))
+        await scheduler.stop()
+        return results, scheduler.get_stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [0, 10, 20, 30, 40]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert stats["requests"] == 5
+    assert stats["batches"] == 3
+    assert stats["max_batch_seen"] == 2
+
+
+def test_batch_window_closes_after_max_wait():
+    batches = []
+
+    async def run():
+        scheduler = InferenceScheduler(_recording(batches), name="test", max_batch_size=16, max_wait_ms=20)
+        first = await scheduler.submit(1)
+        # Arrives after the first window closed: a batch of its own
+        second = await scheduler.submit(2)
+        await scheduler.stop()
+        return first, second
+
+    assert asyncio.run(run()) == (10, 20)
+    assert batches == [[1], [2]]
+
+
+def test_queued_items_run_by_priority_then_arrival():
+    order = []
+
+    def batch(items):
+        order.extend(items)
+        return items
+
+    async def run():
+        scheduler = InferenceScheduler(batch, name="test", max_batch_size=1, max_wait_ms=0)
+        scheduler.start()
+        blocker = asyncio.ensure_future(scheduler.submit("first"))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.ensure_future(scheduler.submit(item, priority))
+            for item, priority in [("n1", PRIORITY_NORMAL), ("c1", PRIORITY_CRISIS),
+                                   ("n2", PRIORITY_NORMAL), ("c2", PRIORITY_CRISIS)]
+        ]
+        await asyncio.gather(blocker, *waiting)
+        await scheduler.stop()
+
+    asyncio.run(run())
+    assert order == ["first", "c1", "c2", "n1", "n2"]
+
+
+def test_batch_error_reaches_every_caller_and_the_scheduler_carries_on():
+    calls = []
+
+    def batch(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError("model failed")
+        return items
+
+    async def run():
+        scheduler = InferenceScheduler(batch, name="test", max_batch_size=4, max_wait_ms=20)
+        failed = await asyncio.gather(scheduler.submit("a"), scheduler.submit("b"), return_exceptions=True)
+        after = await scheduler.submit("c")
+        await scheduler.stop()
+        return failed, after
+
+    failed, after = asyncio.run(run())
+    assert all(isinstance(e, RuntimeError) for e in failed)
+    assert after == "c"
+
+
+def test_result_count_mismatch_fails_the_batch():
+    async def run():
+        scheduler = InferenceScheduler(lambda items: items[:1], name="test", max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(scheduler.submit(1), scheduler.submit(2), return_exceptions=True)
+        await scheduler.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(e, ValueError) for e in results)
+
+
+def test_stop_while_collecting_answers_the_collected_items():
+    batches = []
+
+    async def run():
+        # The window is far longer than the test: stop() lands mid-collection
+        scheduler = InferenceScheduler(_recording(batches), name="test", max_batch_size=16, max_wait_ms=60000)
+        callers = [asyncio.ensure_future(scheduler.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        assert not any(caller.done() for caller in callers)
+        await asyncio.wait_for(scheduler.stop(), timeout=5)
+        return await asyncio.wait_for(asyncio.gather(*callers), timeout=1)
+
+    assert asyncio.run(run()) == [0, 10, 20]
+    assert batches == [[0, 1, 2]]
+
+
+def test_cancelled_batch_cancels_its_callers():
+    release = threading.Event()
+
+    def batch(items):
+        release.wait(5)
+        return items
+
+    async def run():
+        scheduler = InferenceScheduler(batch, name="test", max_batch_size=4, max_wait_ms=0)
+        caller = asyncio.ensure_future(scheduler.submit("a"))
+        while not scheduler._inflight:
+            await asyncio.sleep(0.001)
+        for task in list(scheduler._inflight):
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(caller, timeout=1)
+        release.set()
+        await scheduler.stop()
+
+    asyncio.run(run())
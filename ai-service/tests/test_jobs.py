@@ -0,0 +1,153 @@
+"""Background jobs: progress, results, cancellation and queue limits."""
+
+import asyncio
+import threading
+
+import pytest
+
+from jobs import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobManager, JobQueueFull
+
+
+async def _until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out waiting"
+        await asyncio.sleep(0.005)
+
+
+def test_progress_is_visible_while_running_and_complete_on_success():
+    async def run():
+        manager = JobManager(workers=1, max_queue=4)
+        manager.start()
+        halfway = asyncio.Event()
+
+        async def work(ctx):
+            ctx.report(0.5, "halfway")
+            await halfway.wait()
+            return await ctx.run(sum, [1, 2, 3])
+
+        job = manager.submit("learn", work)
+        await _until(lambda: job.progress == 0.5)
+        seen = job.to_dict()
+        halfway.set()
+        await _until(lambda: job.finished)
+        await manager.stop()
+        return job, seen, manager.get_stats()
+
+    job, seen, stats = asyncio.run(run())
+    assert (seen["status"], seen["message"]) == (RUNNING, "halfway")
+    assert job.status == SUCCEEDED
+    assert (job.result, job.progress) == (6, 1.0)
+    assert job.cpu_seconds >= 0 and job.wall_seconds > 0
+    assert stats["succeeded"] == 1
+
+
+def test_same_kind_is_deduplicated_until_it_finishes():
+    async def run():
+        manager = JobManager(workers=1, max_queue=4)
+        manager.start()
+        release = asyncio.Event()
+
+        async def work(ctx):
+            await release.wait()
+
+        first = manager.submit("learn", work)
+        again = manager.submit("learn", work)
+        upload = manager.submit("learn", work, dedupe=False)
+        release.set()
+        await _until(lambda: first.finished and upload.finished)
+        after = manager.submit("learn", work)
+        await manager.stop()
+        return first, again, upload, after, manager.get_stats()
+
+    first, again, upload, after, stats = asyncio.run(run())
+    assert again is first
+    assert upload is not first and after is not first
+    assert stats["deduplicated"] == 1
+
+
+def test_cancel_queued_and_running_jobs():
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def run():
+        manager = JobManager(workers=1, max_queue=4)
+        manager.start()
+
+        async def work(ctx):
+            return await ctx.run(blocking)
+
+        running = manager.submit("a", work)
+        queued = manager.submit("b", work)
+        await _until(started.is_set)
+        assert queued.status == QUEUED
+        manager.cancel(queued.id)
+        manager.cancel(running.id)
+        await _until(lambda: running.finished)
+        release.set()
+        await manager.stop()
+        return running, queued, manager.get_stats()
+
+    running, queued, stats = asyncio.run(run())
+    assert running.status == CANCELLED and running.result is None
+    assert queued.status == CANCELLED and queued.started_at is None
+    assert stats["cancelled"] == 2
+
+
+def test_failed_job_records_its_error():
+    async def run():
+        manager = JobManager(workers=1, max_queue=4)
+        manager.start()
+
+        async def work(ctx):
+            raise ValueError("bad rows")
+
+        job = manager.submit("import", work)
+        await _until(lambda: job.finished)
+        await manager.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert (job.status, job.error) == (FAILED, "bad rows")
+
+
+def test_full_queue_rejects_new_jobs():
+    async def run():
+        manager = JobManager(workers=1, max_queue=2)
+        manager.start()
+        release = asyncio.Event()
+
+        async def work(ctx):
+            await release.wait()
+
+        busy = manager.submit("busy", work)
+        await _until(lambda: busy.status == RUNNING)
+        waiting = [manager.submit(f"w{i}", work) for i in range(2)]
+        with pytest.raises(JobQueueFull):
+            manager.submit("one-too-many", work)
+        release.set()
+        await _until(lambda: all(job.finished for job in waiting))
+        await manager.stop()
+        return manager.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["submitted"] == 3
+    assert stats["succeeded"] == 3
+
+
+def test_learn_endpoint_answers_503_when_the_queue_is_full(monkeypatch):
+    main = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    def full():
+        raise JobQueueFull("Job queue full (32 pending)")
+
+    monkeypatch.setattr(main.ai_agent, "learn", full)
+    response = TestClient(main.app).post("/ai/learn")
+    assert response.status_code == 503
+    assert "queue full" in response.json()["detail"]
@@ -0,0 +1,34 @@
+"""Journal sections: crisis phrases cut by a section boundary still stop reading."""
+
+import asyncio
+
+import pytest
+
+import journal
+
+# "kill" ends the first 2000-character window and "myself" starts the second
+SPLIT_ENTRY = "word " * 398 + "abc " + "kill myself tonight. " + "calm day. " * 300
+
+
+def test_split_phrase_falls_across_a_cut():
+    (_, cut), _ = list(journal.split_sections(SPLIT_ENTRY, 2000))[:2]
+    start = SPLIT_ENTRY.index("kill myself")
+    assert start < cut < start + len("kill myself")
+
+
+def test_crisis_phrase_split_across_sections_stops_at_its_section():
+    main = pytest.importorskip("main")
+    agent = main.ai_agent
+
+    async def run():
+        try:
+            return await journal.analyze_journal(agent, SPLIT_ENTRY, "journal-split", section_chars=2000)
+        finally:
+            await agent.emotion_scheduler.stop()
+
+    result = asyncio.run(run())
+    assert result["stopped"] == "crisis"
+    assert len(result["sections"]) == 1
+    section = result["sections"][0]
+    assert section["crisis_keywords"] == ["kill myself"]
+    assert section["crisis_level"] >= agent.rules.current.crisis_keyword_weight
@@ -0,0 +1,90 @@
+"""Memory monitor: budget levels, trimming, alarm reporting and tracing limits."""
+
+import asyncio
+
+import pytest
+
+import memory_monitor
+from memory_monitor import MAX_TRACE_FRAMES, MemoryMonitor
+
+
+def _readings(monkeypatch, values):
+    values = iter(values)
+    monkeypatch.setattr(memory_monitor, "process_memory_mb", lambda: {"rss_mb": next(values)})
+
+
+def test_budget_breaches_trim_and_are_reported_as_alarms(monkeypatch):
+    monitor = MemoryMonitor(soft_mb=100, hard_mb=200, interval=60)
+    levels = []
+
+    def trimmer(level):
+        levels.append(level)
+        return {"profiles_evicted": 3}
+
+    def broken(level):
+        raise RuntimeError("nothing to trim")
+
+    monitor.add_trimmer(broken)
+    monitor.add_trimmer(trimmer)
+    # Each check samples before and, when over budget, after trimming
+    _readings(monkeypatch, [50, 150, 120, 250, 180, 90])
+
+    assert [monitor.check() for _ in range(4)] == ["ok", "soft", "hard", "ok"]
+    assert levels == ["soft", "hard"]
+    soft, hard = monitor.alarms
+    assert (soft["level"], soft["rss_before_mb"], soft["rss_after_mb"]) == ("soft", 150, 120)
+    assert (hard["level"], hard["rss_before_mb"], hard["rss_after_mb"]) == ("hard", 250, 180)
+    assert hard["trimmed"] == {"profiles_evicted": 3}
+    assert monitor.stats == {"checks": 4, "soft_trims": 1, "hard_trims": 1}
+    assert monitor.level == "ok"
+
+
+def test_zero_budget_disables_the_level(monkeypatch):
+    monitor = MemoryMonitor(soft_mb=0, hard_mb=0, interval=60)
+    _readings(monkeypatch, [10 ** 6])
+    assert monitor.check() == "ok"
+    assert not monitor.alarms
+
+
+def test_allocation_sampling_clamps_the_frame_depth(monkeypatch):
+    started = []
+    start = memory_monitor.tracemalloc.start
+
+    def recording_start(frames):
+        started.append(frames)
+        start(frames)
+
+    monkeypatch.setattr(memory_monitor.tracemalloc, "start", recording_start)
+    monitor = MemoryMonitor(soft_mb=0, hard_mb=0, interval=60)
+    sites = asyncio.run(monitor.sample_allocations(0, top=3, frames=10 ** 6))
+    asyncio.run(monitor.sample_allocations(0, frames=0))
+    assert started == [MAX_TRACE_FRAMES, 1]
+    assert len(sites) <= 3
+    assert not memory_monitor.tracemalloc.is_tracing()
+
+
+def test_debug_endpoint_reports_breaches_and_caps_frames(monkeypatch):
+    main = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(main.ai_agent.memory, "soft_mb", 0.001)
+    monkeypatch.setattr(main.ai_agent.memory, "hard_mb", 0)
+    monkeypatch.setattr(main.ai_agent.memory, "alarms", type(main.ai_agent.memory.alarms)(maxlen=50))
+    started = []
+    start = memory_monitor.tracemalloc.start
+    monkeypatch.setattr(memory_monitor.tracemalloc, "start", lambda frames: started.append(frames) or start(frames))
+    client = TestClient(main.app)
+    headers = {"X-Admin-Token": "admin-secret"}
+
+    report = client.get("/ai/debug/memory", params={"check": "true"}, headers=headers).json()
+    assert report["process"]["level"] == "soft"
+    assert report["alarms"][-1]["level"] == "soft"
+    assert report["alarms"][-1]["rss_before_mb"] > 0
+
+    sampled = client.get("/ai/debug/memory", params={"sample_seconds": 0.01, "frames": 5000}, headers=headers)
+    assert sampled.status_code == 200
+    assert "tracemalloc" in sampled.json()
+    assert started == [MAX_TRACE_FRAMES]
+    assert not memory_monitor.tracemalloc.is_tracing()
+    assert client.get("/ai/debug/memory").status_code == 403
@@ -0,0 +1,146 @@
+"""Profile cache: budgeted eviction, cold-tier round trips, pinning and counters."""
+
+import asyncio
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+from models import UserProfile
+from profile_cache import ColdProfileStore, ProfileCache
+
+
+def _profile(user_id: str, history: int = 0) -> UserProfile:
+    return UserProfile(
+        user_id=user_id,
+        preferences={"tone": "gentle"},
+        conversation_history=[{"message": f"message {i}", "emotion": "joy"} for i in range(history)],
+        emotional_patterns={"joy": history},
+        learned_insights=["likes walks"],
+        last_interaction=datetime(2024, 3, 2, 23, 41),
+    )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ProfileCache(cold_path=str(tmp_path / "cold_{pid}.db"), max_entries=3, idle_seconds=0)
+    yield cache
+    cache.cold.close()
+
+
+def test_least_recently_used_profiles_go_cold_beyond_the_entry_budget(cache):
+    for i in range(5):
+        cache.put(f"u{i}", _profile(f"u{i}"))
+    cache.get("u2")
+    cache.put("u5", _profile("u5"))
+
+    assert [p.user_id for p in cache.resident_profiles()] == ["u4", "u2", "u5"]
+    assert sorted(cache.cold.user_ids()) == ["u0", "u1", "u3"]
+    assert len(cache) == 6
+    assert cache.get_stats()["evictions"] == 3
+
+
+def test_byte_budget_evicts_until_resident_size_fits(tmp_path):
+    cache = ProfileCache(cold_path=str(tmp_path / "cold_{pid}.db"), max_mb=0.01, max_entries=1000, idle_seconds=0)
+    for i in range(20):
+        cache.put(f"u{i}", _profile(f"u{i}", history=5))
+    stats = cache.get_stats()
+    assert cache.resident_bytes <= cache.max_bytes
+    assert stats["resident"] + stats["cold"] == 20
+    assert stats["cold"] > 0
+    cache.cold.close()
+
+
+def test_evicted_profile_round_trips_through_the_cold_tier(cache):
+    original = _profile("u0", history=3)
+    cache.put("u0", original)
+    for i in range(1, 4):
+        cache.put(f"u{i}", _profile(f"u{i}"))
+    assert "u0" in cache.cold
+
+    restored = cache.get("u0")
+    assert restored == original
+    # The tiers stay disjoint: the resident copy is the only one
+    assert "u0" not in cache.cold
+    assert len(cache) == 4
+    stats = cache.get_stats()
+    assert stats["rehydrations"] == 1
+    assert cache.get("missing") is None
+    assert cache.get_stats()["misses"] == 1
+    assert cache.get_stats()["hits"] == 0
+
+
+def test_load_reads_the_cold_tier_once_on_a_worker_thread(cache, monkeypatch):
+    for i in range(4):
+        cache.put(f"u{i}", _profile(f"u{i}"))
+    reads = []
+    take = cache.cold.take
+
+    def recording_take(user_id):
+        reads.append(threading.current_thread())
+        return take(user_id)
+
+    monkeypatch.setattr(cache.cold, "take", recording_take)
+
+    async def run():
+        return await asyncio.gather(*(cache.load("u0") for _ in range(3)))
+
+    loaded = asyncio.run(run())
+    assert [p.user_id for p in loaded] == ["u0"] * 3
+    assert loaded[0] is loaded[1] is loaded[2]
+    assert len(reads) == 1 and reads[0] is not threading.main_thread()
+    assert cache.get_stats()["rehydrations"] == 1
+
+    assert asyncio.run(cache.load("nobody")) is None
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_pinned_profiles_stay_resident(cache):
+    cache.put("session-user", _profile("session-user"))
+    cache.pin("session-user")
+    for i in range(6):
+        cache.put(f"u{i}", _profile(f"u{i}"))
+    assert "session-user" not in cache.cold
+    assert cache.evict_idle(idle_seconds=0) == 2
+    assert [p.user_id for p in cache.resident_profiles()] == ["session-user"]
+
+    cache.unpin("session-user")
+    assert cache.evict_idle(idle_seconds=0) == 1
+    assert "session-user" in cache.cold
+    assert cache.get_stats()["pinned"] == 0
+
+
+def test_websocket_sessions_pin_their_user():
+    main = pytest.importorskip("main")
+
+    class Socket:
+        async def accept(self):
+            pass
+
+    manager = main.ConnectionManager()
+    socket = Socket()
+    asyncio.run(manager.connect(socket, "pinned-user"))
+    assert "pinned-user" in main.ai_agent.user_profiles._pins
+    manager.disconnect(socket, "pinned-user")
+    assert "pinned-user" not in main.ai_agent.user_profiles._pins
+
+
+def test_default_cold_path_is_per_process(monkeypatch):
+    monkeypatch.delenv("PROFILE_COLD_PATH", raising=False)
+    assert "{pid}" in ProfileCache().cold.path_template
+
+
+def test_files_of_exited_processes_are_removed(tmp_path):
+    template = str(tmp_path / "cold_{pid}.db")
+    stale = tmp_path / "cold_999999999.db"
+    for suffix in ("", "-wal", ".lock"):
+        (tmp_path / f"{stale.name}{suffix}").write_text("")
+
+    store = ColdProfileStore(template)
+    store.put("u", _profile("u"))
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        name for name in os.listdir(tmp_path) if name.startswith(f"cold_{os.getpid()}.db")
+    )
+    assert not stale.exists()
+    store.close()
@@ -0,0 +1,98 @@
+"""Request profiler: session windows, filters and what each mode collects."""
+
+import asyncio
+import time
+
+import pytest
+
+import profiler
+from profiler import CPROFILE, SAMPLE, RequestProfiler
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+async def _request(request_profiler, endpoint, user_id, work=0.0):
+    with request_profiler.profile(endpoint, user_id):
+        _busy(work)
+        await asyncio.sleep(0)
+
+
+def test_session_ends_after_n_requests_matching_the_filters():
+    async def run():
+        request_profiler = RequestProfiler()
+        session_task = asyncio.ensure_future(
+            request_profiler.run(CPROFILE, requests=2, seconds=30, user_id="alex", endpoint="chat")
+        )
+        await asyncio.sleep(0)
+        assert request_profiler.active
+        open_for = []
+        for endpoint, user_id in [("chat", "sam"), ("ws", "alex"), ("chat", "alex"), ("chat", "alex")]:
+            open_for.append(not request_profiler.session.finished.is_set())
+            await _request(request_profiler, endpoint, user_id, work=0.01)
+        session = await asyncio.wait_for(session_task, timeout=5)
+        return request_profiler, session, open_for
+
+    request_profiler, session, open_for = asyncio.run(run())
+    # Only the last two requests counted: the session stayed open for all four
+    assert open_for == [True] * 4
+    summary = session.summary()
+    assert summary["requests_profiled"] == 2
+    assert summary["seconds"] < 5
+    assert (summary["user_id"], summary["endpoint"]) == ("alex", "chat")
+    assert "_busy" in session.pstats_text()
+    assert not request_profiler.active
+    assert request_profiler.get_stats() == {"active": False, "sessions": 1, "profiled_requests": 2}
+
+
+def test_session_ends_after_t_seconds_without_enough_requests():
+    async def run():
+        request_profiler = RequestProfiler()
+        started = time.perf_counter()
+        session = await request_profiler.run(SAMPLE, requests=100, seconds=0.2)
+        return session, time.perf_counter() - started
+
+    session, took = asyncio.run(run())
+    assert 0.2 <= took < 2
+    assert session.summary()["requests_profiled"] == 0
+
+
+def test_seconds_are_capped_and_sessions_do_not_overlap(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_MAX_SECONDS", 0.1)
+
+    async def run():
+        request_profiler = RequestProfiler()
+        first = asyncio.ensure_future(request_profiler.run(SAMPLE, seconds=3600))
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await request_profiler.run(SAMPLE)
+        with pytest.raises(ValueError):
+            await request_profiler.run("perf")
+        return await asyncio.wait_for(first, timeout=2)
+
+    assert asyncio.run(run()).seconds == 0.1
+
+
+def test_sampling_attributes_loop_stacks_to_profiled_requests():
+    async def run():
+        request_profiler = RequestProfiler()
+        session_task = asyncio.ensure_future(request_profiler.run(SAMPLE, requests=1, endpoint="chat", interval_ms=1))
+        await asyncio.sleep(0)
+        # An unprofiled request holding the loop is not sampled
+        await _request(request_profiler, "journal", "sam", work=0.1)
+        await _request(request_profiler, "chat", "sam", work=0.2)
+        return await asyncio.wait_for(session_task, timeout=5)
+
+    session = asyncio.run(run())
+    assert session.samples
+    assert all(stack.startswith("event-loop;") for stack in session.samples)
+    assert all("_request" in stack for stack in session.samples)
+    assert session.collapsed().splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+
+def test_disabled_profiler_returns_the_shared_no_op():
+    request_profiler = RequestProfiler()
+    assert request_profiler.profile("chat", "sam") is profiler._NOT_PROFILED
@@ -0,0 +1,129 @@
+"""Push hub: snapshots for new subscribers, coalesced deltas from a cursor."""
+
+import asyncio
+import json
+
+from push import PushHub
+
+
+def _hub(items, window_ms=20):
+    hub = PushHub(window_ms=window_ms, send_timeout=1)
+    hub.register(
+        "log",
+        lambda: (list(items), len(items)),
+        lambda cursor: (items[cursor:] or None, len(items)),
+    )
+    return hub
+
+
+def _session(received, name):
+    async def send(message):
+        received.append((name, json.loads(message)))
+    return send
+
+
+def test_new_subscriber_gets_a_snapshot_then_coalesced_deltas():
+    items = ["a"]
+    received = []
+
+    async def run():
+        hub = _hub(items)
+        assert hub.subscribe("s1", ["log", "missing"], _session(received, "s1")) == ["log"]
+        await asyncio.sleep(0.01)
+        for item in ("b", "c"):
+            items.append(item)
+            hub.notify("log")
+        await asyncio.sleep(0.05)
+        return hub.get_stats()
+
+    stats = asyncio.run(run())
+    assert received == [
+        ("s1", {"type": "log", "mode": "snapshot", "data": ["a"]}),
+        # Two notifications inside one window: one delta from the cursor
+        ("s1", {"type": "log", "mode": "delta", "data": ["b", "c"]}),
+    ]
+    assert stats["notifications"] == 2
+    assert stats["pushes"] == 2
+    assert stats["subscribers"] == {"log": 1}
+
+
+def test_late_subscriber_snapshot_does_not_move_the_shared_cursor():
+    items = ["a"]
+    received = []
+
+    async def run():
+        hub = _hub(items)
+        hub.subscribe("s1", ["log"], _session(received, "s1"))
+        await asyncio.sleep(0.01)
+        items.append("b")
+        hub.notify("log")
+        hub.subscribe("s2", ["log"], _session(received, "s2"))
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert ("s2", {"type": "log", "mode": "snapshot", "data": ["a", "b"]}) in received
+    assert ("s1", {"type": "log", "mode": "delta", "data": ["b"]}) in received
+    assert not any(name == "s2" and message["mode"] == "delta" for name, message in received)
+
+
+def test_unchanged_topics_and_topics_without_subscribers_send_nothing():
+    items = []
+    received = []
+
+    async def run():
+        hub = _hub(items)
+        hub.notify("log")
+        hub.subscribe("s1", ["log"], _session(received, "s1"))
+        await asyncio.sleep(0.01)
+        hub.notify("log")
+        await asyncio.sleep(0.05)
+        return hub.get_stats()
+
+    stats = asyncio.run(run())
+    assert [message["mode"] for _, message in received] == ["snapshot"]
+    assert stats["notifications"] == 1
+    assert stats["unchanged"] == 1
+
+
+def test_resubscribing_acks_held_topics_without_a_second_snapshot():
+    items = ["a"]
+    received = []
+
+    async def run():
+        hub = _hub(items)
+        send = _session(received, "s1")
+        first = hub.subscribe("s1", ["log"], send)
+        # Before and after the joining snapshot has gone out
+        again = hub.subscribe("s1", ["log"], send)
+        await asyncio.sleep(0.01)
+        later = hub.subscribe("s1", ["log"], send)
+        await asyncio.sleep(0.05)
+        return first, again, later
+
+    assert asyncio.run(run()) == (["log"], ["log"], ["log"])
+    assert [message["mode"] for _, message in received] == ["snapshot"]
+
+
+def test_unsubscribed_and_failing_sessions_stop_receiving():
+    items = ["a"]
+    received = []
+
+    async def broken(message):
+        raise ConnectionError("gone")
+
+    async def run():
+        hub = _hub(items)
+        hub.subscribe("s1", ["log"], _session(received, "s1"))
+        hub.subscribe("s2", ["log"], _session(received, "s2"))
+        hub.subscribe("dead", ["log"], broken)
+        await asyncio.sleep(0.01)
+        hub.unsubscribe("s2")
+        items.append("b")
+        hub.notify("log")
+        await asyncio.sleep(0.05)
+        return hub.get_stats()
+
+    stats = asyncio.run(run())
+    assert [name for name, message in received if message["mode"] == "delta"] == ["s1"]
+    assert stats["dropped_subscribers"] == 1
+    assert stats["subscribers"] == {"log": 1}
@@ -0,0 +1,54 @@
+"""Chat responses: sparse field selection and the full AIResponse."""
+
+import pytest
+
+
+@pytest.fixture
+def client():
+    main = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_sparse_response_without_text_skips_generation(client, monkeypatch):
+    import main
+
+    async def no_generation(*args, **kwargs):
+        raise AssertionError("response text generated but not requested")
+
+    monkeypatch.setattr(main.ai_agent, "_generate_response", no_generation)
+    reply = client.post("/ai/chat?fields=emotion_detected,crisis_level,thinking_process",
+                        json={"text": "I feel anxious about work", "user_id": "sparse-user"})
+    assert reply.status_code == 200
+    body = reply.json()
+    assert set(body) == {"emotion_detected", "crisis_level", "thinking_process"}
+    assert not any(thought["type"] == "generation" for thought in body["thinking_process"])
+
+
+def test_full_response_validates(client):
+    reply = client.post("/ai/chat", json={"text": "I had a good day today", "user_id": "full-user"})
+    assert reply.status_code == 200
+    body = reply.json()
+    assert body["text"]
+    assert all(isinstance(value, str) for thought in body["thinking_process"] for value in thought.values())
+
+
+def test_chat_scans_crisis_keywords_once_with_one_ruleset(client, monkeypatch):
+    import main
+    from ruleset import KeywordMatcher
+
+    crisis = main.ai_agent.rules.current.crisis_keywords
+    scans = []
+    hits = KeywordMatcher.hits
+
+    def counting_hits(self, text_lower):
+        if self is crisis:
+            scans.append(text_lower)
+        return hits(self, text_lower)
+
+    monkeypatch.setattr(KeywordMatcher, "hits", counting_hits)
+    reply = client.post("/ai/chat", json={"text": "I feel hopeless and want to end it all", "user_id": "scan-user"})
+    assert reply.status_code == 200
+    assert len(scans) == 1
@@ -0,0 +1,248 @@
+import asyncio
+import gzip
+import json
+
+import httpx
+import pytest
+import websockets
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket
+
+import router
+
+CLINICIAN_TOKEN = "clinician-secret"
+
+
+def fake_shard(name: str) -> FastAPI:
+    """Just enough of a shard's API for the router's merged views"""
+    app = FastAPI()
+    app.state.imports = []
+    app.state.job_status = "running"
+    app.state.profiles = {}
+    app.state.imports_left = None  # profile imports to accept before failing
+
+    @app.get("/")
+    async def root():
+        return {"status": "ok"}
+
+    @app.get("/ai/profiles/ids")
+    async def profile_ids():
+        return {"user_ids": list(app.state.profiles)}
+
+    @app.post("/ai/profiles/export")
+    async def export_profiles(payload: dict):
+        return {"profiles": [app.state.profiles[user_id] for user_id in payload["user_ids"]]}
+
+    @app.post("/ai/profiles/import")
+    async def import_profiles(payload: dict):
+        if app.state.imports_left is not None:
+            if not app.state.imports_left:
+                raise HTTPException(status_code=500, detail="disk full")
+            app.state.imports_left -= 1
+        for profile in payload["profiles"]:
+            app.state.profiles[profile["user_id"]] = profile
+        return {"imported": len(payload["profiles"])}
+
+    @app.post("/ai/profiles/release")
+    async def release_profiles(payload: dict):
+        return {"released": sum(app.state.profiles.pop(u, None) is not None for u in payload["user_ids"])}
+
+    @app.websocket("/ws/{user_id}")
+    async def chat(websocket: WebSocket, user_id: str):
+        await websocket.accept()
+        while True:
+            await websocket.receive_text()
+
+    @app.get("/ai/crisis/events")
+    async def events(x_clinician_token: str = Header(None)):
+        if x_clinician_token != CLINICIAN_TOKEN:
+            raise HTTPException(status_code=403, detail="Invalid clinician token")
+        return {"events": [{"user_id": f"{name}-user", "timestamp": f"2024-01-0{len(name)}T00:00:00"}]}
+
+    @app.websocket("/ws/clinician/crisis")
+    async def stream(websocket: WebSocket):
+        if websocket.headers.get("x-clinician-token") != CLINICIAN_TOKEN:
+            await websocket.close(code=1008)
+            return
+        await websocket.accept()
+        await websocket.send_text(json.dumps({"shard": name}))
+        while True:
+            await websocket.receive_text()
+
+    @app.get("/ai/status")
+    async def status():
+        interactions = 10 if name == "a" else 30
+        return {
+            "status": "active",
+            "learning_stats": {"total_interactions": interactions, "patterns_learned": 2,
+                               "accuracy_score": 0.5 if name == "a" else 0.9},
+            "timestamp": "now",
+        }
+
+    @app.get("/ai/insights")
+    async def insights():
+        return {"insights": [{"title": name, "timestamp": f"2024-01-0{len(name) + 1}"}]}
+
+    @app.post("/ai/import", status_code=202)
+    async def import_rows(request: Request):
+        app.state.imports.append(await request.body())
+        return {"status": "import_started", "job": {"job_id": f"{name}-job", "status": "queued"}}
+
+    @app.get("/ai/jobs/{job_id}")
+    async def job(job_id: str):
+        if job_id != f"{name}-job":
+            raise HTTPException(status_code=404, detail="Job not found")
+        return {"job_id": job_id, "status": app.state.job_status}
+
+    return app
+
+
+@pytest.fixture
+def deployment(monkeypatch, tmp_path, serve):
+    monkeypatch.setattr(router, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(router, "ROUTER_IMPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(router, "ROUTER_HANDOFF_BATCH", 5)
+    # "ccc" is running but not in the ring until a test adds it
+    shards = {name: fake_shard(name) for name in ("a", "bb", "ccc")}
+    urls = {name: serve(app) for name, app in shards.items()}
+    app = router.create_app([urls["a"], urls["bb"]])
+    yield app.state.router, shards, urls, serve(app)
+
+
+def _place_profiles(shard_router, shards, urls, count=60):
+    names = {shard_url: name for name, shard_url in urls.items()}
+    for i in range(count):
+        user_id = f"user-{i}"
+        shards[names[shard_router.ring.owner(user_id)]].state.profiles[user_id] = {"user_id": user_id}
+    return names
+
+
+def _holders(shards) -> dict:
+    held = {}
+    for name, app in shards.items():
+        for user_id in app.state.profiles:
+            held.setdefault(user_id, []).append(name)
+    return held
+
+
+def _change(method, url, shard_url):
+    return httpx.request(method, f"{url}/router/shards", params={"url": shard_url},
+                         headers={"X-Admin-Token": "admin-secret"}, timeout=30)
+
+
+def test_crisis_events_are_merged_from_every_shard(deployment):
+    _, _, _, url = deployment
+    response = httpx.get(f"{url}/ai/crisis/events", headers={"X-Clinician-Token": CLINICIAN_TOKEN})
+    assert response.status_code == 200
+    assert [event["user_id"] for event in response.json()["events"]] == ["a-user", "bb-user"]
+    # A shard's refusal is the router's refusal
+    assert httpx.get(f"{url}/ai/crisis/events").status_code == 403
+
+
+def test_status_and_insights_cover_every_shard(deployment):
+    _, _, _, url = deployment
+    stats = httpx.get(f"{url}/ai/status").json()["learning_stats"]
+    assert stats["total_interactions"] == 40
+    assert stats["patterns_learned"] == 4
+    assert stats["accuracy_score"] == pytest.approx(0.8)
+    assert [i["title"] for i in httpx.get(f"{url}/ai/insights").json()["insights"]] == ["a", "bb"]
+
+
+def test_crisis_stream_merges_shards_and_checks_the_token(deployment):
+    _, _, _, url = deployment
+    ws_url = url.replace("http", "ws", 1) + "/ws/clinician/crisis"
+
+    async def run():
+        async with websockets.connect(f"{ws_url}?token={CLINICIAN_TOKEN}") as ws:
+            seen = {json.loads(await asyncio.wait_for(ws.recv(), 5))["shard"] for _ in range(2)}
+        assert seen == {"a", "bb"}
+        with pytest.raises(websockets.InvalidStatusCode):
+            async with websockets.connect(ws_url):
+                pass
+
+    asyncio.run(run())
+
+
+def test_import_rows_go_to_their_owners_and_hold_the_ring(deployment):
+    shard_router, shards, urls, url = deployment
+    names = {shard_url: name for name, shard_url in urls.items()}
+    rows = [{"user_id": f"user-{i}", "message": "hello", "timestamp": "2024-01-01T00:00:00"} for i in range(40)]
+    body = gzip.compress("".join(json.dumps(row) + "\n" for row in rows).encode())
+    headers = {"X-Admin-Token": "admin-secret", "Content-Encoding": "gzip"}
+
+    response = httpx.post(f"{url}/ai/import", content=body, headers=headers)
+    assert response.status_code == 202
+    assert response.json()["rows"] == 40
+    for name in ("a", "bb"):
+        imported = [json.loads(line) for data in shards[name].state.imports for line in data.splitlines()]
+        assert imported
+        assert all(names[shard_router.ring.owner(row["user_id"])] == name for row in imported)
+    assert httpx.get(f"{url}/ai/jobs/bb-job").json()["job_id"] == "bb-job"
+
+    # The rows were placed with this ring: it cannot change until the jobs finish
+    def remove_bb():
+        return httpx.delete(f"{url}/router/shards", params={"url": urls["bb"]},
+                            headers={"X-Admin-Token": "admin-secret"})
+
+    assert remove_bb().status_code == 409
+    assert len(shard_router.ring) == 2
+    for app in shards.values():
+        app.state.job_status = "succeeded"
+    assert remove_bb().status_code == 200
+
+
+def test_adding_a_shard_moves_exactly_its_users_and_releases_the_old_copies(deployment):
+    shard_router, shards, urls, url = deployment
+    names = _place_profiles(shard_router, shards, urls)
+    before = {user_id: holders[0] for user_id, holders in _holders(shards).items()}
+    future = shard_router.ring.copy()
+    future.add(urls["ccc"])
+    mover = next(u for u in before if future.owner(u) == urls["ccc"])
+    stayer = next(u for u in before if future.owner(u) != urls["ccc"])
+
+    async def run():
+        ws_url = url.replace("http", "ws", 1)
+        async with websockets.connect(f"{ws_url}/ws/{mover}") as moving, \
+                websockets.connect(f"{ws_url}/ws/{stayer}") as staying:
+            await asyncio.sleep(0.1)
+            response = await asyncio.get_running_loop().run_in_executor(None, _change, "POST", url, urls["ccc"])
+            # Only the moving user is told to reconnect
+            await asyncio.wait_for(moving.wait_closed(), 5)
+            assert moving.close_code == router.CLOSE_SERVICE_RESTART
+            await staying.ping()
+            return response
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    moved = [u for u in before if shard_router.ring.owner(u) == urls["ccc"]]
+    assert moved and response.json()["profiles_moved"] == len(moved)
+    # Each profile is held once, by its owner on the new ring
+    assert all(holders == [names[shard_router.ring.owner(u)]] for u, holders in _holders(shards).items())
+    assert set(_holders(shards)) == set(before)
+
+
+def test_removing_a_shard_hands_its_users_to_the_rest(deployment):
+    shard_router, shards, urls, url = deployment
+    _place_profiles(shard_router, shards, urls)
+    leaving = list(shards["bb"].state.profiles)
+
+    response = _change("DELETE", url, urls["bb"])
+    assert response.status_code == 200
+    assert response.json()["profiles_moved"] == len(leaving)
+    assert shard_router.ring.nodes == [urls["a"]]
+    assert not shards["bb"].state.profiles
+    assert all(holders == ["a"] for holders in _holders(shards).values())
+    assert len(_holders(shards)) == 60
+
+
+def test_failed_handoff_leaves_the_ring_and_releases_partial_copies(deployment):
+    shard_router, shards, urls, url = deployment
+    _place_profiles(shard_router, shards, urls)
+    before = _holders(shards)
+    # The new shard takes one batch of profiles, then fails
+    shards["ccc"].state.imports_left = 1
+
+    response = _change("POST", url, urls["ccc"])
+    assert response.status_code == 502
+    assert urls["ccc"] not in shard_router.ring.nodes
+    assert not shards["ccc"].state.profiles
+    assert _holders(shards) == before
@@ -0,0 +1,25 @@
+"""Ruleset validation: a bad file is rejected and the active ruleset stays."""
+
+import json
+
+import pytest
+
+from ruleset import DEFAULT_RULESET_PATH, RulesetManager
+
+
+@pytest.mark.parametrize("emotion", ["depression", "joy", "stress"])
+def test_reload_rejects_a_ruleset_missing_a_required_emotion(tmp_path, emotion):
+    with open(DEFAULT_RULESET_PATH) as f:
+        spec = json.load(f)
+    manager = RulesetManager(DEFAULT_RULESET_PATH)
+    active = manager.current
+
+    del spec["emotion_keywords"][emotion]
+    spec["version"] = "broken"
+    broken = tmp_path / "broken.json"
+    broken.write_text(json.dumps(spec))
+
+    with pytest.raises(ValueError, match=emotion):
+        manager.reload(str(broken))
+    assert manager.current is active
+    assert manager.path == DEFAULT_RULESET_PATH
@@ -0,0 +1,66 @@
+"""Sentiment scorer selection, the opt-in VADER layer and lexicon scoring rules."""
+
+import importlib
+
+import pytest
+
+import sentiment
+
+
+def test_textblob_and_no_vader_by_default(monkeypatch):
+    monkeypatch.delenv("SENTIMENT_SCORER", raising=False)
+    monkeypatch.delenv("SENTIMENT_USE_VADER", raising=False)
+    defaults = importlib.reload(sentiment)
+    assert defaults.SENTIMENT_SCORER == defaults.TEXTBLOB
+    assert defaults.SENTIMENT_USE_VADER is False
+
+
+def test_vader_layer_is_explicit(monkeypatch):
+    monkeypatch.setattr(sentiment, "_vader_lexicon_path", lambda: None)
+    scorer = sentiment.LexiconSentiment.load(use_vader=False)
+    assert scorer.sources == [sentiment.SENTIMENT_LEXICON_PATH]
+    with pytest.raises(FileNotFoundError, match="vader_lexicon"):
+        sentiment.LexiconSentiment.load(use_vader=True)
+
+
+@pytest.fixture
+def scorer():
+    return sentiment.LexiconSentiment.load(use_vader=False)
+
+
+def test_negation_flips_and_dampens_valence(scorer):
+    assert scorer.polarity("sad") < 0
+    assert scorer.polarity("not sad") > 0
+    assert scorer.polarity("I am not happy") < 0
+    assert abs(scorer.polarity("not sad")) < abs(scorer.polarity("sad"))
+    # Outside the three-token window the negation no longer applies
+    assert scorer.polarity("not that it was a happy day") > 0
+
+
+def test_intensifiers_and_dampeners_scale_valence(scorer):
+    happy = scorer.polarity("happy")
+    assert scorer.polarity("very happy") > happy > scorer.polarity("slightly happy") > 0
+    assert scorer.polarity("very sad") < scorer.polarity("sad") < scorer.polarity("slightly sad") < 0
+    assert scorer.polarity("really very happy") > scorer.polarity("very happy")
+
+
+def test_clause_after_but_dominates(scorer):
+    assert scorer.polarity("I was happy but now I am sad") < 0
+    assert scorer.polarity("I was sad but now I am happy") > 0
+
+
+def test_batch_scores_equal_single_scores(scorer):
+    messages = [
+        "I feel very happy today",
+        "",
+        "not sad, just tired",
+        "I'm not happy but I am not hopeless either",
+        "slightly anxious and extremely alone",
+        "the meeting is at noon",
+        "Never been this angry. So so angry!",
+    ]
+    batch = scorer.polarities(messages)
+    assert len(batch) == len(messages)
+    assert list(batch) == pytest.approx([scorer.polarity(message) for message in messages], abs=1e-12)
+    assert batch[1] == 0 and batch[5] == 0
+    assert all(-1 <= score <= 1 for score in batch)
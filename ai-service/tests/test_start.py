@@ -0,0 +1,75 @@
+"""Production launcher: one shutdown deadline for the drain and the state flush."""
+
+import argparse
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+import uvicorn
+
+import start
+
+main = pytest.importorskip("main")
+
+
+def _args(**overrides):
+    args = dict(workers=1, host="127.0.0.1", port=8123, shutdown_timeout=7.0)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_signal_starts_the_shared_shutdown_clock(monkeypatch):
+    monkeypatch.setattr(main, "_shutdown_started", None)
+    monkeypatch.setattr(main, "SHUTDOWN_TIMEOUT", main.SHUTDOWN_TIMEOUT)
+    servers = []
+
+    def run(self):
+        servers.append(self)
+        self.handle_exit(signal.SIGTERM, None)
+
+    monkeypatch.setattr(uvicorn.Server, "run", run)
+    before = time.monotonic()
+    start.start_production(_args())
+
+    server, = servers
+    assert server.should_exit
+    assert server.config.timeout_graceful_shutdown == 7
+    assert main.SHUTDOWN_TIMEOUT == 7.0
+    assert before <= main._shutdown_started <= time.monotonic()
+
+
+def test_several_workers_run_as_router_shards(monkeypatch):
+    calls = []
+
+    def execv(path, argv):
+        calls.append(argv)
+        raise SystemExit
+
+    monkeypatch.setattr(os, "execv", execv)
+    with pytest.raises(SystemExit):
+        start.start_production(_args(workers=3, port=9000))
+    argv, = calls
+    assert argv[1].endswith("router.py")
+    assert argv[argv.index("--spawn") + 1] == "3"
+    assert argv[argv.index("--shard-base-port") + 1] == "9001"
+
+
+def test_state_flush_gets_what_the_drain_left_of_the_deadline(monkeypatch):
+    flushed = []
+
+    async def slow_shutdown():
+        await asyncio.sleep(10)
+        flushed.append(True)
+
+    monkeypatch.setattr(main.ai_agent, "shutdown", slow_shutdown)
+    monkeypatch.setattr(main.capture, "stop", lambda: None)
+    monkeypatch.setattr(main, "SHUTDOWN_TIMEOUT", 30.0)
+    # Uvicorn's drain already used up the whole budget
+    monkeypatch.setattr(main, "_shutdown_started", time.monotonic() - 30)
+
+    started = time.monotonic()
+    asyncio.run(main.shutdown_event())
+    assert time.monotonic() - started < 3
+    assert not flushed
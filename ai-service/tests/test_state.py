@@ -0,0 +1,29 @@
+"""State persistence: the streamed JSON state matches the in-memory state."""
+
+import json
+
+import pytest
+
+
+def test_json_state_is_streamed_as_one_document(tmp_path, monkeypatch):
+    main = pytest.importorskip("main")
+    import ai_agent as module
+
+    agent = main.ai_agent
+    for user_id in ("state-a", 'state-"b"'):
+        agent._get_user_profile(user_id)
+        agent._update_user_profile(user_id, "I feel calm today", module.EmotionType.JOY, ["detailed_expression"])
+    path = tmp_path / "ai_state.json"
+    monkeypatch.setattr(module, "STATE_FORMAT", "json")
+    monkeypatch.setattr(module, "STATE_PATH", str(path))
+
+    agent._save_state()
+
+    with open(path) as f:
+        saved = json.load(f)
+    expected = {
+        "user_profiles": {p["user_id"]: p for p in agent._all_profile_dicts()},
+        **agent._state_meta(),
+    }
+    assert saved == json.loads(json.dumps(expected, default=str))
+    assert {"state-a", 'state-"b"'} <= set(saved["user_profiles"])
@@ -0,0 +1,178 @@
+"""Binary snapshots: round trips, JSON conversion and damaged files."""
+
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import state_snapshot
+from state_snapshot import SnapshotReader, SnapshotWriter, convert_json, verify, write_snapshot
+
+META = {"learning_stats": {"total_interactions": 3}, "personality": {"warmth": 0.8}}
+
+
+def _profiles():
+    return [
+        {
+            "user_id": "naive",
+            "preferences": {"tone": "gentle"},
+            "conversation_history": [{"message": "I could not sleep", "emotion": "stress"}],
+            "emotional_patterns": {"stress": 2, "joy": 1},
+            "learned_insights": ["sleeps badly before exams"],
+            "last_interaction": datetime(2024, 3, 2, 23, 41, 5, 123456),
+        },
+        {
+            "user_id": "aware-ü",
+            "preferences": {},
+            "conversation_history": [],
+            # Unknown emotions and explicit zeros live in the blob, not the columns
+            "emotional_patterns": {"hope": 4, "anger": 0},
+            "learned_insights": [],
+            "last_interaction": datetime(2024, 1, 1, 8, 0, tzinfo=timezone(timedelta(hours=-5))),
+        },
+    ]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "state.snap")
+    write_snapshot(path, META, _profiles())
+    return path
+
+
+def test_write_then_mapped_read_round_trips(snapshot):
+    reader = SnapshotReader(snapshot)
+    try:
+        assert reader.version == state_snapshot.FORMAT_VERSION
+        assert reader.meta == META
+        assert len(reader) == 2
+        assert "naive" in reader and "missing" not in reader
+        for profile in _profiles():
+            assert reader.get(profile["user_id"]) == profile
+        row = reader.find("naive")
+        assert reader.emotion_counts_at(row)["stress"] == 2
+    finally:
+        reader.close()
+
+
+def test_untouched_profiles_copy_byte_for_byte(snapshot, tmp_path):
+    copy = str(tmp_path / "copy.snap")
+    reader = SnapshotReader(snapshot)
+    writer = SnapshotWriter(copy, META)
+    for row in range(len(reader)):
+        writer.add_raw(reader, row)
+    writer.close()
+    reader.close()
+    copied = SnapshotReader(copy)
+    assert [copied.get(p["user_id"]) for p in _profiles()] == _profiles()
+    copied.close()
+
+
+def test_json_state_converts_losslessly(tmp_path):
+    profiles = {p["user_id"]: dict(p, last_interaction=p["last_interaction"].isoformat()) for p in _profiles()}
+    json_path, snap_path = tmp_path / "state.json", str(tmp_path / "state.snap")
+    json_path.write_text(json.dumps({"user_profiles": profiles, **META}))
+
+    assert convert_json(str(json_path), snap_path) == 2
+    assert verify(str(json_path), snap_path) == 2
+    reader = SnapshotReader(snap_path)
+    restored = {record["user_id"]: dict(record, last_interaction=record["last_interaction"].isoformat())
+                for record in reader.records()}
+    reader.close()
+    assert restored == profiles
+
+
+@pytest.mark.parametrize("keep", [0, 10, state_snapshot.HEADER.size, -1])
+def test_truncated_files_are_rejected(snapshot, keep):
+    with open(snapshot, "rb") as f:
+        data = f.read()
+    with open(snapshot, "wb") as f:
+        f.write(data[:keep] if keep >= 0 else data[:-5])
+    with pytest.raises(ValueError):
+        reader = SnapshotReader(snapshot)
+        try:
+            list(reader.records())
+        finally:
+            reader.close()
+
+
+def _flip(path, offset):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0x40]))
+
+
+def test_corrupted_columns_are_rejected_on_open(snapshot):
+    fields = state_snapshot.HEADER.unpack_from(open(snapshot, "rb").read(), 0)
+    columns_offset = fields[6]
+    _flip(snapshot, columns_offset + 9)
+    with pytest.raises(ValueError, match="checksum"):
+        SnapshotReader(snapshot)
+
+
+def test_corrupted_profile_is_rejected_when_decoded(snapshot):
+    fields = state_snapshot.HEADER.unpack_from(open(snapshot, "rb").read(), 0)
+    blob_offset = fields[8]
+    # Inside the first profile's preferences JSON
+    _flip(snapshot, blob_offset + 30)
+    reader = SnapshotReader(snapshot)
+    try:
+        with pytest.raises(ValueError, match="checksum"):
+            list(reader.records())
+    finally:
+        reader.close()
+
+
+def test_other_versions_and_files_are_rejected(snapshot, tmp_path):
+    with open(snapshot, "r+b") as f:
+        f.seek(8)
+        f.write(struct.pack("<H", state_snapshot.FORMAT_VERSION + 1))
+    with pytest.raises(ValueError, match="Unsupported snapshot version"):
+        SnapshotReader(snapshot)
+
+    other = tmp_path / "state.json"
+    other.write_text(json.dumps({"user_profiles": {}}) + " " * 100)
+    with pytest.raises(ValueError, match="not a NeuraWell snapshot"):
+        SnapshotReader(str(other))
+
+
+def test_version_1_files_are_still_read(tmp_path, monkeypatch):
+    path = str(tmp_path / "v1.snap")
+    # The version 1 writer: no checksum in the header, no blob CRC column
+    monkeypatch.setattr(state_snapshot, "FORMAT_VERSION", 1)
+    monkeypatch.setattr(state_snapshot, "COLUMNS", state_snapshot.COLUMNS_V1)
+    header = state_snapshot.HEADER_V1
+
+    class V1Header:
+        size = state_snapshot.HEADER.size
+
+        @staticmethod
+        def pack(*fields):
+            return header.pack(*fields[:9]).ljust(V1Header.size, b"\0")
+
+    monkeypatch.setattr(state_snapshot, "HEADER", V1Header)
+    monkeypatch.setattr(SnapshotWriter, "_append", _append_v1)
+    write_snapshot(path, META, _profiles())
+    monkeypatch.undo()
+
+    reader = SnapshotReader(path)
+    assert reader.version == 1
+    assert [reader.get(p["user_id"]) for p in _profiles()] == _profiles()
+    reader.close()
+
+
+def _append_v1(self, user_id, blob, micros, offset, history_length, counters):
+    columns = self.columns
+    columns["last_interaction_us"].append(micros)
+    columns["utc_offset_s"].append(offset)
+    columns["history_length"].append(history_length)
+    for name, value in zip(state_snapshot.EMOTION_COLUMNS, counters):
+        columns[f"emotion_{name}"].append(value)
+    columns["blob_offset"].append(self._blob_size)
+    columns["blob_length"].append(len(blob))
+    self.hashes.append(state_snapshot.user_hash(user_id))
+    self._blobs.write(blob)
+    self._blob_size += len(blob)
@@ -0,0 +1,131 @@
+"""Traffic capture and replay: what is written, and replay determinism."""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI, WebSocket
+
+import traffic
+from traffic import Replayer, TrafficCapture, merge_captures, read_capture
+
+MESSAGE = "I can't sleep, email me at sam@example.com or call +1 555 123 4567"
+
+
+def _capture(path, records, text_mode=None):
+    capture = TrafficCapture(text_mode=text_mode)
+    capture.start(str(path))
+    for offset, (endpoint, user_id, text, status) in enumerate(records):
+        capture.record(endpoint, user_id, text, capture._started + offset * 0.01, status, 5.0)
+    capture.stop()
+    return read_capture(str(path))
+
+
+def test_message_text_is_not_captured_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv("CAPTURE_TEXT", raising=False)
+    header, records = _capture(tmp_path / "c.ndjson.gz", [("chat", "sam", MESSAGE, 200)])
+    entry = next(records)
+    assert header["text"] == "length"
+    assert entry["w"] == len(MESSAGE.split())
+    assert "m" not in entry
+    assert "sam" not in json.dumps(entry)
+
+
+def test_scrubbed_text_is_opt_in_and_masked(tmp_path):
+    _, records = _capture(tmp_path / "c.ndjson.gz", [("chat", "sam", MESSAGE, 200)], text_mode="scrubbed")
+    text = next(records)["m"]
+    assert "<email>" in text and "<phone>" in text
+    assert "sam@example.com" not in text
+
+
+def test_salted_user_ids_are_stable_across_captures(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAPTURE_SALT", "fixed")
+    runs = [
+        [entry["u"] for entry in _capture(tmp_path / f"{run}.ndjson.gz",
+                                          [("chat", "sam", "hi", 200), ("ws", "alex", "hi", 200)])[1]]
+        for run in ("a", "b")
+    ]
+    assert runs[0] == runs[1]
+    assert runs[0][0] != runs[0][1]
+
+
+def test_captures_merge_in_arrival_order(tmp_path):
+    paths = [str(tmp_path / f"{name}.ndjson.gz") for name in ("a", "b")]
+    for path in paths:
+        _capture(path, [("chat", "sam", "one two", 200), ("chat", "sam", "three", 200)])
+    headers, records = merge_captures(paths)
+    offsets = [entry["t"] for entry in records]
+    assert len(headers) == 2 and len(records) == 4
+    assert offsets == sorted(offsets)
+
+
+def _target(received):
+    app = FastAPI()
+
+    @app.post("/ai/chat")
+    async def chat(body: dict):
+        received.append(("chat", body["user_id"], body["text"]))
+        return {"text": "ok"}
+
+    @app.websocket("/ws/{user_id}")
+    async def ws(websocket: WebSocket, user_id: str):
+        await websocket.accept()
+        while True:
+            text = json.loads(await websocket.receive_text())["text"]
+            received.append(("ws", user_id, text))
+            reply = {"type": "error", "detail": "too long"} if len(text.split()) > 5 else {"text": "ok"}
+            await websocket.send_text(json.dumps(reply))
+
+    return app
+
+
+def test_replay_with_a_seed_is_deterministic(tmp_path, serve):
+    _, records = _capture(tmp_path / "c.ndjson.gz", [
+        ("chat", "sam", "I feel low today", 200),
+        ("ws", "alex", "could not sleep at all last night again", 200),
+        ("ws", "alex", "better now", 200),
+        ("chat", "kim", "work is a lot", 200),
+    ])
+    records = list(records)
+
+    def replay(seed):
+        received = []
+        replayer = Replayer(serve(_target(received)), speed=100, concurrency=4, seed=seed)
+        elapsed = asyncio.run(replayer.run([dict(entry) for entry in records]))
+        by_user = {}
+        for endpoint, user_id, text in received:
+            by_user.setdefault(user_id, []).append((endpoint, text))
+        return by_user, replayer.report(elapsed)
+
+    first, report = replay(7)
+    again, _ = replay(7)
+    other, _ = replay(8)
+    assert first == again
+    assert first != other
+    # Synthesized text keeps each captured message's word count
+    assert sorted(len(text.split()) for sent in first.values() for _, text in sent) == [2, 4, 4, 8]
+    # A WebSocket "error" reply is an error, not a 200
+    assert report["ws"]["errors"] == 1
+    assert report["ws"]["ok"] == 1
+    assert report["chat"]["ok"] == 2
+
+
+def test_error_replies_map_to_client_errors():
+    assert traffic.WS_REPLY_STATUS["error"] == 400
+    assert traffic.WS_REPLY_STATUS["throttled"] == 429
+
+
+def test_stop_runs_off_the_event_loop_at_shutdown(monkeypatch):
+    main = pytest.importorskip("main")
+    import threading
+
+    threads = []
+    monkeypatch.setattr(main.capture, "stop", lambda: threads.append(threading.current_thread()))
+
+    async def no_shutdown():
+        pass
+
+    monkeypatch.setattr(main.ai_agent, "shutdown", no_shutdown)
+    monkeypatch.setattr(main, "_shutdown_started", None)
+    asyncio.run(main.shutdown_event())
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,68 @@
+"""View cache: snapshots reused until the version moves, ETags and 304s."""
+
+import json
+
+import pytest
+
+from view_cache import ViewCache
+
+
+def _cache(state):
+    builds = []
+
+    def build():
+        builds.append(state["items"][:])
+        return {"items": state["items"]}
+
+    cache = ViewCache()
+    cache.register("items", build, lambda: state["version"])
+    return cache, builds
+
+
+def test_snapshot_is_reused_until_the_version_changes():
+    state = {"items": [1], "version": 0}
+    cache, builds = _cache(state)
+    first = cache.get("items")
+    state["items"].append(2)
+    # Unchanged version: the old body is served, nothing is rebuilt
+    assert cache.get("items") is first
+    assert json.loads(first.body) == {"items": [1]}
+
+    state["version"] += 1
+    second = cache.get("items")
+    assert json.loads(second.body) == {"items": [1, 2]}
+    assert second.etag != first.etag
+    assert len(builds) == 2
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["rebuilds"]) == (1, 2)
+    assert stats["views"] == {"items": len(second.body)}
+
+
+def test_if_none_match_forms():
+    snapshot = _cache({"items": [], "version": 3})[0].get("items")
+    assert snapshot.matches(snapshot.etag)
+    assert snapshot.matches(f'"other", W/{snapshot.etag}')
+    assert snapshot.matches("*")
+    assert not snapshot.matches(None)
+    assert not snapshot.matches('"items-2-stale"')
+
+
+def test_views_answer_304_until_the_agent_changes_them():
+    main = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+    first = client.get("/ai/insights")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+
+    unchanged = client.get("/ai/insights", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["etag"] == etag
+
+    main.ai_agent._touch_views("insights")
+    changed = client.get("/ai/insights", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert "insights" in changed.json()
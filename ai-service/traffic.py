@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Traffic capture and deterministic replay for load testing.
+
+Capture is opt-in (``TRAFFIC_CAPTURE_PATH`` or ``POST /ai/debug/capture``):
+every ``/ai/chat`` and ``/ws/{user_id}`` message is appended to a gzipped
+NDJSON file with its arrival offset, endpoint, an anonymized user ID, the
+message's word count, status and latency. User IDs are replaced by a salted
+hash that is stable within one capture (or across workers and captures when
+``CAPTURE_SALT`` is set). Message text is never written by default: these
+are users' mental-health conversations. ``CAPTURE_TEXT=scrubbed`` opts in to
+keeping it with emails, URLs, phone numbers and handles masked; replay
+otherwise synthesizes text of the captured length from ``--seed``.
+``{pid}`` in the path is replaced by the worker's pid, so each
+pre-forked worker writes its own file; replay merges them by wall-clock time.
+
+Replay drives a running instance with the captured stream at 1x or Nx speed
+and reports throughput and p50/p95/p99 latency per endpoint::
+
+    python traffic.py replay data/traffic-*.ndjson.gz --url http://localhost:8000 --speed 4
+    python traffic.py replay data/traffic-*.ndjson.gz --save release-a.json
+    python traffic.py replay data/traffic-*.ndjson.gz --compare release-a.json
+
+Start the target with ``AI_RANDOM_SEED`` set so response selection is
+reproducible, and with rate limits raised if replaying faster than 1x.
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+_SCRUB = (
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"https?://\S+|www\.\S+"), "<url>"),
+    (re.compile(r"@\w+"), "<handle>"),
+    (re.compile(r"\+?\d[\d\s().-]{6,}\d"), "<phone>"),
+    (re.compile(r"\d{4,}"), "<number>"),
+)
+
+# WebSocket replies that are not answers, as the HTTP status /ai/chat would give
+WS_REPLY_STATUS = {"throttled": 429, "error": 400}
+
+FILLER_WORDS = ("today", "feel", "work", "really", "sleep", "family", "think", "lately", "maybe", "again")
+
+
+def scrub_text(text: str) -> str:
+    """Mask emails, URLs, handles, phone numbers and long digit runs"""
+    for pattern, placeholder in _SCRUB:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+class TrafficCapture:
+    """Opt-in recorder of request streams; ``record`` never blocks on I/O"""
+
+    def __init__(self, text_mode: Optional[str] = None, max_pending: int = 10000):
+        self.text_mode = text_mode or os.getenv("CAPTURE_TEXT", "length")  # length | scrubbed
+        self.max_pending = max_pending
+        self.path: Optional[str] = None
+        self._queue: Optional[queue.SimpleQueue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._salt = b""
+        self._started = 0.0
+        self.stats: Dict[str, int] = {"recorded": 0, "dropped": 0}
+
+    @property
+    def active(self) -> bool:
+        return self._queue is not None
+
+    def start(self, path: Optional[str] = None):
+        """Start appending to a new capture file"""
+        if self.active:
+            raise RuntimeError(f"Capture already running to {self.path}")
+        path = path or os.getenv("TRAFFIC_CAPTURE_PATH") or "data/traffic-{pid}.ndjson.gz"
+        self.path = path.replace("{pid}", str(os.getpid()))
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        salt = os.getenv("CAPTURE_SALT")
+        self._salt = salt.encode("utf-8") if salt else secrets.token_bytes(16)
+        self._started = time.perf_counter()
+        self.stats = {"recorded": 0, "dropped": 0}
+        self._queue = queue.SimpleQueue()
+        header = {"v": FORMAT_VERSION, "started": datetime.now().isoformat(), "epoch": time.time(),
+                  "text": self.text_mode}
+        self._writer = threading.Thread(target=self._write_loop, args=(self._queue, header), daemon=True)
+        self._writer.start()
+        logger.info(f"Traffic capture started: {self.path}")
+
+    def stop(self) -> Dict[str, Any]:
+        """Flush and close the capture file; blocks, so run it in an executor from async code"""
+        if not self.active:
+            return self.get_stats()
+        self._queue.put(None)
+        self._queue = None
+        self._writer.join(timeout=10)
+        self._writer = None
+        logger.info(f"Traffic capture stopped: {self.path} ({self.stats['recorded']} records)")
+        return self.get_stats()
+
+    def anonymize(self, user_id: str) -> str:
+        return "u" + hmac.new(self._salt, user_id.encode("utf-8"), hashlib.sha256).hexdigest()[:12]
+
+    def record(self, endpoint: str, user_id: str, text: str, arrived: float,
+               status: int = 200, latency_ms: Optional[float] = None):
+        """Queue one request; ``arrived`` is its time.perf_counter() arrival stamp"""
+        q = self._queue
+        if q is None:
+            return
+        if q.qsize() >= self.max_pending:
+            self.stats["dropped"] += 1
+            return
+        entry = {
+            "t": round(arrived - self._started, 4),
+            "e": endpoint,
+            "u": self.anonymize(user_id),
+            "s": status,
+        }
+        if self.text_mode == "length":
+            entry["w"] = len(text.split())
+        else:
+            entry["m"] = scrub_text(text)
+        if latency_ms is not None:
+            entry["l"] = round(latency_ms, 2)
+        q.put(entry)
+        self.stats["recorded"] += 1
+
+    def _write_loop(self, q: queue.SimpleQueue, header: Dict[str, Any]):
+        with gzip.open(self.path, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write(json.dumps(header, separators=(",", ":")) + "\n")
+            while True:
+                entry = q.get()
+                if entry is None:
+                    break
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"active": self.active, "path": self.path, "text_mode": self.text_mode, **self.stats}
+
+
+def read_capture(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Header and an iterator over the records of a capture file"""
+    f = gzip.open(path, "rt", encoding="utf-8")
+    header = json.loads(f.readline())
+    if header.get("v") != FORMAT_VERSION:
+        f.close()
+        raise ValueError(f"Unsupported capture format {header.get('v')!r}")
+
+    def records():
+        with f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return header, records()
+
+
+def merge_captures(paths: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Headers and all records of several capture files, in arrival order.
+
+    Records are written when a request completes, so even a single file is
+    only roughly ordered; offsets are shifted onto the earliest file's clock
+    and sorted.
+    """
+    opened = [read_capture(path) for path in paths]
+    origin = min(header["epoch"] for header, _ in opened)
+    merged = []
+    for header, records in opened:
+        offset = header["epoch"] - origin
+        for entry in records:
+            entry["t"] = round(entry["t"] + offset, 4)
+            merged.append(entry)
+    merged.sort(key=lambda entry: entry["t"])
+    return [header for header, _ in opened], merged
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(q / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class Replayer:
+    """Replays a capture against a live instance and collects latencies"""
+
+    def __init__(self, url: str, speed: float, concurrency: int, seed: int):
+        self.url = url.rstrip("/")
+        self.speed = speed
+        self.rng = random.Random(seed)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay")
+        self.slots = asyncio.Semaphore(concurrency)
+        self.results: Dict[str, List[Tuple[float, int]]] = {}
+        self._local = threading.local()
+        self._sockets: Dict[str, Any] = {}
+        self._socket_locks: Dict[str, asyncio.Lock] = {}
+
+    def _text(self, entry: Dict[str, Any]) -> str:
+        if "m" in entry:
+            return entry["m"]
+        return " ".join(self.rng.choice(FILLER_WORDS) for _ in range(max(entry.get("w", 1), 1)))
+
+    def _post_chat(self, user_id: str, text: str) -> Tuple[float, int]:
+        import requests
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            status = session.post(f"{self.url}/ai/chat", json={"text": text, "user_id": user_id}, timeout=60).status_code
+        except requests.RequestException:
+            status = 0
+        return (time.perf_counter() - started) * 1000, status
+
+    async def _ws_message(self, user_id: str, text: str) -> Tuple[float, int]:
+        import websockets
+
+        lock = self._socket_locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            # One connection per captured user; its messages stay in order
+            socket = self._sockets.get(user_id)
+            if socket is None:
+                ws_url = self.url.replace("http", "ws", 1)
+                socket = self._sockets[user_id] = await websockets.connect(f"{ws_url}/ws/{user_id}")
+            started = time.perf_counter()
+            try:
+                await socket.send(json.dumps({"text": text}))
+                reply = json.loads(await asyncio.wait_for(socket.recv(), timeout=60))
+                status = WS_REPLY_STATUS.get(reply.get("type"), 200)
+            except Exception:
+                self._sockets.pop(user_id, None)
+                status = 0
+            return (time.perf_counter() - started) * 1000, status
+
+    async def _send(self, entry: Dict[str, Any]):
+        text = self._text(entry)
+        async with self.slots:
+            if entry["e"] == "ws":
+                result = await self._ws_message(entry["u"], text)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.executor, self._post_chat, entry["u"], text)
+        self.results.setdefault(entry["e"], []).append(result)
+
+    async def run(self, records: Iterator[Dict[str, Any]]) -> float:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = []
+        for entry in records:
+            delay = started + entry["t"] / self.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(loop.create_task(self._send(entry)))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+        for socket in self._sockets.values():
+            await socket.close()
+        self.executor.shutdown()
+        return elapsed
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        report = {}
+        for endpoint, results in sorted(self.results.items()):
+            ok = sorted(latency for latency, status in results if status == 200)
+            report[endpoint] = {
+                "requests": len(results),
+                "ok": len(ok),
+                "shed": sum(1 for _, status in results if status == 429),
+                "errors": sum(1 for _, status in results if status not in (200, 429)),
+                "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(ok, 50), 2),
+                "p95_ms": round(percentile(ok, 95), 2),
+                "p99_ms": round(percentile(ok, 99), 2),
+            }
+        return report
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    columns = ("requests", "ok", "shed", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+    print(f"{'endpoint':<9}" + "".join(f"{c:>15}" for c in columns))
+    for endpoint, row in report.items():
+        print(f"{endpoint:<9}" + "".join(f"{row[c]:>15}" for c in columns))
+        base = (baseline or {}).get(endpoint)
+        if base:
+            deltas = []
+            for c in columns:
+                change = (row[c] - base[c]) / base[c] * 100 if base[c] else 0.0
+                deltas.append(f"{change:>+14.1f}%")
+            print(f"{'  vs base':<9}" + "".join(deltas))
+
+
+def replay_main(args):
+    headers, records = merge_captures(args.capture)
+    print(f"Replaying {len(headers)} capture file(s) from {headers[0]['started']} at {args.speed}x against {args.url}")
+    replayer = Replayer(args.url, args.speed, args.concurrency, args.seed)
+    elapsed = asyncio.run(replayer.run(records))
+    report = replayer.report(elapsed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+    print_report(report, baseline)
+    print(f"Elapsed {elapsed:.2f}s")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"capture": args.capture, "speed": args.speed, "seed": args.seed,
+                       "elapsed_s": round(elapsed, 3), "endpoints": report}, f, indent=2)
+
+
+def info_main(args):
+    headers, records = merge_captures(args.capture)
+    counts: Dict[str, int] = {}
+    users = set()
+    last = 0.0
+    for entry in records:
+        counts[entry["e"]] = counts.get(entry["e"], 0) + 1
+        users.add(entry["u"])
+        last = entry["t"]
+    print(json.dumps({"files": headers, "records": counts, "users": len(users), "duration_s": last}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NeuraWell traffic capture tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    replay = sub.add_parser("replay", help="replay a capture against a running instance")
+    replay.add_argument("capture", nargs="+")
+    replay.add_argument("--url", default="http://localhost:8000")
+    replay.add_argument("--speed", type=float, default=1.0, help="time compression, e.g. 4 for 4x")
+    replay.add_argument("--concurrency", type=int, default=64)
+    replay.add_argument("--seed", type=int, default=0, help="seed for synthesized text (CAPTURE_TEXT=length)")
+    replay.add_argument("--save", help="write the report as JSON")
+    replay.add_argument("--compare", help="print changes against a saved report")
+
+    info = sub.add_parser("info", help="summarize a capture file")
+    info.add_argument("capture", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "replay":
+        replay_main(args)
+    else:
+        info_main(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Distinguishes ETags across restarts, when version counters start over
+_BOOT_ID = f"{os.getpid():x}{int(time.time()):x}"
+
+
+class ViewSnapshot:
+    """Pre-encoded JSON body for one version of a read-only view"""
+
+    __slots__ = ("version", "body", "etag", "built_at")
+
+    def __init__(self, name: str, version: Hashable, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = f'"{name}-{version}-{_BOOT_ID}"'
+        self.built_at = time.time()
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header already names this snapshot"""
+        if not if_none_match:
+            return False
+        if if_none_match == self.etag or if_none_match.strip() == "*":
+            return True
+        candidates = (tag.strip() for tag in if_none_match.split(","))
+        return any(tag.replace("W/", "", 1) == self.etag for tag in candidates)
+
+
+class ViewCache:
+    """Versioned snapshots of read-heavy views.
+
+    Each view registers a builder and a cheap version function. ``get``
+    returns the cached snapshot until the version changes, so polling an
+    unchanged view never re-serializes anything.
+    """
+
+    def __init__(self):
+        self._views: Dict[str, tuple] = {}
+        self._snapshots: Dict[str, ViewSnapshot] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "rebuilds": 0, "not_modified": 0}
+
+    def register(self, name: str, builder: Callable[[], Any], version: Callable[[], Hashable]):
+        self._views[name] = (builder, version)
+        self._snapshots.pop(name, None)
+
+    def get(self, name: str) -> ViewSnapshot:
+        builder, version_fn = self._views[name]
+        version = version_fn()
+        snapshot = self._snapshots.get(name)
+        if snapshot is not None and snapshot.version == version:
+            self.stats["hits"] += 1
+            return snapshot
+
+        body = json.dumps(builder(), separators=(",", ":")).encode("utf-8")
+        snapshot = ViewSnapshot(name, version, body)
+        self._snapshots[name] = snapshot
+        self.stats["rebuilds"] += 1
+        return snapshot
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "views": {name: len(s.body) for name, s in self._snapshots.items()},
+        }
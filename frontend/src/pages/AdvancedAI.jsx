@@ -49,7 +49,8 @@ const AdvancedAI = () => {
     aiService.connectWebSocket(
       userId,
       handleAIResponse,
-      handleAIThoughts
+      handleAIThoughts,
+      { onError: handleAIError }
     )
 
     return () => {
@@ -81,6 +82,20 @@ const AdvancedAI = () => {
     setIsThinking(false)
   }
 
+  // The service shed or rejected the message: say so instead of an empty reply
+  const handleAIError = (reply) => {
+    const text = reply.type === 'throttled'
+      ? `I'm receiving a lot of messages right now. Please try again${reply.retry_after ? ` in ${reply.retry_after} seconds` : ' shortly'}.`
+      : `I couldn't process that message${reply.detail ? `: ${reply.detail}` : '.'}`
+    setMessages(prev => [...prev, {
+      id: prev.length + 1,
+      text,
+      sender: 'ai',
+      timestamp: new Date().toLocaleTimeString()
+    }])
+    setIsThinking(false)
+  }
+
   const handleAIThoughts = (thoughts) => {
     setAiThoughts(thoughts.map(thought => ({
       type: thought.type,
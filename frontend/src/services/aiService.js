@@ -47,13 +47,18 @@ class AIService {
     })
   }
 
-  // Trigger AI Learning
+  // Trigger AI Learning (queued as a background job)
   async triggerLearning() {
     return await this.makeRequest('/ai/learn', {
       method: 'POST'
     })
   }
 
+  // Get Background Job Status
+  async getJob(jobId) {
+    return await this.makeRequest(`/ai/jobs/${jobId}`)
+  }
+
   // Get AI Insights
   async getInsights() {
     return await this.makeRequest('/ai/insights')
@@ -80,8 +85,18 @@ class AIService {
     })
   }
 
+  // Long journal entries, analyzed section by section
+  async analyzeJournal(text, userId) {
+    return await this.makeRequest('/ai/journal', {
+      method: 'POST',
+      body: JSON.stringify({ text, user_id: userId })
+    })
+  }
+
   // WebSocket Methods
-  connectWebSocket(userId, onMessage, onThoughts) {
+  // onMessage gets chat replies only; onError gets {type: 'throttled' | 'error', ...}
+  // replies to a sent message, onTopic(topic, mode, data) gets subscribed topic pushes
+  connectWebSocket(userId, onMessage, onThoughts, { onError, onTopic } = {}) {
     if (this.websocket) {
       this.websocket.close()
     }
@@ -98,8 +113,17 @@ class AIService {
         try {
           const data = JSON.parse(event.data)
           
-          if (data.type === 'thoughts') {
+          if (data.mode) {
+            // Pushed topic update: {type: topic, mode: 'snapshot' | 'delta', data}
+            onTopic && onTopic(data.type, data.mode, data.data)
+          } else if (data.type === 'thoughts') {
             onThoughts && onThoughts(data.data)
+          } else if (data.type === 'throttled' || data.type === 'error') {
+            onError && onError(data)
+          } else if (data.type === 'subscribed' || data.type === 'unsubscribed') {
+            console.log(`WebSocket ${data.type}:`, data.topics)
+          } else if (data.type) {
+            console.warn('Unhandled WebSocket message type:', data.type)
           } else {
             onMessage && onMessage(data)
           }
@@ -135,6 +159,15 @@ class AIService {
     }
   }
 
+  // Server-pushed updates; messages arrive as {type, mode: 'snapshot' | 'delta', data}
+  subscribeWebSocketTopics(topics = ['thoughts', 'insights', 'learning_stats']) {
+    if (this.websocket && this.isConnected) {
+      this.websocket.send(JSON.stringify({ type: 'subscribe', topics }))
+    } else {
+      console.error('WebSocket not connected')
+    }
+  }
+
   disconnectWebSocket() {
     if (this.websocket) {
       this.websocket.close()
@@ -174,12 +207,15 @@ export const {
   getStatus,
   chatWithAI,
   triggerLearning,
+  getJob,
   getInsights,
   getThoughts,
   processAssessment,
   analyzeMood,
+  analyzeJournal,
   connectWebSocket,
   sendWebSocketMessage,
+  subscribeWebSocketTopics,
   disconnectWebSocket,
   isServiceAvailable,
   waitForService